@@ -1,6 +1,19 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
 import os
 import json
+import random
+import re
+import time
 import logging
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from .config import settings
+from .instrumentation import AI_CALL, record_timing, registry
+from .settings_store import AI_JOB_LEASE_KEY, settings_store
 
 logger = logging.getLogger(__name__)
 
@@ -257,11 +270,317 @@ If not order-related:
 """
 
 
-async def call_ai_api(prompt: str, user_content: str) -> dict:
-    """Call GitHub AI API using azure-ai-inference"""
+PRIORITIES = ("live", "backfill", "reprocess")
+_priority: ContextVar[str] = ContextVar("ai_priority", default="live")
+
+AI_QUEUE_DEPTH = registry.gauge("ai_queue_depth", "Model calls waiting for the scheduler", ("priority",))
+AI_QUEUE_WAIT = registry.histogram(
+    "ai_queue_wait_seconds", "Time model calls waited for the scheduler", ("priority",))
+AI_IN_FLIGHT = registry.gauge("ai_in_flight", "Model calls in progress")
+AI_CONCURRENCY_LIMIT = registry.gauge("ai_concurrency_limit", "Current adaptive model call concurrency limit")
+AI_RATE_LIMITED = registry.counter("ai_rate_limited_total", "Model calls answered with 429")
+AI_TIER_CALLS = registry.counter("ai_tier_calls_total", "Model calls per task and tier", ("task", "tier"))
+AI_TIER_LATENCY = registry.histogram(
+    "ai_tier_duration_seconds", "Model call latency per task and tier, scheduler wait included", ("task", "tier"))
+AI_ESCALATIONS = registry.counter(
+    "ai_escalations_total", "Answers retried on the escalation model, by reason", ("task", "reason"))
+
+
+@contextmanager
+def ai_priority(name: str):
+    """Run model calls made inside the block (and tasks it starts) at ``name``."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown AI priority: {name}")
+    token = _priority.set(name)
     try:
-        from azure.ai.inference import ChatCompletionsClient
-        from azure.core.credentials import AzureKeyCredential
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(prompt: str, user_content: str) -> int:
+    """Rough prompt size, about four characters per token."""
+    return (len(prompt) + len(user_content)) // 4 + 1
+
+
+class TokenBucket:
+    """``per_minute`` units refilled continuously, holding at most a minute's worth.
+
+    ``per_minute <= 0`` means unlimited.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float):
+        """Spend ``amount``; negative values refund, and the level may go into debt."""
+        if self.capacity > 0:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+    def resize(self, per_minute: float):
+        """Refill at ``per_minute`` from now on, keeping what has been spent."""
+        self._refill()
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+
+def budget_share(job: bool = False, lent: bool = False) -> float:
+    """Share of the deployment's model budgets one process may spend.
+
+    Each process schedules on its own, so the budgets are split: the
+    backfill and re-extraction jobs get ``ai_job_budget_share``, and every
+    web worker an equal part of the rest, or of everything while no job
+    holds the reserve (``lent``). With no share reserved, a job gets a
+    worker's part and the deployment runs over budget while it does.
+    """
+    workers = max(1, settings.ai_workers or int(os.getenv("WEB_CONCURRENCY") or 1))
+    reserved = min(max(settings.ai_job_budget_share, 0.0), 0.9)
+    if job:
+        return reserved or 1 / workers
+    if lent:
+        return 1 / workers
+    return (1 - reserved) / workers
+
+
+class ModelScheduler:
+    """Admits model calls by priority under request/token budgets and a concurrency limit.
+
+    Waiters are served strictly by priority class, then arrival order, so a
+    live webhook never queues behind backfill work in the same process. The
+    concurrency limit is AIMD: halved on a 429 (and calls pause for its
+    Retry-After), grown by about one per limit's worth of successful calls.
+    """
+
+    def __init__(self, share: float = 1.0):
+        self.in_flight = 0
+        self.configure(share)
+        self.paused_until = 0.0
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def configure(self, share: float):
+        """Budgets and concurrency ceiling at ``share`` of the configured ones."""
+        self.requests = TokenBucket(settings.ai_requests_per_minute * share)
+        self.tokens = TokenBucket(settings.ai_tokens_per_minute * share)
+        self.max_concurrency = max(1, int(settings.ai_max_concurrency * share))
+        self.limit = float(self.max_concurrency)
+
+    def rescale(self, share: float):
+        """Move to ``share`` without refilling the budgets or forgetting the limit learned so far."""
+        max_concurrency = max(1, int(settings.ai_max_concurrency * share))
+        self.requests.resize(settings.ai_requests_per_minute * share)
+        self.tokens.resize(settings.ai_tokens_per_minute * share)
+        self.limit = max(1.0, min(float(max_concurrency), self.limit * max_concurrency / self.max_concurrency))
+        self.max_concurrency = max_concurrency
+        self._dispatch()
+
+    def queue_depth(self) -> dict[str, int]:
+        depth = dict.fromkeys(PRIORITIES, 0)
+        for _, _, future, _, priority in self._waiters:
+            if not future.done():
+                depth[priority] += 1
+        return depth
+
+    async def acquire(self, priority: str, tokens: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES.index(priority), next(self._sequence), future, tokens, priority))
+        start = time.perf_counter()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: hand the slot back
+                self.release("cancelled")
+            raise
+        AI_QUEUE_WAIT.observe(time.perf_counter() - start, priority=priority)
+
+    def release(self, outcome: str, retry_after: float | None = None, tokens_used: int = 0):
+        """``outcome`` is ``ok``, ``rate_limited`` or anything else for errors.
+
+        ``tokens_used`` corrects the token budget by the actual minus the
+        estimated usage.
+        """
+        self.in_flight -= 1
+        if tokens_used:
+            self.tokens.take(tokens_used)
+        if outcome == "rate_limited":
+            self.limit = max(1.0, self.limit / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + (retry_after or 1.0))
+        elif outcome == "ok":
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            _, _, future, tokens, _ = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= int(self.limit):
+                return
+            wait = max(
+                self.paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+            )
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def export(self):
+        for priority, depth in self.queue_depth().items():
+            AI_QUEUE_DEPTH.set(depth, priority=priority)
+        AI_IN_FLIGHT.set(self.in_flight)
+        AI_CONCURRENCY_LIMIT.set(int(self.limit))
+
+
+# 429 goes back through the scheduler's backoff; the others are transient
+# and retried after an exponential, jittered sleep (seconds)
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 8.0
+
+# A job holds the reserved share through a lease in the settings table,
+# renewed every third of its life; web workers spend the reserve otherwise
+JOB_LEASE_SECONDS = 300
+
+scheduler = ModelScheduler(budget_share())
+registry.add_collector(scheduler.export)
+
+_lease_timer: asyncio.TimerHandle | None = None
+
+
+def lend_job_reserve(store):
+    """Settings listener for web workers: take the job reserve while no job holds it."""
+    global _lease_timer
+    lease = store.get(AI_JOB_LEASE_KEY) or {}
+    remaining = lease.get("expires", 0) - time.time()
+    scheduler.rescale(budget_share(lent=remaining <= 0))
+    if _lease_timer is not None:
+        _lease_timer.cancel()
+        _lease_timer = None
+    if remaining > 0:
+        # Also covers a job that died without giving the lease back
+        _lease_timer = asyncio.get_running_loop().call_later(remaining, lend_job_reserve, store)
+
+
+@asynccontextmanager
+async def job_budget(session_factory):
+    """Run a backfill or re-extraction job on the reserved budget share.
+
+    The lease keeps the web workers off the reserve until the block exits.
+    Only one job should run at a time: they share the one reserve.
+    """
+    scheduler.configure(budget_share(job=True))
+    holder = uuid.uuid4().hex
+
+    async def take():
+        async with session_factory() as db:
+            await settings_store.set(db, AI_JOB_LEASE_KEY, {"holder": holder, "expires": time.time() + JOB_LEASE_SECONDS})
+
+    async def renew():
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                await take()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"AI job lease renewal failed: {e}")
+
+    await take()
+    task = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            async with session_factory() as db:
+                await settings_store.refresh_if_changed(db)
+                if (settings_store.get(AI_JOB_LEASE_KEY) or {}).get("holder") == holder:
+                    await settings_store.set(db, AI_JOB_LEASE_KEY, None)
+        except Exception as e:
+            logger.warning(f"AI job lease not released, it expires on its own: {e}")
+
+_client = None
+
+
+def get_client(endpoint: str, token: str):
+    """One async client (and connection pool) per process."""
+    global _client
+    from azure.ai.inference.aio import ChatCompletionsClient
+    from azure.core.credentials import AzureKeyCredential
+
+    if _client is None:
+        # Retries happen in call_ai_api, through the scheduler; the SDK's own
+        # retry policy would sleep on a 429 while holding a concurrency slot
+        _client = ChatCompletionsClient(endpoint=endpoint, credential=AzureKeyCredential(token), retry_total=0)
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _retry_after(error) -> float | None:
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_content(content) -> dict:
+    if isinstance(content, dict):
+        return content
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{[^{}]*\}', content, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+        raise
+
+
+async def call_ai_api(prompt: str, user_content: str, model: str | None = None) -> dict:
+    """Call GitHub AI API using azure-ai-inference, through the scheduler.
+
+    Runs at the priority set by ``ai_priority`` (``live`` by default) and
+    retries up to ``AI_MAX_RETRIES`` times after a 429 or a transient 408/5xx,
+    the latter with exponential backoff.
+    """
+    try:
+        from azure.ai.inference.aio import ChatCompletionsClient  # noqa: F401
+        from azure.core.exceptions import HttpResponseError
     except ImportError:
         logger.error("azure-ai-inference not installed")
         return {"error": "AI library not installed"}
@@ -272,70 +591,151 @@ async def call_ai_api(prompt: str, user_content: str) -> dict:
         return {"error": "GITHUB_TOKEN not configured"}
     
     endpoint = os.getenv("GITHUB_ENDPOINT", "https://models.github.ai/inference")
-    model = os.getenv("GITHUB_MODEL", "openai/gpt-4o")
+    model = model or default_model()
+    priority = _priority.get()
+    estimate = estimate_tokens(prompt, user_content)
     
-    logger.info(f"Calling AI API with model: {model}")
+    logger.info("Calling AI API with model %s (%s)", model, priority)
     
-    try:
-        client = ChatCompletionsClient(
-            endpoint=endpoint,
-            credential=AzureKeyCredential(token),
-        )
-        
-        response = client.complete(
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_content}
-            ],
-            model=model,
-            temperature=0.1,
-            max_tokens=2048
-        )
-        
-        message = response.choices[0].message
-        content = message.content
-        logger.info(f"AI response type: {type(content)}, content: {str(content)[:200]}...")
-        
-        if isinstance(content, dict):
-            return content
-        
+    backoff = 0.0
+    for attempt in range(settings.ai_max_retries + 1):
+        if backoff:
+            # Outside the scheduler, so the wait holds no concurrency slot
+            await asyncio.sleep(backoff)
+            backoff = 0.0
+        await scheduler.acquire(priority, estimate)
+        start = time.perf_counter()
+        outcome = "error"
+        retry_after = None
+        used = 0
         try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            import re
-            json_match = re.search(r'\{[^{}]*\}', content, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            raise
-        
-    except Exception as e:
-        logger.error(f"AI API error: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return {"error": str(e)}
+            response = await get_client(endpoint, token).complete(
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": user_content}
+                ],
+                model=model,
+                temperature=0.1,
+                max_tokens=2048
+            )
+            usage = getattr(response, "usage", None)
+            if usage and usage.total_tokens:
+                used = usage.total_tokens - estimate
+            content = response.choices[0].message.content
+            logger.debug("AI response: %s", content)
+            result = parse_content(content)
+            # Unparseable output is an error, not a success for the AIMD limit
+            outcome = "ok"
+            return result
+        except HttpResponseError as e:
+            if e.status_code == 429:
+                outcome = "rate_limited"
+                retry_after = _retry_after(e)
+                AI_RATE_LIMITED.inc()
+            if e.status_code in RETRY_STATUSES and attempt < settings.ai_max_retries:
+                if e.status_code != 429:
+                    backoff = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning("AI API returned %s, retrying (attempt %d)", e.status_code, attempt + 1)
+                continue
+            logger.error("AI API error: %s", e)
+            return {"error": str(e)}
+        except Exception as e:
+            # The traceback is formatted by the log writer thread, not here
+            logger.error("AI API error: %s", e, exc_info=True)
+            return {"error": str(e)}
+        finally:
+            scheduler.release(outcome, retry_after, used)
+            duration = time.perf_counter() - start
+            AI_CALL.observe(duration, model=model, outcome=outcome)
+            record_timing("ai", duration)
+
+
+def default_model() -> str:
+    return os.getenv("GITHUB_MODEL", "openai/gpt-4o")
+
+
+def task_models(task: str) -> list[str]:
+    """Models tried in order for ``task``: its own tier, then the escalation model."""
+    first = {
+        "classification": settings.ai_classification_model,
+        "extraction": settings.ai_extraction_model,
+    }[task] or default_model()
+    escalation = settings.ai_escalation_model or default_model()
+    return [first] if escalation == first else [first, escalation]
+
+
+def escalation_reason(task: str, result: dict) -> str | None:
+    """Why ``result`` should be retried on the next tier, or ``None`` to keep it.
+
+    API errors are returned as they are: a bigger model does not fix a 429.
+    """
+    if set(result) == {"error"}:
+        return None
+    if result.get("confidence") == "Low":
+        return "low_confidence"
+    if task == "classification" and "isOrderEmail" not in result:
+        return "malformed"
+    if task == "extraction" and not result.get("order_number"):
+        return "missing_order_number"
+    return None
+
+
+async def call_tiered(task: str, prompt: str, user_content: str) -> dict:
+    """Run ``task`` on its tier's model, escalating when the answer is weak."""
+    models = task_models(task)
+    for index, model in enumerate(models):
+        tier = "base" if index == 0 else "escalated"
+        start = time.perf_counter()
+        result = await call_ai_api(prompt, user_content, model)
+        AI_TIER_LATENCY.observe(time.perf_counter() - start, task=task, tier=tier)
+        AI_TIER_CALLS.inc(task=task, tier=tier)
+        reason = escalation_reason(task, result)
+        if reason is None or index == len(models) - 1:
+            return result
+        AI_ESCALATIONS.inc(task=task, reason=reason)
+        logger.info("Escalating %s from %s to %s: %s", task, model, models[index + 1], reason)
+    return result
+
+
+def extraction_version() -> str:
+    """Short fingerprint of the extraction prompt and models.
+
+    Stored on ``raw_emails`` so ``app.jobs.reextract_orders`` can skip
+    orders already extracted by the current pipeline.
+    """
+    fingerprint = "\0".join([EXTRACTION_SYSTEM_PROMPT, *task_models("extraction")])
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def classification_input(subject: str, body: str) -> str:
+    return f"Subject: {subject}\n\n{body[:2000]}"
+
+
+def extraction_input(subject: str, body: str) -> str:
+    return f"Subject: {subject}\n\n{body[:3000]}"
 
 
 async def classify_email(subject: str, body: str) -> dict:
     """Classify if email is order-related."""
-    content = f"Subject: {subject}\n\n{body[:2000]}"
+    content = classification_input(subject, body)
     
     try:
-        result = await call_ai_api(CLASSIFICATION_SYSTEM_PROMPT, content)
-        logger.info(f"Classification result: {result}")
+        result = await call_tiered("classification", CLASSIFICATION_SYSTEM_PROMPT, content)
+        logger.debug("Classification result: %s", result)
         return result
     except Exception as e:
-        logger.error(f"Classification error: {e}")
+        logger.error("Classification error: %s", e)
         return {"isOrderEmail": False, "confidence": "Low", "error": str(e)}
 
 
 async def extract_order_data(subject: str, body: str) -> dict:
     """Extract order data from email."""
-    content = f"Subject: {subject}\n\n{body[:3000]}"
+    content = extraction_input(subject, body)
     
     try:
-        result = await call_ai_api(EXTRACTION_SYSTEM_PROMPT, content)
-        logger.info(f"Extraction result: {result}")
+        result = await call_tiered("extraction", EXTRACTION_SYSTEM_PROMPT, content)
+        logger.debug("Extraction result: %s", result)
         return result
     except Exception as e:
-        logger.error(f"Extraction error: {e}")
+        logger.error("Extraction error: %s", e)
         return {"extraction_success": False, "error": str(e), "confidence": "Low"}
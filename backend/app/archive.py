@@ -0,0 +1,176 @@
+"""Move delivered orders to the ``archived_orders`` tables and back.
+
+Day-to-day queries read ``orders``/``order_items`` only, so they stay small
+no matter how much history piles up. ``include_archived`` on the read
+endpoints unions the archive back in, and a webhook for an archived order
+restores it before updating.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from sqlalchemy import DateTime, delete, func, insert, literal, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .database import AsyncSessionLocal, engine
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, utcnow
+
+logger = logging.getLogger(__name__)
+
+ORDER_COLUMNS = [c.name for c in Order.__table__.c]
+ITEM_COLUMNS = [c.name for c in OrderItem.__table__.c]
+
+# pg_try_advisory_lock key shared by every archiver process
+ARCHIVE_LOCK_KEY = 0x6F72_6461_7263
+
+
+def order_source(include_archived: bool = False):
+    """``orders``, or ``orders`` UNION ALL ``archived_orders`` under the same name."""
+    if not include_archived:
+        return Order.__table__
+    archived = ArchivedOrder.__table__
+    return union_all(
+        select(*Order.__table__.c),
+        select(*(archived.c[name] for name in ORDER_COLUMNS)),
+    ).subquery("orders")
+
+
+def item_source(include_archived: bool = False):
+    if not include_archived:
+        return OrderItem.__table__
+    archived = ArchivedOrderItem.__table__
+    return union_all(
+        select(*OrderItem.__table__.c),
+        select(*(archived.c[name] for name in ITEM_COLUMNS)),
+    ).subquery("order_items")
+
+
+def _copy(source, target, columns: list[str], condition, extra: dict | None = None):
+    """INSERT INTO target SELECT columns FROM source WHERE condition."""
+    extra = extra or {}
+    selected = [source.c[name] for name in columns]
+    selected += [literal(value, type_) for value, type_ in extra.values()]
+    return insert(target).from_select(columns + list(extra), select(*selected).where(condition))
+
+
+async def archive_orders(db: AsyncSession, order_ids: list[str]) -> int:
+    """Move ``order_ids`` and their items to the archive; caller commits."""
+    if not order_ids:
+        return 0
+    orders, items = Order.__table__, OrderItem.__table__
+    archived_at = {"archived_at": (utcnow(), DateTime(timezone=True))}
+    await db.execute(_copy(orders, ArchivedOrder.__table__, ORDER_COLUMNS, orders.c.id.in_(order_ids), archived_at))
+    await db.execute(_copy(items, ArchivedOrderItem.__table__, ITEM_COLUMNS, items.c.order_id.in_(order_ids)))
+    await db.execute(delete(items).where(items.c.order_id.in_(order_ids)))
+    result = await db.execute(delete(orders).where(orders.c.id.in_(order_ids)))
+    return result.rowcount
+
+
+async def restore_order(db: AsyncSession, order_number: str) -> str | None:
+    """Move an archived order back into ``orders``; returns its id, caller commits."""
+    archived, archived_items = ArchivedOrder.__table__, ArchivedOrderItem.__table__
+    order_id = (await db.execute(
+        select(archived.c.id).where(archived.c.order_number == order_number)
+    )).scalar_one_or_none()
+    if order_id is None:
+        return None
+    await db.execute(_copy(archived, Order.__table__, ORDER_COLUMNS, archived.c.id == order_id))
+    await db.execute(_copy(archived_items, OrderItem.__table__, ITEM_COLUMNS, archived_items.c.order_id == order_id))
+    await db.execute(delete(archived_items).where(archived_items.c.order_id == order_id))
+    await db.execute(delete(archived).where(archived.c.id == order_id))
+    logger.info(f"Restored archived order {order_number}")
+    return order_id
+
+
+async def is_archived(db: AsyncSession, order_number: str) -> bool:
+    result = await db.execute(
+        select(func.count()).select_from(ArchivedOrder).where(ArchivedOrder.order_number == order_number)
+    )
+    return bool(result.scalar())
+
+
+@asynccontextmanager
+async def archive_lock():
+    """Session advisory lock on PostgreSQL so only one archiver runs at a time.
+
+    Yields whether the lock was taken. SQLite already serialises writers.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    async with engine.connect() as conn:
+        acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+        await conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+                await conn.commit()
+
+
+def archivable(cutoff):
+    """Delivered orders untouched since ``cutoff``."""
+    return (Order.status == "Delivered") & (Order.updated_at < cutoff)
+
+
+async def run_archive(
+    older_than_days: int | None = None,
+    batch_size: int | None = None,
+    pause: float = 0.0,
+    dry_run: bool = False,
+) -> dict:
+    """Archive delivered orders older than ``older_than_days`` in short batches.
+
+    Each batch is its own transaction, so row locks are held only for the
+    ``batch_size`` orders being moved; ``pause`` seconds between batches
+    leave room for other writers.
+    """
+    older_than_days = settings.archive_after_days if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.archive_batch_size
+    cutoff = utcnow() - timedelta(days=older_than_days)
+
+    if dry_run:
+        async with AsyncSessionLocal() as db:
+            pending = (await db.execute(select(func.count(Order.id)).where(archivable(cutoff)))).scalar() or 0
+        return {"archived": 0, "pending": pending, "cutoff": cutoff.isoformat(), "dry_run": True}
+
+    archived = 0
+    async with archive_lock() as acquired:
+        if not acquired:
+            logger.info("Another archiver holds the lock, skipping")
+            return {"archived": 0, "skipped": True}
+        while True:
+            async with AsyncSessionLocal() as db:
+                # Rows a webhook is updating right now are skipped until the next run
+                ids = list((await db.execute(
+                    select(Order.id).where(archivable(cutoff)).order_by(Order.id).limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )).scalars())
+                if not ids:
+                    break
+                archived += await archive_orders(db, ids)
+                await db.commit()
+            logger.info(f"Archived {archived} orders so far")
+            if pause:
+                await asyncio.sleep(pause)
+
+    return {"archived": archived, "cutoff": cutoff.isoformat(), "dry_run": False}
+
+
+async def archive_loop():
+    """Run ``run_archive`` every ``archive_interval_minutes`` inside the app."""
+    while True:
+        await asyncio.sleep(settings.archive_interval_minutes * 60)
+        try:
+            result = await run_archive(pause=settings.archive_batch_pause)
+            if result.get("archived"):
+                logger.info(f"Archive run: {result}")
+        except Exception as e:
+            logger.error(f"Archive run failed: {e}")
+
+
+def start_archive_loop() -> asyncio.Task | None:
+    if settings.archive_interval_minutes <= 0:
+        return None
+    return asyncio.create_task(archive_loop())
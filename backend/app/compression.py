@@ -0,0 +1,178 @@
+"""Negotiated zstd/brotli/gzip response compression.
+
+Small responses and responses that already carry a ``Content-Encoding`` (the
+precompressed static files) pass through untouched. Single-chunk bodies are
+compressed in one go; ``StreamingResponse`` bodies are compressed
+incrementally and flushed per chunk, so streamed output is not held back.
+"""
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+# Content types that are already compressed or not worth compressing
+SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "font/woff", "application/zip", "application/gzip",
+                      "application/x-gzip", "application/zstd", "application/octet-stream")
+
+
+def parse_accept_encoding(header: str) -> set[str]:
+    """Encodings listed in an Accept-Encoding header with a non-zero quality."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.lower())
+    return accepted
+
+
+def available_encodings() -> list[str]:
+    """Encodings from settings that the installed libraries can produce."""
+    available = []
+    for name in settings.compression_encodings.split(","):
+        name = name.strip().lower()
+        if name == "zstd" and zstandard is None:
+            continue
+        if name == "br" and brotli is None:
+            continue
+        if name in ("zstd", "br", "gzip"):
+            available.append(name)
+    return available
+
+
+class Compressor:
+    """Uniform streaming interface over zlib, brotli and zstandard."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=settings.compression_brotli_quality)
+        elif encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything buffered so far without ending the stream."""
+        if self.encoding == "gzip":
+            return self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.flush()
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    compressor = Compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_size if minimum_size is None else minimum_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        encoding = next((e for e in self.encodings if e in accepted), None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressedResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Message | None = None
+        self.passthrough = False
+        self.compressor: Compressor | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: Message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or content_type.startswith(SKIP_CONTENT_TYPES)
+            )
+            self.start_message = message
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None and self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not more_body:
+                # Whole body in one message: compress only if it pays off
+                if len(body) < self.minimum_size:
+                    self.passthrough = True
+                    await self.send(start)
+                    await self.send(message)
+                    return
+                body = compress(body, self.encoding)
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            self.compressor = Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.send(start)
+
+        if more_body:
+            data = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            data = self.compressor.compress(body) + self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
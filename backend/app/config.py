@@ -4,11 +4,117 @@ from typing import Optional
 
 class Settings(BaseSettings):
     database_url: str = "postgresql+asyncpg://appuser:changeme@db:5432/appointment_agent"
+    # Optional replica used by read-only endpoints; falls back to database_url
+    database_read_url: Optional[str] = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # asyncpg prepared statement cache per connection; set 0 behind pgbouncer
+    db_statement_cache_size: int = 100
+    # Server-side statement_timeout in milliseconds, 0 disables it
+    db_statement_timeout_ms: int = 0
+    # SQLite (sqlite+aiosqlite:///./orders.db): reader connections next to the
+    # single writer, and per-connection pragmas
+    sqlite_read_pool_size: int = 4
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    # Negative values are KiB, so -65536 is a 64 MB page cache
+    sqlite_cache_size: int = -65536
+    sqlite_mmap_size: int = 268435456
     secret_key: str = "change-me-in-production"
     encryption_key: Optional[str] = None
     github_token: Optional[str] = None
     first_user: str = "admin"
     first_password: str = "changeme"
+    # Seconds between checks for settings written by other workers
+    app_settings_refresh_interval: float = 5.0
+
+    # Response compression: preference order, size threshold and levels
+    compression_encodings: str = "zstd,br,gzip"
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+
+    # Instrumentation: slow statement log threshold, repeated-statement (N+1)
+    # warning threshold per request (0 disables) and Server-Timing headers
+    slow_query_ms: float = 200.0
+    n_plus_one_threshold: int = 10
+    server_timing: bool = True
+
+    # Local calendar for "due today"/"overdue" and for reading expected
+    # delivery dates; numeric dates like 03/04 are day/month unless disabled
+    app_timezone: str = "Asia/Dubai"
+    expected_date_day_first: bool = True
+
+    # Archival of delivered orders (app.archive): age in days since the last
+    # update, orders moved per transaction and the pause between batches.
+    # The in-app loop is off unless an interval is set; the job can also be
+    # run from cron with `python -m app.jobs.archive_orders`
+    archive_after_days: int = 90
+    archive_batch_size: int = 500
+    archive_batch_pause: float = 0.1
+    archive_interval_minutes: int = 0
+
+    # Model API scheduling (app.ai): request and token budgets per minute
+    # matching the GitHub Models tier (0 = unlimited), the ceiling for the
+    # adaptive concurrency limit and retries after a 429 or transient error.
+    # These are for the whole deployment, but every process schedules on its
+    # own: the backfill/re-extraction jobs get ai_job_budget_share of them and
+    # each of ai_workers web workers (0 = WEB_CONCURRENCY) a part of the rest,
+    # or of everything while no job is running
+    ai_requests_per_minute: int = 0
+    ai_tokens_per_minute: int = 0
+    ai_max_concurrency: int = 8
+    ai_max_retries: int = 3
+    ai_workers: int = 0
+    ai_job_budget_share: float = 0.25
+
+    # Model per task (app.ai.call_tiered): classification on a small model,
+    # extraction on a mid-size one, and a retry on the escalation model when
+    # the answer has Low confidence or no order number. Empty means
+    # GITHUB_MODEL, which is also the default escalation model
+    ai_classification_model: str = "openai/gpt-4.1-nano"
+    ai_extraction_model: str = "openai/gpt-4.1-mini"
+    ai_escalation_model: str = ""
+
+    # Mailbox backfill (app.mailbox): model calls in flight, messages per
+    # transaction/checkpoint and parser processes (0 = one per CPU). The
+    # HTTP endpoint only reads sources under backfill_dir and is off without it
+    backfill_dir: Optional[str] = None
+    backfill_concurrency: int = 4
+    backfill_batch_size: int = 200
+    backfill_workers: int = 0
+
+    # Raw email archive (app.raw_emails): which emails are kept ("orders" for
+    # those that produced an order, "all", or "off") and the zstd level, then
+    # model calls in flight and orders per batch for
+    # `python -m app.jobs.reextract_orders`
+    raw_email_store: str = "orders"
+    raw_email_zstd_level: int = 6
+    reextract_concurrency: int = 4
+    reextract_batch_size: int = 100
+
+    # Logging (app.logs): "json" lines or "text", root level, records held
+    # for the writer thread (more are dropped), the longest string kept in
+    # a record and the fields replaced by their length. Repeated INFO/DEBUG
+    # messages past log_sample_burst per second are kept at log_sample_rate
+    log_format: str = "json"
+    log_level: str = "INFO"
+    log_queue_size: int = 10000
+    log_max_field_chars: int = 200
+    log_redact_fields: str = "body,snippet,content,html,text"
+    log_sample_rate: float = 1.0
+    log_sample_burst: int = 10
+
+    # Opt-in webhook recording for offline replay (benchmarks/replay.py):
+    # directory for the gzip NDJSON files, share of requests kept and the
+    # size at which a new file is started
+    webhook_record_dir: Optional[str] = None
+    webhook_record_sample_rate: float = 1.0
+    webhook_record_max_mb: int = 100
 
     class Config:
         env_file = ".env"
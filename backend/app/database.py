@@ -1,10 +1,100 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
 
-engine = create_async_engine(settings.database_url, echo=False)
+
+def is_sqlite_file(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def engine_options(url: str, readonly: bool = False) -> dict:
+    """Pool and driver options for ``create_async_engine`` from settings."""
+    url = make_url(url)
+    options = {"echo": False, "pool_pre_ping": settings.db_pool_pre_ping}
+    if is_sqlite_file(url):
+        # SQLite allows one writer at a time: the write engine holds a single
+        # connection so writers queue in the pool instead of on the file lock,
+        # while WAL lets the read engine's connections run alongside it
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.sqlite_read_pool_size if readonly else 1,
+            max_overflow=0,
+            pool_timeout=settings.db_pool_timeout,
+        )
+    elif url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    if url.drivername == "postgresql+asyncpg":
+        connect_args = {
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "statement_cache_size": settings.db_statement_cache_size,
+        }
+        if settings.db_statement_timeout_ms:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(settings.db_statement_timeout_ms),
+            }
+        options["connect_args"] = connect_args
+    return options
+
+
+def sqlite_pragmas(readonly: bool = False) -> list[str]:
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        "PRAGMA foreign_keys=ON",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if readonly:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def create_engine(url: str, readonly: bool = False):
+    new_engine = create_async_engine(url, **engine_options(url, readonly))
+    if make_url(url).get_backend_name() == "sqlite":
+        pragmas = sqlite_pragmas(readonly and is_sqlite_file(url))
+
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+            # The sqlite3 driver only opens a transaction before DML, and a
+            # released SAVEPOINT outside one commits on its own; SQLAlchemy
+            # emits BEGIN itself instead (see _begin)
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(new_engine.sync_engine, "begin")
+        def _begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
+    return new_engine
+
+
+engine = create_engine(settings.database_url)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+if settings.database_read_url:
+    read_engine = create_engine(settings.database_read_url, readonly=True)
+elif is_sqlite_file(settings.database_url):
+    # Pooled readers on the same file, separate from the single writer
+    read_engine = create_engine(settings.database_url, readonly=True)
+else:
+    read_engine = engine
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     pass
@@ -16,3 +106,29 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db():
+    """Session for read-only endpoints, routed to the replica when configured."""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def _pool_stats(pool) -> dict:
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def pool_stats() -> dict:
+    """Connection pool counters for the primary and (if separate) read engine."""
+    stats = {"primary": _pool_stats(engine.pool)}
+    if read_engine is not engine:
+        stats["replica"] = _pool_stats(read_engine.pool)
+    return stats
@@ -0,0 +1,157 @@
+"""Parse the model's free-form ``expected_date`` into a calendar date.
+
+The model echoes whatever the email said: "2025-01-25", "Jan 23",
+"Thursday, Jan 23", "23/01", "tomorrow", "Jan 23 - Jan 25". Dates without a
+year, weekdays and relative words are resolved against the date the email
+was received. Numeric dates are read day-first unless
+``EXPECTED_DATE_DAY_FIRST`` is off. Ranges resolve to their last day, so an
+order is not overdue until the whole window has passed.
+"""
+import re
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .config import settings
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+WEEKDAYS = {
+    "mon": 0, "monday": 0, "tue": 1, "tues": 1, "tuesday": 1, "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3, "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5, "sun": 6, "sunday": 6,
+}
+RELATIVE = {"today": 0, "tonight": 0, "tomorrow": 1}
+
+_ISO = re.compile(r"\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b")
+# "23/01", "23-01-2025"; not "3-5 business days"
+_NUMERIC = re.compile(
+    r"\b(\d{1,2})[-/.](\d{1,2})(?:[-/.](\d{4}|\d{2}))?\b(?!\s*(?:business\s+|working\s+)?days?)")
+_DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([a-z]{3,9})\.?(?:,?\s+(\d{4}))?\b")
+_MONTH_DAY = re.compile(r"\b([a-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?")
+_WORD = re.compile(r"[a-z]+")
+
+# Undated day/month pairs may sit slightly in the past ("was due Jan 23"),
+# anything earlier is taken to mean next year
+PAST_TOLERANCE = timedelta(days=30)
+# Results this far from the email date are treated as misreads
+MAX_DISTANCE = timedelta(days=400)
+
+
+def local_timezone():
+    try:
+        return ZoneInfo(settings.app_timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def local_today() -> date:
+    return datetime.now(local_timezone()).date()
+
+
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC; naive values (SQLite returns these) are taken as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def to_local_date(value: datetime) -> date:
+    return as_utc(value).astimezone(local_timezone()).date()
+
+
+def parse_email_timestamp(value) -> datetime | None:
+    """Epoch milliseconds (Gmail ``internalDate``), ISO 8601 or RFC 2822."""
+    if value is None or value == "":
+        return None
+    text = str(value).strip()
+    if text.isdigit():
+        number = int(text)
+        return datetime.fromtimestamp(number / 1000 if number > 10**11 else number, timezone.utc)
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _make_date(year: int, month: int, day: int) -> date | None:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _full_year(year: str) -> int:
+    value = int(year)
+    return value + 2000 if value < 100 else value
+
+
+def _resolve_year(month: int, day: int, reference: date) -> date | None:
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        candidate = _make_date(year, month, day)
+        if candidate is not None and candidate >= reference - PAST_TOLERANCE:
+            return candidate
+    return None
+
+
+def _dated(month: int, day: int, year: str | None, reference: date) -> date | None:
+    if year:
+        return _make_date(_full_year(year), month, day)
+    return _resolve_year(month, day, reference)
+
+
+def parse_expected_date(value: str | None, reference: date | None = None, day_first: bool | None = None) -> date | None:
+    """Best-effort date for ``value``; ``None`` when nothing recognisable is found."""
+    if not value:
+        return None
+    reference = reference or local_today()
+    day_first = settings.expected_date_day_first if day_first is None else day_first
+    text = value.lower()
+    found: list[date] = []
+
+    def take(pattern, convert):
+        nonlocal text
+
+        def replace(match):
+            result = convert(match)
+            if result is None:
+                return match.group(0)
+            found.append(result)
+            # Blank out what matched so later patterns do not re-read the digits
+            return " " * len(match.group(0))
+
+        text = pattern.sub(replace, text)
+
+    take(_ISO, lambda m: _make_date(int(m.group(1)), int(m.group(2)), int(m.group(3))))
+
+    def numeric(m):
+        first, second = int(m.group(1)), int(m.group(2))
+        day, month = (first, second) if day_first else (second, first)
+        if month > 12:
+            day, month = month, day
+        if month > 12:
+            return None
+        return _dated(month, day, m.group(3), reference)
+
+    take(_NUMERIC, numeric)
+    take(_DAY_MONTH, lambda m: _dated(MONTHS[m.group(2)], int(m.group(1)), m.group(3), reference)
+         if m.group(2) in MONTHS else None)
+    take(_MONTH_DAY, lambda m: _dated(MONTHS[m.group(1)], int(m.group(2)), m.group(3), reference)
+         if m.group(1) in MONTHS else None)
+
+    if not found:
+        for word in _WORD.findall(text):
+            if word in RELATIVE:
+                found.append(reference + timedelta(days=RELATIVE[word]))
+            elif word in WEEKDAYS:
+                found.append(reference + timedelta(days=(WEEKDAYS[word] - reference.weekday()) % 7))
+
+    found = [d for d in found if abs(d - reference) <= MAX_DISTANCE]
+    return max(found) if found else None
@@ -0,0 +1,160 @@
+"""Order change events fanned out to connected clients.
+
+Write paths call :func:`notify_order_change` inside their transaction. On
+PostgreSQL that issues ``pg_notify``, so the event is delivered only if the
+transaction commits, and each worker holds a single ``LISTEN`` connection
+that fans events out to its SSE subscribers. Other databases have no
+NOTIFY, so events are dispatched in-process after commit.
+"""
+import asyncio
+import json
+import logging
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "order_events"
+# NOTIFY payloads are limited to 8000 bytes; larger orders are sent as a stub
+MAX_PAYLOAD = 7500
+SUBSCRIBER_QUEUE_SIZE = 100
+RECONNECT_DELAY = 5.0
+
+_PENDING_KEY = "pending_order_events"
+# Number of pending events when each open savepoint began
+_SAVEPOINTS_KEY = "pending_order_event_savepoints"
+
+
+def order_event(action: str, order) -> dict:
+    """Delta pushed to clients; items are left out, fetch the order for those."""
+    data = {"action": action, "id": order.id, "order_number": order.order_number}
+    if action != "deleted":
+        data["order"] = {
+            "id": order.id,
+            "order_number": order.order_number,
+            "vendor": order.vendor,
+            "customer_name": order.customer_name,
+            "status": order.status,
+            "location": order.location,
+            "expected_date": order.expected_date,
+            "expected_on": order.expected_on.isoformat() if order.expected_on else None,
+            "notes": order.notes,
+            "created_at": order.created_at.isoformat() if order.created_at else "",
+            "updated_at": order.updated_at.isoformat() if order.updated_at else "",
+        }
+    return data
+
+
+class OrderEventBroker:
+    def __init__(self):
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+        self._connection = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def dispatch(self, payload: str):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Slow client: tell it to reload instead of buffering forever
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(json.dumps({"action": "resync"}))
+
+    async def start(self):
+        if make_url(settings.database_url).get_backend_name() == "postgresql":
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self):
+        import asyncpg
+
+        dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            try:
+                self._connection = await asyncpg.connect(dsn)
+                await self._connection.add_listener(CHANNEL, self._on_notify)
+                logger.info(f"Listening for {CHANNEL}")
+                while not self._connection.is_closed():
+                    await asyncio.sleep(RECONNECT_DELAY)
+            except asyncio.CancelledError:
+                if self._connection and not self._connection.is_closed():
+                    await self._connection.close()
+                raise
+            except Exception as e:
+                logger.warning(f"Order event listener error: {e}")
+            # Events may have been missed while disconnected
+            self.dispatch(json.dumps({"action": "resync"}))
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.dispatch(payload)
+
+
+broker = OrderEventBroker()
+
+
+async def notify_order_change(db: AsyncSession, action: str, order):
+    """Queue an order event on ``db``'s transaction; delivered on commit."""
+    if action != "deleted":
+        await db.flush()
+    payload = json.dumps(order_event(action, order))
+    if len(payload) > MAX_PAYLOAD:
+        payload = json.dumps({"action": action, "id": order.id, "order_number": order.order_number, "partial": True})
+
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.pg_notify(CHANNEL, payload)))
+    else:
+        db.sync_session.info.setdefault(_PENDING_KEY, []).append(payload)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_savepoint(session: Session, transaction):
+    if transaction.nested:
+        session.info.setdefault(_SAVEPOINTS_KEY, {})[transaction] = len(session.info.get(_PENDING_KEY, []))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending(session: Session):
+    if session.in_nested_transaction():
+        # A savepoint was released; its events wait for the outer commit
+        return
+    session.info.pop(_SAVEPOINTS_KEY, None)
+    for payload in session.info.pop(_PENDING_KEY, []):
+        broker.dispatch(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    """Drop the events queued since the savepoint being rolled back, or all of them."""
+    savepoint = session.get_nested_transaction()
+    if savepoint is None:
+        session.info.pop(_SAVEPOINTS_KEY, None)
+        session.info.pop(_PENDING_KEY, None)
+        return
+    mark = session.info.get(_SAVEPOINTS_KEY, {}).pop(savepoint, None)
+    if mark is not None:
+        del session.info.get(_PENDING_KEY, [])[mark:]
@@ -0,0 +1,312 @@
+"""Per-request SQL/AI timing, Prometheus metrics and N+1 detection.
+
+Metrics live in a small in-process registry rendered in the Prometheus text
+format at ``/api/metrics``. Each worker process keeps its own registry, so
+scrape every worker (or aggregate) when running under gunicorn.
+"""
+import logging
+import re
+import time
+from bisect import bisect_left
+from collections import Counter as TallyCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labels)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count], sum
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key in sorted(self._counts):
+            counts = self._counts[key]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _label_str(self.labels + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {self._sums[key]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()) -> Counter:
+        return self._metrics.get(name) or self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()) -> Gauge:
+        return self._metrics.get(name) or self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.get(name) or self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector):
+        """``collector()`` is called before each render to refresh gauges."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+REQUEST_DB_TIME = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("route",))
+REQUEST_QUERIES = registry.histogram(
+    "http_request_queries", "SQL statements per request", ("route",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+SLOW_QUERIES = registry.counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS")
+REPEATED_QUERIES = registry.counter(
+    "db_repeated_statement_requests_total", "Requests that repeated one statement shape N_PLUS_ONE_THRESHOLD times",
+    ("route",))
+WEBHOOK_STAGE = registry.histogram(
+    "webhook_stage_duration_seconds", "Webhook pipeline stage latency", ("stage",))
+AI_CALL = registry.histogram(
+    "ai_call_duration_seconds", "Model API call latency", ("model", "outcome"))
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    query_count: int = 0
+    db_time: float = 0.0
+    slowest_sql: str | None = None
+    slowest_time: float = 0.0
+    shapes: TallyCounter = field(default_factory=TallyCounter)
+    # Server-Timing entries, e.g. {"classify": 0.8}
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def add_timing(self, name: str, duration: float):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+def record_timing(name: str, duration: float):
+    """Add ``duration`` to the current request's Server-Timing entry ``name``."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add_timing(name, duration)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a webhook stage into the histogram and Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        WEBHOOK_STAGE.observe(duration, stage=name)
+        record_timing(name, duration)
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    if duration * 1000 >= settings.slow_query_ms:
+        SLOW_QUERIES.inc()
+        logger.warning(f"Slow query ({duration * 1000:.1f} ms): {_WHITESPACE.sub(' ', statement)[:500]}")
+
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.query_count += 1
+    stats.db_time += duration
+    # Bound parameters are placeholders, so the text is the statement shape
+    stats.shapes[statement] += 1
+    if duration > stats.slowest_time:
+        stats.slowest_time = duration
+        stats.slowest_sql = statement
+
+
+def instrument_engine(engine):
+    """Attach the timing hooks to an (async) engine once."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    parts = [
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries"',
+        f"total;dur={total * 1000:.1f}",
+    ]
+    if stats.slowest_sql is not None:
+        parts.append(f"db-slowest;dur={stats.slowest_time * 1000:.1f}")
+    for name, duration in stats.timings.items():
+        parts.append(f"{name};dur={duration * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class InstrumentationMiddleware:
+    """Collects :class:`RequestStats` for each HTTP request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.server_timing:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", _server_timing(stats, time.perf_counter() - stats.started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            self._finish(scope, stats, status_code)
+
+    def _finish(self, scope: Scope, stats: RequestStats, status_code: int):
+        route = scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        # Long-lived streams would skew the latency histogram
+        if route_path.endswith("/stream"):
+            return
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - stats.started, method=scope["method"], route=route_path, status=status_code)
+        REQUEST_QUERIES.observe(stats.query_count, route=route_path)
+        REQUEST_DB_TIME.observe(stats.db_time, route=route_path)
+
+        threshold = settings.n_plus_one_threshold
+        if threshold and stats.shapes:
+            statement, count = stats.shapes.most_common(1)[0]
+            if count >= threshold:
+                REPEATED_QUERIES.inc(route=route_path)
+                logger.warning(
+                    f"Possible N+1 on {scope['method']} {route_path}: statement ran {count} times: "
+                    f"{_WHITESPACE.sub(' ', statement)[:300]}"
+                )
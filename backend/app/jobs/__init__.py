@@ -0,0 +1 @@
+# one-shot maintenance jobs, run with python -m app.jobs.<name>
@@ -0,0 +1,34 @@
+"""Move delivered orders older than ARCHIVE_AFTER_DAYS to the archive tables.
+
+Usage: python -m app.jobs.archive_orders [--older-than-days 90] [--batch-size 500] [--pause 0.1] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+from ..archive import run_archive
+from ..config import settings
+from ..database import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--older-than-days", type=int, default=settings.archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--pause", type=float, default=settings.archive_batch_pause,
+                        help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="only count the orders that would move")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            return await run_archive(args.older_than_days, args.batch_size, args.pause, args.dry_run)
+        finally:
+            await engine.dispose()
+
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Parse ``expected_date`` into ``expected_on`` for rows that predate it.
+
+Rows are anchored to their ``created_at`` date, the closest thing to the
+email date stored for old orders. Rows whose text does not parse stay NULL.
+
+Usage: python -m app.jobs.backfill_expected_on [--batch-size 500] [--dry-run] [--reparse]
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import select, update
+from ..database import AsyncSessionLocal, engine
+from ..dates import local_today, parse_expected_date, to_local_date
+from ..models import Order
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_expected_on(batch_size: int = 500, dry_run: bool = False, reparse: bool = False) -> dict:
+    """Walk orders with an ``expected_date`` by primary key, one transaction per batch."""
+    scanned = parsed = 0
+    last_id = None
+    while True:
+        async with AsyncSessionLocal() as db:
+            query = (
+                select(Order.id, Order.expected_date, Order.created_at)
+                .where(Order.expected_date.is_not(None), Order.expected_date != "")
+                .order_by(Order.id)
+                .limit(batch_size)
+            )
+            if not reparse:
+                query = query.where(Order.expected_on.is_(None))
+            if last_id is not None:
+                query = query.where(Order.id > last_id)
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            scanned += len(rows)
+
+            for row in rows:
+                reference = to_local_date(row.created_at) if row.created_at else local_today()
+                expected_on = parse_expected_date(row.expected_date, reference)
+                if expected_on is None:
+                    continue
+                parsed += 1
+                if not dry_run:
+                    # Keep updated_at: it dates the last real change (and drives archival)
+                    await db.execute(
+                        update(Order).where(Order.id == row.id)
+                        .values(expected_on=expected_on, updated_at=Order.updated_at)
+                    )
+            if not dry_run:
+                await db.commit()
+        logger.info(f"Parsed {parsed} of {scanned} expected dates so far")
+
+    return {"scanned": scanned, "parsed": parsed, "dry_run": dry_run}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--reparse", action="store_true", help="also redo rows that already have expected_on")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            return await backfill_expected_on(args.batch_size, args.dry_run, args.reparse)
+        finally:
+            await engine.dispose()
+
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
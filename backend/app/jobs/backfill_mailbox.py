@@ -0,0 +1,49 @@
+"""Create and update orders from an mbox file or a directory of .eml files.
+
+Resumes from ``<source>.checkpoint.json`` when one exists.
+
+Usage: python -m app.jobs.backfill_mailbox SOURCE [--sender amazon.ae ...] [--concurrency 4]
+       [--batch-size 200] [--workers 0] [--restart]
+"""
+import argparse
+import asyncio
+import json
+import logging
+from ..ai import close_client, job_budget
+from ..database import AsyncSessionLocal, engine
+from ..mailbox import run_backfill
+from ..settings_store import settings_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="mbox file or directory of .eml files")
+    parser.add_argument("--sender", action="append", default=[],
+                        help="only messages from this address or domain; repeatable")
+    parser.add_argument("--concurrency", type=int, help="model calls in flight")
+    parser.add_argument("--batch-size", type=int, help="messages per transaction and checkpoint")
+    parser.add_argument("--workers", type=int, help="parser processes")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            # Vendor/status normalization rules live in the settings table
+            async with AsyncSessionLocal() as db:
+                await settings_store.load(db)
+            # Spend the model budget held back for jobs, not the web workers' share
+            async with job_budget(AsyncSessionLocal):
+                return await run_backfill(
+                    args.source, tuple(args.sender), args.concurrency, args.batch_size, args.workers, args.restart
+                )
+        finally:
+            await close_client()
+            await engine.dispose()
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Fill the uuid shadow keys added by migration 0003 in small batches.
+
+Run between ``alembic upgrade 0003`` and ``alembic upgrade head`` on
+PostgreSQL so the contract migration has nothing left to rewrite. Each batch
+is its own short transaction, so the app keeps running meanwhile.
+
+Usage: python -m app.jobs.backfill_order_keys [--batch-size 5000] [--pause 0.1]
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import inspect, text
+from ..database import engine
+
+logger = logging.getLogger(__name__)
+
+BATCHES = {
+    "orders": text("""
+        UPDATE orders SET id_uuid = id::uuid
+        WHERE id IN (SELECT id FROM orders WHERE id_uuid IS NULL LIMIT :batch_size)
+    """),
+    "order_items": text("""
+        UPDATE order_items SET id_uuid = id::uuid, order_id_uuid = order_id::uuid
+        WHERE id IN (
+            SELECT id FROM order_items WHERE id_uuid IS NULL OR order_id_uuid IS NULL LIMIT :batch_size
+        )
+    """),
+}
+
+
+async def backfill_order_keys(batch_size: int = 5000, pause: float = 0.1) -> dict:
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(lambda c: [col["name"] for col in inspect(c).get_columns("orders")])
+    if "id_uuid" not in columns:
+        logger.info("No shadow key columns; nothing to backfill")
+        return {}
+
+    updated = {}
+    for table, statement in BATCHES.items():
+        updated[table] = 0
+        while True:
+            async with engine.begin() as conn:
+                result = await conn.execute(statement, {"batch_size": batch_size})
+            if not result.rowcount:
+                break
+            updated[table] += result.rowcount
+            logger.info(f"Backfilled {updated[table]} {table} rows so far")
+            # Leave room for foreground writes and replication between batches
+            await asyncio.sleep(pause)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds between batches")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            return await backfill_order_keys(args.batch_size, args.pause)
+        finally:
+            await engine.dispose()
+
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
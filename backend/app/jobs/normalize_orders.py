@@ -0,0 +1,72 @@
+"""Rewrite stored vendor/status values to their canonical names.
+
+Usage: python -m app.jobs.normalize_orders [--batch-size 500] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import select, update
+from ..database import AsyncSessionLocal, engine
+from ..models import Order
+from ..normalization import get_normalizer
+from ..settings_store import settings_store
+
+logger = logging.getLogger(__name__)
+
+
+async def normalize_orders(batch_size: int = 500, dry_run: bool = False) -> dict:
+    """Walk ``orders`` by primary key in batches, updating rows that change."""
+    async with AsyncSessionLocal() as db:
+        await settings_store.load(db)
+    normalizer = get_normalizer()
+
+    scanned = changed = 0
+    last_id = None
+    while True:
+        async with AsyncSessionLocal() as db:
+            query = select(Order.id, Order.vendor, Order.status).order_by(Order.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(Order.id > last_id)
+            result = await db.execute(query)
+            rows = result.all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            scanned += len(rows)
+
+            for row in rows:
+                vendor = normalizer.vendor(row.vendor)
+                status = normalizer.status(row.status)
+                if vendor == row.vendor and status == row.status:
+                    continue
+                changed += 1
+                if not dry_run:
+                    await db.execute(
+                        update(Order).where(Order.id == row.id).values(vendor=vendor, status=status)
+                    )
+            if not dry_run:
+                await db.commit()
+        logger.info(f"Normalized {changed} of {scanned} orders so far")
+
+    return {"scanned": scanned, "changed": changed, "dry_run": dry_run}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            return await normalize_orders(args.batch_size, args.dry_run)
+        finally:
+            await engine.dispose()
+
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Re-extract orders from their stored emails with the current prompt and models.
+
+Orders are taken from ``raw_emails`` in batches by order id. Each batch's
+emails are extracted again with bounded concurrency at "reprocess"
+priority, with no database session held meanwhile, and replayed oldest
+first the way webhooks apply them. Each order is then read again and only
+the fields whose value changed are written, in a short transaction that
+gives up if the order was updated since it was read; ``updated_at`` is
+kept, since nothing new happened to the order. Orders whose emails were
+all extracted by the current prompt and models are skipped unless
+``--all``, and archived orders are left alone. An order with an email that
+fails to re-extract or names another order is not touched in that run.
+
+Usage: python -m app.jobs.reextract_orders [--batch-size 100] [--concurrency 4] [--since 2026-01-01]
+       [--fields vendor,status] [--all] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from sqlalchemy import func, or_, select, update
+from ..ai import ai_priority, close_client, extract_order_data, extraction_version, job_budget
+from ..config import settings
+from ..database import AsyncSessionLocal, engine
+from ..dates import as_utc, parse_expected_date, to_local_date
+from ..events import notify_order_change
+from ..models import Order, OrderItem, RawEmail
+from ..normalization import get_normalizer
+from ..order_writes import add_items, is_missing, item_rows
+from ..raw_emails import unpack
+from ..settings_store import settings_store
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("vendor", "customer_name", "status", "location", "expected_date", "items")
+
+
+async def extract(raw: RawEmail, semaphore: asyncio.Semaphore) -> tuple[dict, dict]:
+    email = unpack(raw)
+    async with semaphore:
+        extraction = await extract_order_data(email["subject"], email["body"] or email["subject"])
+    return email, extraction
+
+
+def replay(extracted: list[tuple[RawEmail, dict, dict]]) -> dict:
+    """Field values the emails give when applied oldest first, like ``upsert_order``.
+
+    An email only sets the fields it has a value for, so a later email
+    without a location does not blank the one an earlier email gave, and
+    the status only moves forward.
+    """
+    normalizer = get_normalizer()
+    values = {}
+    extracted = sorted(extracted, key=lambda entry: as_utc(entry[0].received_at or entry[0].created_at))
+    for raw, email, extraction in extracted:
+        delivery_info = extraction.get("delivery_info") or {}
+        candidates = {
+            "vendor": normalizer.vendor(extraction.get("vendor"), email.get("from")),
+            "customer_name": extraction.get("customer_name"),
+            "status": normalizer.status(extraction.get("order_status")),
+            "location": delivery_info.get("location"),
+            "expected_date": delivery_info.get("expected_date"),
+        }
+        if "status" in values and not normalizer.advances(values["status"], candidates["status"]):
+            candidates["status"] = None
+        for field, value in candidates.items():
+            if not is_missing(value):
+                values[field] = value
+        if not is_missing(candidates["expected_date"]):
+            received_on = to_local_date(raw.received_at) if raw.received_at else None
+            values["expected_on"] = parse_expected_date(candidates["expected_date"], received_on)
+        if extraction.get("items"):
+            values["items"] = extraction["items"]
+    return values
+
+
+def diff(order: Order, items: list[OrderItem], values: dict, fields: tuple[str, ...]) -> dict:
+    """The subset of ``values`` in ``fields`` that differs from the stored order.
+
+    As in ``upsert_order``, the status only moves forward: a replay that ends
+    earlier than the stored status (the delivered email failed to
+    re-extract, or a person set it) leaves it alone.
+    """
+    changes = {
+        field: values[field] for field in fields
+        if field != "items" and field in values and values[field] != getattr(order, field)
+    }
+    if "status" in changes and not get_normalizer().advances(order.status, changes["status"]):
+        del changes["status"]
+    if "expected_date" in changes:
+        changes["expected_on"] = values["expected_on"]
+    if "items" in fields and "items" in values and item_rows(values["items"]) != item_rows(items):
+        changes["items"] = values["items"]
+    return changes
+
+
+async def reextract_orders(
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+    since: datetime | None = None,
+    fields: tuple[str, ...] = FIELDS,
+    everything: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """Walk orders with stored emails by id, a batch of model calls at a time.
+
+    No session is open while the models run; each order is then read again
+    and written in its own short transaction.
+    """
+    batch_size = batch_size or settings.reextract_batch_size
+    semaphore = asyncio.Semaphore(concurrency or settings.reextract_concurrency)
+    version = extraction_version()
+    async with AsyncSessionLocal() as db:
+        await settings_store.load(db)
+
+    counts = {
+        "orders": 0, "emails": 0, "changed": 0, "failed": 0, "mismatched": 0, "skipped": 0, "conflicts": 0,
+        "archived": 0,
+    }
+    changed_fields = dict.fromkeys(fields, 0)
+    last_id = None
+    while True:
+        async with AsyncSessionLocal() as db:
+            query = (
+                select(RawEmail.order_id).where(RawEmail.order_id.is_not(None))
+                .group_by(RawEmail.order_id).order_by(RawEmail.order_id).limit(batch_size)
+            )
+            if last_id is not None:
+                query = query.where(RawEmail.order_id > last_id)
+            if since is not None:
+                query = query.where(func.coalesce(RawEmail.received_at, RawEmail.created_at) >= since)
+            if not everything:
+                query = query.where(or_(RawEmail.extraction_version.is_(None), RawEmail.extraction_version != version))
+            order_ids = list((await db.execute(query)).scalars())
+            if not order_ids:
+                break
+            last_id = order_ids[-1]
+
+            numbers = dict((await db.execute(
+                select(Order.id, Order.order_number).where(Order.id.in_(order_ids))
+            )).all())
+            raws = list((await db.execute(
+                select(RawEmail).where(RawEmail.order_id.in_(list(numbers)))
+            )).scalars())
+        counts["orders"] += len(numbers)
+        counts["archived"] += len(order_ids) - len(numbers)
+
+        with ai_priority("reprocess"):
+            results = await asyncio.gather(*(extract(raw, semaphore) for raw in raws))
+        counts["emails"] += len(raws)
+
+        extracted: dict[str, list[tuple[RawEmail, dict, dict]]] = {}
+        # Orders with an email that did not re-extract cleanly: replaying
+        # the rest could put an older email's values back
+        incomplete = set()
+        for raw, (email, extraction) in zip(raws, results):
+            if not extraction.get("extraction_success", False) or not extraction.get("order_number"):
+                counts["failed"] += 1
+                incomplete.add(raw.order_id)
+                continue
+            if str(extraction["order_number"]).strip() != numbers[raw.order_id]:
+                # Not applied to another order's row; left for a person to look at
+                counts["mismatched"] += 1
+                logger.warning(
+                    f"Re-extraction of email {raw.id} gave order {extraction['order_number']}, "
+                    f"stored under {numbers[raw.order_id]}"
+                )
+                incomplete.add(raw.order_id)
+                continue
+            extracted.setdefault(raw.order_id, []).append((raw, email, extraction))
+        counts["skipped"] += len(incomplete)
+
+        for order_id, entries in extracted.items():
+            if order_id in incomplete:
+                continue
+            outcome = await apply_order(order_id, entries, fields, version, dry_run)
+            if outcome is None:
+                continue
+            if isinstance(outcome, str):
+                counts[outcome] += 1
+                continue
+            counts["changed"] += 1
+            for field in outcome:
+                if field in changed_fields:
+                    changed_fields[field] += 1
+        logger.info(f"Re-extracted {counts['orders']} orders so far: {counts}")
+
+    return {**counts, "fields": changed_fields, "version": version, "dry_run": dry_run}
+
+
+async def apply_order(
+    order_id: str, entries: list[tuple[RawEmail, dict, dict]], fields: tuple[str, ...], version: str, dry_run: bool
+) -> dict | str | None:
+    """Diff the replayed emails against the order as it is now and write the changes.
+
+    The order is read again after the model calls, so a status a webhook
+    set meanwhile is what the forward-only rule compares against, and the
+    write only goes through if ``updated_at`` is still the value read.
+    Returns the changes, ``None`` when there are none, or ``"conflicts"``
+    / ``"archived"`` when the order changed or moved away; those orders'
+    emails stay unstamped so the next run retries them.
+    """
+    async with AsyncSessionLocal() as db:
+        order = await db.get(Order, order_id)
+        if order is None:
+            return "archived"
+        items = list((await db.execute(select(OrderItem).where(OrderItem.order_id == order_id))).scalars())
+        changes = diff(order, items, replay(entries), fields)
+        if dry_run:
+            return changes or None
+        if changes:
+            new_items = changes.get("items")
+            values = {field: value for field, value in changes.items() if field != "items"}
+            # Keep updated_at: it dates the last real change (and drives archival)
+            result = await db.execute(
+                update(Order).where(Order.id == order_id, Order.updated_at == order.updated_at)
+                .values(**values, updated_at=Order.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                await db.rollback()
+                return "conflicts"
+            if new_items is not None:
+                await db.execute(OrderItem.__table__.delete().where(OrderItem.order_id == order_id))
+                add_items(db, order_id, new_items)
+            await db.refresh(order)
+            await notify_order_change(db, "updated", order)
+        await db.execute(
+            update(RawEmail).where(RawEmail.id.in_([raw.id for raw, _, _ in entries])).values(extraction_version=version)
+        )
+        await db.commit()
+    return changes or None
+
+
+def parse_since(value: str) -> datetime:
+    return as_utc(datetime.fromisoformat(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=settings.reextract_batch_size, help="orders per transaction")
+    parser.add_argument("--concurrency", type=int, default=settings.reextract_concurrency,
+                        help="model calls in flight")
+    parser.add_argument("--since", type=parse_since, help="only orders with emails received on or after this date")
+    parser.add_argument("--fields", default=",".join(FIELDS), help=f"fields to update (default: {','.join(FIELDS)})")
+    parser.add_argument("--all", action="store_true", dest="everything",
+                        help="also redo orders already extracted with the current prompt and models")
+    parser.add_argument("--dry-run", action="store_true", help="only count the changes")
+    args = parser.parse_args()
+
+    fields = tuple(field.strip() for field in args.fields.split(",") if field.strip())
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        parser.error(f"unknown fields: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            # Spend the model budget held back for jobs, not the web workers' share
+            async with job_budget(AsyncSessionLocal):
+                return await reextract_orders(
+                    args.batch_size, args.concurrency, args.since, fields, args.everything, args.dry_run
+                )
+        finally:
+            await close_client()
+            await engine.dispose()
+
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
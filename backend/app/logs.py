@@ -0,0 +1,195 @@
+"""Non-blocking structured logging.
+
+``setup_logging`` gives the root logger a handler that only puts the
+record on a bounded queue; a ``QueueListener`` thread formats and writes
+it. The event loop never waits on stdout, and a full queue drops records
+instead of stalling requests.
+
+Records are formatted in the listener as one JSON object per line (or
+plain text with ``LOG_FORMAT=text``), with any ``extra=`` fields as keys.
+Messages use %-style arguments, so nothing is formatted for records that
+are filtered out. As a record is queued, fields named in
+``log_redact_fields`` are replaced by their length and other long strings
+are cut to ``log_max_field_chars``; this copies dicts, lists and tuples in
+the arguments and extras (three levels deep), so the caller may change
+them afterwards. Other mutable objects are formatted later by the listener
+thread and should not be passed as arguments. Repeated INFO/DEBUG messages
+are sampled: past ``log_sample_burst`` per message per second, only
+``log_sample_rate`` of them are kept.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from .config import settings
+from .instrumentation import registry
+
+LOG_DROPPED = registry.counter("log_records_dropped_total", "Log records not written", ("reason",))
+
+# Attributes every LogRecord has; anything else came from extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: QueueListener | None = None
+
+
+def _csv(value: str) -> set[str]:
+    return {part.strip().lower() for part in value.split(",") if part.strip()}
+
+
+class RedactFilter(logging.Filter):
+    """Redact body fields and truncate long strings in a record's arguments and extras."""
+
+    def __init__(self, max_chars: int, redact: set[str]):
+        super().__init__()
+        self.max_chars = max_chars
+        self.redact = redact
+
+    def clean(self, value, depth: int = 0):
+        if isinstance(value, str):
+            if self.max_chars and len(value) > self.max_chars:
+                return f"{value[:self.max_chars]}... [{len(value)} chars]"
+            return value
+        if depth >= 3:
+            return value
+        if isinstance(value, dict):
+            return {
+                key: f"[redacted {len(item)} chars]" if str(key).lower() in self.redact and isinstance(item, str)
+                else self.clean(item, depth + 1)
+                for key, item in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.clean(item, depth + 1) for item in value)
+        if isinstance(value, BaseException):
+            return self.clean(str(value), depth)
+        return value
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, dict):
+            record.args = self.clean(record.args)
+        elif record.args:
+            record.args = tuple(self.clean(arg) for arg in record.args)
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            value = getattr(record, key)
+            if key.lower() in self.redact and isinstance(value, str):
+                setattr(record, key, f"[redacted {len(value)} chars]")
+            else:
+                setattr(record, key, self.clean(value))
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """Keep ``burst`` records per message template per second, then ``rate`` of the rest.
+
+    WARNING and above always pass. Counting is deterministic (every n-th
+    record), so a steady stream keeps a steady share.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.burst = burst
+        self._windows: dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        key = (record.name, record.msg)
+        second = int(time.monotonic())
+        window = self._windows.get(key)
+        if window is None or window[0] != second:
+            if len(self._windows) > 10_000:
+                self._windows.clear()
+            window = self._windows[key] = [second, 0]
+        window[1] += 1
+        over = window[1] - self.burst
+        if over <= 0 or (self.every and over % self.every == 0):
+            return True
+        LOG_DROPPED.inc(reason="sampled")
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in vars(record).keys() - _RECORD_ATTRS:
+            data[key] = getattr(record, key)
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+JsonFormatter.converter = time.gmtime
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueue the record unformatted; formatting happens in the listener thread.
+
+    The record's arguments are not copied here: ``setup_logging`` attaches
+    the ``RedactFilter``, which replaces them with redacted copies first.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc(reason="queue_full")
+
+
+def setup_logging(stream=None):
+    """Route the root logger through the queue to ``stream`` (stdout).
+
+    Safe to call more than once. ``log_queue_size=0`` writes synchronously
+    instead, which is only meant for comparing the two.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if settings.log_format == "text":
+        output.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    if settings.log_queue_size > 0:
+        handler = NonBlockingQueueHandler(queue.Queue(settings.log_queue_size))
+    else:
+        handler = output
+    if settings.log_sample_rate < 1:
+        handler.addFilter(SampleFilter(settings.log_sample_rate, settings.log_sample_burst))
+    # In the caller's thread, so the listener never reads objects the caller still changes
+    handler.addFilter(RedactFilter(settings.log_max_field_chars, _csv(settings.log_redact_fields)))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+    # azure-core logs the headers of every model request at INFO
+    logging.getLogger("azure.core.pipeline.policies.http_logging_policy").setLevel(
+        max(root.level, logging.WARNING)
+    )
+
+    if handler is not output:
+        _listener = QueueListener(handler.queue, output)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
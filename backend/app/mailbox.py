@@ -0,0 +1,313 @@
+"""Backfill orders from an mbox file or a directory of .eml files.
+
+Messages are read as a stream in chunks. Each chunk is MIME-decoded and
+filtered in a process pool, shaped like a webhook body, classified and
+extracted with bounded concurrency, then applied in one transaction per
+chunk. Within a chunk, emails for the same order are applied oldest first,
+and ``upsert_order(received_at=...)`` keeps an older email in a later
+chunk from rolling an order's status back.
+
+After every chunk the position of the next message and the running counts
+are written to a JSON checkpoint next to the source, so an interrupted
+run resumes where it stopped. A chunk cut off between its commit and its
+checkpoint is replayed; replayed emails come out as updates or stale.
+"""
+import asyncio
+import html
+import json
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from email import policy
+from email.parser import BytesParser
+from email.utils import parseaddr
+from typing import Iterator
+from .ai import ai_priority, classify_email, extract_order_data, extraction_version
+from .config import settings
+from .database import AsyncSessionLocal
+from .dates import as_utc, parse_email_timestamp
+from .models import utcnow
+from .raw_emails import should_store, store_raw_email
+from .routers.webhooks import extract_email_data, upsert_order
+
+logger = logging.getLogger(__name__)
+
+# Same cut-off as ai.extraction_input; there is no point shipping more text
+# between processes than the model will see
+BODY_LIMIT = 3000
+# Messages per process pool task
+PARSE_BATCH = 32
+
+_TAGS = re.compile(r"<[^>]+>")
+_HIDDEN = re.compile(r"<(script|style|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_BREAKS = re.compile(r"<\s*(br|/p|/div|/tr|/li|/h\d)\b[^>]*>", re.IGNORECASE)
+
+
+def checkpoint_path(source: str) -> str:
+    return source.rstrip("/") + ".checkpoint.json"
+
+
+def read_checkpoint(source: str) -> dict | None:
+    try:
+        with open(checkpoint_path(source)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(source: str, state: dict):
+    path = checkpoint_path(source)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def iter_messages(source: str, start: int = 0) -> Iterator[tuple[int, bytes]]:
+    """Yield ``(position, raw message)`` from ``start``.
+
+    For an mbox file the position is the byte offset of the message's
+    ``From `` line; for a directory it is the index in the sorted list of
+    ``.eml`` files.
+    """
+    if os.path.isdir(source):
+        names = sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(source)
+            for name in files if name.lower().endswith(".eml")
+        )
+        for index in range(start, len(names)):
+            with open(names[index], "rb") as f:
+                yield index, f.read()
+        return
+
+    with open(source, "rb") as f:
+        f.seek(start)
+        position, lines = start, []
+        offset = start
+        for line in f:
+            if line.startswith(b"From ") and lines:
+                yield position, b"".join(lines[1:] if lines[0].startswith(b"From ") else lines)
+                position, lines = offset, []
+            lines.append(line)
+            offset += len(line)
+        if lines:
+            yield position, b"".join(lines[1:] if lines[0].startswith(b"From ") else lines)
+
+
+def html_to_text(value: str) -> str:
+    value = _HIDDEN.sub(" ", value)
+    value = _BREAKS.sub("\n", value)
+    return html.unescape(_TAGS.sub(" ", value))
+
+
+def sender_allowed(address: str, senders: tuple[str, ...]) -> bool:
+    """``senders`` holds addresses or domains; a domain also matches its subdomains."""
+    if not senders:
+        return True
+    domain = address.rpartition("@")[2]
+    return any(address == s or domain == s or domain.endswith("." + s) for s in senders)
+
+
+def parse_message(raw: bytes, senders: tuple[str, ...] = ()) -> dict:
+    """Decode one message into the fields ``process_email`` takes.
+
+    Runs in the process pool, so it returns plain data: either the email or
+    ``{"skip": reason}``.
+    """
+    try:
+        message = BytesParser(policy=policy.default).parsebytes(raw)
+        from_header = str(message.get("From", "") or "")
+        if not sender_allowed(parseaddr(from_header)[1].lower(), senders):
+            return {"skip": "sender"}
+        part = message.get_body(preferencelist=("plain", "html"))
+        text = part.get_content() if part is not None else ""
+        if part is not None and part.get_content_type() == "text/html":
+            text = html_to_text(text)
+        body = {
+            "subject": str(message.get("Subject", "") or ""),
+            "body": " ".join(text.split())[:BODY_LIMIT],
+            "from": from_header,
+        }
+        date_header = str(message.get("Date", "") or "")
+    except Exception as e:
+        return {"skip": "unparseable", "error": str(e)}
+
+    subject, snippet, from_email = extract_email_data(body)
+    if not subject and not snippet:
+        return {"skip": "empty"}
+    received_at = parse_email_timestamp(date_header)
+    return {
+        "subject": subject,
+        "snippet": snippet,
+        "from_email": from_email,
+        # UTC so the per-order sort can compare the strings
+        "received_at": as_utc(received_at).isoformat() if received_at else None,
+    }
+
+
+def parse_messages(raws: list[bytes], senders: tuple[str, ...]) -> list[dict]:
+    return [parse_message(raw, senders) for raw in raws]
+
+
+async def analyze(email: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Classify and extract like ``process_email``, without writing."""
+    async with semaphore:
+        content = email["snippet"] or email["subject"]
+        classification = await classify_email(email["subject"], content)
+        if classification.get("error"):
+            return {"outcome": "failed", "error": classification["error"]}
+        if not classification.get("isOrderEmail", False):
+            return {"outcome": "not_order"}
+        extraction = await extract_order_data(email["subject"], content)
+    if not extraction.get("extraction_success", False) or not extraction.get("order_number"):
+        return {"outcome": "failed", "error": extraction.get("error", "no order number")}
+    return {"outcome": "order", "extraction": extraction}
+
+
+async def apply_chunk(emails: list[dict], results: list[dict]) -> dict[str, int]:
+    """Upsert the chunk's orders in one transaction, oldest email first per order.
+
+    Emails without a date go last and only fill in missing fields: applied
+    first, one would date the order now and turn every dated email stale.
+    Emails are kept in ``raw_emails`` per ``raw_email_store``.
+    """
+    orders = [(email, result["extraction"]) for email, result in zip(emails, results) if result["outcome"] == "order"]
+    orders.sort(key=lambda pair: (
+        str(pair[1]["order_number"]), pair[0]["received_at"] is None, pair[0]["received_at"] or ""
+    ))
+    others = [email for email, result in zip(emails, results) if result["outcome"] == "not_order"]
+    if not should_store(False):
+        others = []
+    counts: dict[str, int] = {}
+    if not orders and not others:
+        return counts
+    version = extraction_version()
+    async with AsyncSessionLocal() as db:
+        for email, extraction in orders:
+            received_at = parse_email_timestamp(email["received_at"])
+            try:
+                async with db.begin_nested():
+                    action, order = await upsert_order(
+                        db, extraction, email["from_email"], received_at=received_at, commit=False,
+                        stale=received_at is None,
+                    )
+                    if should_store(True):
+                        await store_raw_email(
+                            db, email["subject"], email["snippet"], email["from_email"], received_at, order.id, version
+                        )
+            except Exception as e:
+                logger.error(f"Backfill upsert failed for {extraction.get('order_number')}: {e}")
+                action = "error"
+            counts[action] = counts.get(action, 0) + 1
+        for email in others:
+            await store_raw_email(
+                db, email["subject"], email["snippet"], email["from_email"], parse_email_timestamp(email["received_at"])
+            )
+        await db.commit()
+    return counts
+
+
+def _chunks(messages: Iterator[tuple[int, bytes]], size: int) -> Iterator[list[tuple[int, bytes]]]:
+    chunk = []
+    for message in messages:
+        chunk.append(message)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def run_backfill(
+    source: str,
+    senders: tuple[str, ...] = (),
+    concurrency: int | None = None,
+    batch_size: int | None = None,
+    workers: int | None = None,
+    restart: bool = False,
+) -> dict:
+    """Backfill ``source`` from its checkpoint (or the start); returns the final state."""
+    concurrency = concurrency or settings.backfill_concurrency
+    batch_size = batch_size or settings.backfill_batch_size
+    workers = workers or settings.backfill_workers or os.cpu_count() or 1
+    senders = tuple(s.strip().lower() for s in senders if s.strip())
+
+    state = None if restart else read_checkpoint(source)
+    if state is None or state.get("source") != os.path.abspath(source):
+        state = {
+            "source": os.path.abspath(source),
+            "position": 0,
+            "done": False,
+            "counts": {},
+            "started_at": utcnow().isoformat(),
+        }
+    if state["done"]:
+        return state
+    state["status"] = "running"
+
+    def add(name: str, value: int = 1):
+        state["counts"][name] = state["counts"].get(name, 0) + value
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    # spawn, not fork: the app process has an event loop and open connections
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def parse(chunk):
+        raws = [raw for _, raw in chunk]
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, parse_messages, raws[i:i + PARSE_BATCH], senders)
+            for i in range(0, len(raws), PARSE_BATCH)
+        ))
+        return [parsed for part in parts for parsed in part]
+
+    chunks = _chunks(iter_messages(source, state["position"]), batch_size)
+    try:
+        chunk = next(chunks, None)
+        parsing = asyncio.ensure_future(parse(chunk)) if chunk else None
+        while chunk:
+            parsed = await parsing
+            # Decode the next chunk while this one waits on the model
+            following = next(chunks, None)
+            parsing = asyncio.ensure_future(parse(following)) if following else None
+
+            emails = []
+            for item in parsed:
+                if "skip" in item:
+                    add(f"skipped_{item['skip']}")
+                else:
+                    emails.append(item)
+            with ai_priority("backfill"):
+                results = await asyncio.gather(*(analyze(email, semaphore) for email in emails))
+            for result in results:
+                if result["outcome"] != "order":
+                    add(result["outcome"])
+            for action, count in (await apply_chunk(emails, results)).items():
+                add(action, count)
+
+            add("messages", len(chunk))
+            state["position"] = following[0][0] if following else state["position"]
+            state["done"] = following is None
+            state["updated_at"] = utcnow().isoformat()
+            if state["done"]:
+                state["status"] = "done"
+            write_checkpoint(source, state)
+            logger.info(f"Backfill {source}: {state['counts']}")
+            chunk = following
+    except BaseException as e:
+        state["status"] = "interrupted"
+        if isinstance(e, Exception):
+            state["error"] = str(e)
+        write_checkpoint(source, state)
+        raise
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    if not state["done"]:
+        # Empty source, or a checkpoint already at the end
+        state.update(done=True, status="done", updated_at=utcnow().isoformat())
+        write_checkpoint(source, state)
+    return state
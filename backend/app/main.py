@@ -1,35 +1,77 @@
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from .database import engine, Base
-from .routers import orders, settings, webhooks, stats
+from .database import engine, read_engine, AsyncSessionLocal, ReadSessionLocal, pool_stats
+from .settings_store import settings_store
+from .static_files import StaticIndex
+from .compression import CompressionMiddleware
+from .events import broker
+from .recorder import recorder
+from .archive import start_archive_loop
+from .ai import close_client, lend_job_reserve
+from .instrumentation import InstrumentationMiddleware, instrument_engine, registry
+from .logs import setup_logging
+from .routers import orders, settings, webhooks, stats, dashboard, backfill
 import os
+import asyncio
 import logging
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("Starting up - creating tables...")
+    # Schema changes are applied by `alembic upgrade head` before workers start
     try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Database tables created successfully")
+        async with ReadSessionLocal() as db:
+            await settings_store.load(db)
     except Exception as e:
-        logger.error(f"Database error: {e}")
+        logger.error(f"Settings load error: {e}")
+    # Spend the model budget reserved for jobs while none is running
+    settings_store.subscribe(lend_job_reserve)
+    settings_task = asyncio.create_task(settings_store.poll(AsyncSessionLocal))
+    await broker.start()
+    await recorder.start()
+    archive_task = start_archive_loop()
     yield
     logger.info("Shutting down...")
+    settings_task.cancel()
+    if archive_task:
+        archive_task.cancel()
+    await broker.stop()
+    await recorder.stop()
+    await close_client()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
 
 
 app = FastAPI(title="Order Management API", lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(InstrumentationMiddleware)
+
+instrument_engine(engine)
+instrument_engine(read_engine)
+
+DB_POOL = registry.gauge("db_pool_connections", "Connection pool counters", ("pool", "state"))
+
+
+def _collect_pool_stats():
+    for pool, stats in pool_stats().items():
+        for state, value in stats.items():
+            if isinstance(value, int):
+                DB_POOL.set(value, pool=pool, state=state)
+
+
+registry.add_collector(_collect_pool_stats)
 
 app.include_router(orders.router)
 app.include_router(settings.router)
 app.include_router(webhooks.router)
 app.include_router(stats.router)
+app.include_router(dashboard.router)
+app.include_router(backfill.router)
 
 
 @app.get("/api/health")
@@ -37,6 +79,16 @@ async def health():
     return {"status": "ok", "timestamp": "2026-02-22"}
 
 
+@app.get("/api/health/db")
+async def health_db():
+    return {"pools": pool_stats()}
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/debug")
 async def debug():
     static_path = os.path.join(os.path.dirname(__file__), "../static")
@@ -56,39 +108,30 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
-# Get absolute static path
 static_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../static"))
-logger.info(f"Static path: {static_path}")
-logger.info(f"Static exists: {os.path.exists(static_path)}")
-
-if os.path.exists(static_path):
-    app.mount("/static", StaticFiles(directory=static_path), name="static")
-    logger.info("Mounted static files")
+static_index = StaticIndex(static_path)
 
 
 @app.get("/")
-async def root():
-    static_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../static"))
-    index_path = os.path.join(static_path, "index.html")
-    logger.info(f"Root path, index: {index_path}, exists: {os.path.exists(index_path)}")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+async def root(request: Request):
+    response = static_index.index_response(request)
+    if response is not None:
+        return response
     return JSONResponse({"error": "index.html not found", "static_path": static_path})
 
 
 @app.get("/{full_path:path}")
-async def serve_react(full_path: str):
-    static_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../static"))
-    
-    # Try to serve as static file first
-    file_path = os.path.join(static_path, full_path)
-    if os.path.isfile(file_path):
-        return FileResponse(file_path)
-    
+async def serve_react(full_path: str, request: Request):
+    # Built files first; /static/... is kept as an alias of the build root
+    asset = static_index.lookup(full_path)
+    if asset is None and full_path.startswith("static/"):
+        asset = static_index.lookup(full_path[len("static/"):])
+    if asset is not None:
+        return static_index.file_response(request, asset)
+
     # Fallback to index.html for SPA routing
-    index_path = os.path.join(static_path, "index.html")
-    logger.info(f"Serving SPA for: {full_path}, index exists: {os.path.exists(index_path)}")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    
+    response = static_index.index_response(request)
+    if response is not None:
+        return response
+
     return JSONResponse({"error": "Not found", "path": full_path})
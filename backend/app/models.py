@@ -1,32 +1,67 @@
+import secrets
+import time
 import uuid
-from datetime import datetime
-from sqlalchemy import String, Text, DateTime, ForeignKey, Index
+from datetime import date, datetime, timezone
+from typing import Any
+from sqlalchemy import JSON, Date, Integer, LargeBinary, String, Text, DateTime, ForeignKey, Index, Uuid, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .database import Base
 
 
+def new_id() -> str:
+    """UUIDv7 (RFC 9562): millisecond timestamp first, so new keys sort last
+    and inserts append to the primary key index instead of splitting pages."""
+    ms = time.time_ns() // 1_000_000
+    value = (
+        (ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | secrets.randbits(12) << 64
+        | 0b10 << 62
+        | secrets.randbits(62)
+    )
+    return str(uuid.UUID(int=value))
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Order(Base):
     __tablename__ = "orders"
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Native uuid on PostgreSQL, 32-char hex elsewhere; exposed as str
+    id: Mapped[str] = mapped_column(Uuid(as_uuid=False), primary_key=True, default=new_id)
     order_number: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     vendor: Mapped[str | None] = mapped_column(String(100), nullable=True)
     customer_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     status: Mapped[str] = mapped_column(String(50), default="Ordered")
     location: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # What the email said, and the date parsed from it (app.dates)
     expected_date: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    expected_on: Mapped[date | None] = mapped_column(Date, nullable=True)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
 
     items: Mapped[list["OrderItem"]] = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Only undelivered orders are ever asked about by due date
+        Index(
+            "ix_orders_expected_on_open", "expected_on",
+            postgresql_where=text("status <> 'Delivered'"),
+            sqlite_where=text("status <> 'Delivered'"),
+        ),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    order_id: Mapped[str] = mapped_column(String(36), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    id: Mapped[str] = mapped_column(Uuid(as_uuid=False), primary_key=True, default=new_id)
+    order_id: Mapped[str] = mapped_column(
+        Uuid(as_uuid=False), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
     item_name: Mapped[str | None] = mapped_column(Text, nullable=True)
     quantity: Mapped[int] = mapped_column(default=1)
     price: Mapped[float | None] = mapped_column(nullable=True)
@@ -35,8 +70,59 @@ class OrderItem(Base):
     order: Mapped["Order"] = relationship("Order", back_populates="items")
 
 
+class ArchivedOrder(Base):
+    """Delivered orders moved out of ``orders`` by ``app.archive``; same columns."""
+    __tablename__ = "archived_orders"
+
+    id: Mapped[str] = mapped_column(Uuid(as_uuid=False), primary_key=True)
+    order_number: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
+    vendor: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    customer_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    status: Mapped[str] = mapped_column(String(50))
+    location: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    expected_date: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    expected_on: Mapped[date | None] = mapped_column(Date, nullable=True)
+    notes: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "archived_order_items"
+
+    id: Mapped[str] = mapped_column(Uuid(as_uuid=False), primary_key=True)
+    order_id: Mapped[str] = mapped_column(
+        Uuid(as_uuid=False), ForeignKey("archived_orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    item_name: Mapped[str | None] = mapped_column(Text, nullable=True)
+    quantity: Mapped[int] = mapped_column(default=1)
+    price: Mapped[float | None] = mapped_column(nullable=True)
+    currency: Mapped[str] = mapped_column(String(3), default="AED")
+
+
+class RawEmail(Base):
+    """An email an order was extracted from, kept for re-extraction.
+
+    Subject, body and sender are one compressed JSON document; see
+    ``app.raw_emails``. ``order_id`` has no foreign key so the link survives
+    the order moving to ``archived_orders``.
+    """
+    __tablename__ = "raw_emails"
+
+    id: Mapped[str] = mapped_column(Uuid(as_uuid=False), primary_key=True, default=new_id)
+    content_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False, index=True)
+    codec: Mapped[str] = mapped_column(String(10))
+    content: Mapped[bytes] = mapped_column(LargeBinary)
+    size: Mapped[int] = mapped_column(Integer)
+    order_id: Mapped[str | None] = mapped_column(Uuid(as_uuid=False), nullable=True, index=True)
+    received_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Prompt and models the linked order's fields were last extracted with
+    extraction_version: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+
+
 class Setting(Base):
     __tablename__ = "order_settings"
 
     key: Mapped[str] = mapped_column(String(100), primary_key=True)
-    value: Mapped[str | None] = mapped_column(Text, nullable=True)
+    value: Mapped[Any] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
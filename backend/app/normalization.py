@@ -0,0 +1,181 @@
+import re
+import logging
+from .settings_store import settings_store, SettingsStore
+
+logger = logging.getLogger(__name__)
+
+# Extra spellings the model tends to return, keyed by the default vendor name.
+# Only used when that vendor is present in the configured ``vendors`` list.
+DEFAULT_VENDOR_ALIASES = {
+    "Amazon": ["amazon.ae", "amazon.com", "amazon.in", "amazon uae", "amazon prime", "amzn"],
+    "Noon": ["noon.com", "noon.ae", "noon uae", "noon minutes"],
+    "Namshi": ["namshi.com"],
+    "Sharaf DG": ["sharafdg", "sharafdg.com", "sharaf"],
+    "Carrefour": ["carrefouruae", "carrefouruae.com", "carrefourkw.com", "carrefour uae", "mafcarrefour"],
+}
+
+DEFAULT_SENDER_DOMAINS = {
+    "amazon.ae": "Amazon",
+    "amazon.com": "Amazon",
+    "amazon.in": "Amazon",
+    "noon.com": "Noon",
+    "noon.ae": "Noon",
+    "namshi.com": "Namshi",
+    "sharafdg.com": "Sharaf DG",
+    "carrefouruae.com": "Carrefour",
+    "carrefourkw.com": "Carrefour",
+}
+
+DEFAULT_STATUS_ALIASES = {
+    "Ordered": ["order placed", "placed", "confirmed", "order confirmed", "order received", "received", "processing"],
+    "Shipped": ["dispatched", "in transit", "on the way", "shipped out"],
+    "Out for Delivery": ["out for delivery", "outfordelivery", "arriving today"],
+    "Delivered": ["arrived", "package delivered", "completed"],
+}
+
+# Words that do not distinguish one vendor from another ("Noon UAE", "Amazon.ae")
+_NOISE_TOKENS = {"uae", "ae", "ksa", "com", "in", "store", "shop", "online", "the"}
+
+_SEPARATORS = re.compile(r"[\s\-_.,/&'()]+")
+_EMAIL_DOMAIN = re.compile(r"@([\w.-]+)")
+
+
+def fold(value: str) -> str:
+    """Case-fold and strip separators: ``" Sharaf-DG "`` -> ``"sharafdg"``."""
+    return _SEPARATORS.sub("", value.casefold())
+
+
+def _tokens(value: str) -> list[str]:
+    return [t for t in _SEPARATORS.split(value.casefold()) if t]
+
+
+def sender_domain(from_email: str | None) -> str | None:
+    if not from_email:
+        return None
+    match = _EMAIL_DOMAIN.search(from_email)
+    return match.group(1).casefold().rstrip(".") if match else None
+
+
+class Normalizer:
+    """Precompiled lookup tables mapping free-form names to canonical ones."""
+
+    def __init__(
+        self,
+        vendors: list[str],
+        statuses: list[str],
+        vendor_aliases: dict[str, str] | None = None,
+        status_aliases: dict[str, str] | None = None,
+        sender_domains: dict[str, str] | None = None,
+    ):
+        self.vendors = list(vendors)
+        self.statuses = list(statuses)
+        self._vendor_index = self._build(vendors, DEFAULT_VENDOR_ALIASES, vendor_aliases)
+        self._status_index = self._build(statuses, DEFAULT_STATUS_ALIASES, status_aliases)
+
+        self._domains: dict[str, str] = {}
+        for domain, vendor in {**DEFAULT_SENDER_DOMAINS, **(sender_domains or {})}.items():
+            canonical = self._vendor_index.get(fold(vendor))
+            if canonical:
+                self._domains[domain.casefold()] = canonical
+
+    @staticmethod
+    def _build(canonical: list[str], defaults: dict[str, list[str]], extra: dict[str, str] | None) -> dict[str, str]:
+        index = {}
+        for name in canonical:
+            index[fold(name)] = name
+            for alias in defaults.get(name, []):
+                index.setdefault(fold(alias), name)
+        # Configured aliases win over the built-in ones
+        for alias, name in (extra or {}).items():
+            target = index.get(fold(name))
+            if target:
+                index[fold(alias)] = target
+        return index
+
+    def _lookup(self, index: dict[str, str], value: str) -> str | None:
+        key = fold(value)
+        if key in index:
+            return index[key]
+        tokens = [t for t in _tokens(value) if t not in _NOISE_TOKENS]
+        if tokens:
+            key = "".join(tokens)
+            if key in index:
+                return index[key]
+            if tokens[0] in index:
+                return index[tokens[0]]
+        return None
+
+    def vendor(self, value: str | None, from_email: str | None = None) -> str | None:
+        """Canonical vendor for ``value``, falling back to the sender domain.
+
+        Unrecognised names are returned trimmed rather than discarded.
+        """
+        if value:
+            match = self._lookup(self._vendor_index, value)
+            if match:
+                return match
+        domain = sender_domain(from_email)
+        while domain:
+            if domain in self._domains:
+                return self._domains[domain]
+            _, _, domain = domain.partition(".")
+        if value and value.strip():
+            return value.strip()
+        return None
+
+    def status(self, value: str | None) -> str | None:
+        if not value:
+            return None
+        return self._lookup(self._status_index, value) or value.strip()
+
+    def advances(self, current: str | None, new: str | None) -> bool:
+        """Whether ``new`` is later than ``current`` in the configured status order.
+
+        Statuses outside the configured list can't be ordered and always count
+        as a move.
+        """
+        current, new = self.status(current), self.status(new)
+        if current not in self.statuses or new not in self.statuses:
+            return current != new
+        return self.statuses.index(new) > self.statuses.index(current)
+
+
+def _config(store: SettingsStore) -> tuple:
+    return (
+        tuple(store.vendors),
+        tuple(store.statuses),
+        tuple(sorted((store.get("vendor_aliases") or {}).items())),
+        tuple(sorted((store.get("status_aliases") or {}).items())),
+        tuple(sorted((store.get("sender_domains") or {}).items())),
+    )
+
+
+_normalizer: Normalizer | None = None
+_normalizer_config: tuple | None = None
+
+
+def _rebuild(store: SettingsStore):
+    global _normalizer, _normalizer_config
+    config = _config(store)
+    if config == _normalizer_config:
+        return
+    vendors, statuses, vendor_aliases, status_aliases, sender_domains = config
+    _normalizer = Normalizer(
+        list(vendors),
+        list(statuses),
+        dict(vendor_aliases),
+        dict(status_aliases),
+        dict(sender_domains),
+    )
+    _normalizer_config = config
+    logger.info(f"Normalization index rebuilt ({len(vendors)} vendors, {len(statuses)} statuses)")
+
+
+def get_normalizer() -> Normalizer:
+    """Current normalizer; rebuilt automatically when settings change."""
+    if _normalizer is None:
+        _rebuild(settings_store)
+    return _normalizer
+
+
+settings_store.subscribe(_rebuild)
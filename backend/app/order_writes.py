@@ -0,0 +1,55 @@
+"""Helpers shared by everything that writes orders from extracted data.
+
+The webhook, the mailbox backfill, the re-extraction job and
+``PUT /api/orders/{id}`` compare incoming values with the stored order and
+write only what differs; the comparison helpers and the counters for the
+writes they save live here.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from .instrumentation import registry
+from .models import OrderItem, new_id
+
+ORDER_WRITES_SKIPPED = registry.counter(
+    "order_writes_skipped_total", "Order updates that matched the stored row and were not written", ("source",)
+)
+STATUS_REGRESSIONS = registry.counter(
+    "order_status_regressions_total", "Email statuses ignored because the order is already further along"
+)
+
+
+def is_missing(value) -> bool:
+    """Extracted values that carry no information."""
+    return value in (None, "", "Unknown")
+
+
+def parse_price(price):
+    if isinstance(price, str):
+        try:
+            return float(price.replace("AED", "").replace("$", "").strip())
+        except ValueError:
+            return None
+    return price
+
+
+def add_items(db: AsyncSession, order_id: str, items: list[dict]):
+    for item in items:
+        db.add(OrderItem(
+            id=new_id(),
+            order_id=order_id,
+            item_name=item.get("item_name"),
+            quantity=item.get("quantity", 1),
+            price=parse_price(item.get("price")),
+            currency=item.get("currency", "AED")
+        ))
+
+
+def item_rows(items) -> list[tuple]:
+    """Comparable form of extracted item dicts, request items or ``OrderItem`` rows."""
+    rows = []
+    for item in items:
+        if isinstance(item, dict):
+            rows.append((item.get("item_name"), item.get("quantity", 1),
+                         parse_price(item.get("price")), item.get("currency", "AED")))
+        else:
+            rows.append((item.item_name, item.quantity, item.price, item.currency))
+    return sorted(rows, key=repr)
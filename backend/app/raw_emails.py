@@ -0,0 +1,102 @@
+"""Compressed store of the emails orders are extracted from.
+
+Each distinct email is kept once, keyed by the SHA-256 of its sender,
+subject and body, as a zstd-compressed JSON document (zlib when zstandard
+is not installed), so a redelivered webhook or a replayed mailbox adds
+nothing. ``order_id`` links the email to the order it produced, and
+``app.jobs.reextract_orders`` runs the stored emails through the current
+prompt and models.
+"""
+import hashlib
+import json
+import logging
+import zlib
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .dates import as_utc
+from .models import RawEmail
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+def should_store(is_order: bool) -> bool:
+    """``raw_email_store``: "orders" keeps emails that produced an order, "all" every email."""
+    mode = settings.raw_email_store
+    return mode == "all" or (mode == "orders" and is_order)
+
+
+def content_hash(subject: str, body: str, sender: str) -> str:
+    return hashlib.sha256("\0".join([sender or "", subject or "", body or ""]).encode()).hexdigest()
+
+
+def compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=settings.raw_email_zstd_level).compress(data)
+    return "zlib", zlib.compress(data)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed raw emails")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+def unpack(raw: RawEmail) -> dict:
+    """``{"subject", "body", "from"}`` of a stored email."""
+    return json.loads(decompress(raw.codec, raw.content))
+
+
+async def store_raw_email(
+    db: AsyncSession,
+    subject: str,
+    body: str,
+    sender: str,
+    received_at: datetime | None = None,
+    order_id: str | None = None,
+    extraction_version: str | None = None,
+) -> RawEmail:
+    """Store the email unless its hash is already there, and link it; caller commits."""
+    digest = content_hash(subject, body, sender)
+    if received_at is not None:
+        # SQLite keeps the wall time and drops the offset
+        received_at = as_utc(received_at)
+    existing = (await db.execute(select(RawEmail).where(RawEmail.content_hash == digest))).scalar_one_or_none()
+    if existing is None:
+        document = json.dumps({"subject": subject, "body": body, "from": sender}).encode()
+        codec, content = compress(document)
+        raw = RawEmail(
+            content_hash=digest,
+            codec=codec,
+            content=content,
+            size=len(document),
+            order_id=order_id,
+            received_at=received_at,
+            extraction_version=extraction_version,
+        )
+        try:
+            async with db.begin_nested():
+                db.add(raw)
+            return raw
+        except IntegrityError:
+            # Stored by a concurrent delivery of the same email since the lookup
+            existing = (await db.execute(select(RawEmail).where(RawEmail.content_hash == digest))).scalar_one()
+
+    if order_id is not None:
+        existing.order_id = order_id
+    if extraction_version is not None:
+        existing.extraction_version = extraction_version
+    if received_at is not None and existing.received_at is None:
+        existing.received_at = received_at
+    return existing
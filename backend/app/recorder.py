@@ -0,0 +1,161 @@
+"""Opt-in recording of webhook traffic for offline replay.
+
+When ``WEBHOOK_RECORD_DIR`` is set, each webhook's payload and the model's
+classification/extraction answers are appended to gzip NDJSON files, one
+per worker. Email addresses, phone numbers and the extracted customer name
+are pseudonymised before anything is written; sender domains and order
+numbers are kept so replays follow the same create/update paths.
+
+Recording happens on a background task: the request only enqueues, and a
+full queue drops the record rather than slowing the webhook down.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from .config import settings
+from .instrumentation import registry
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 1000
+FORMAT_VERSION = 1
+
+RECORDS = registry.counter("webhook_records_total", "Webhook recordings by outcome", ("outcome",))
+
+EMAIL = re.compile(r"([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Za-z]{2,})")
+# International numbers and UAE mobiles; order numbers have no "+" or 05 prefix
+PHONE = re.compile(r"(?:\+\d{1,3}|\b00\d{1,3}|\b05\d)[\s-]?\d[\d\s-]{5,}\d")
+
+
+def _pseudonym(value: str, length: int = 8) -> str:
+    return hashlib.sha256(value.lower().encode()).hexdigest()[:length]
+
+
+class Sanitizer:
+    def __init__(self, customer_name: str | None = None):
+        self.name_pattern = None
+        self.name_replacement = None
+        name = (customer_name or "").strip()
+        if len(name) >= 3 and name.lower() != "unknown":
+            self.name_pattern = re.compile(re.escape(name), re.IGNORECASE)
+            self.name_replacement = f"Customer {_pseudonym(name, 4)}"
+
+    def text(self, value: str) -> str:
+        value = EMAIL.sub(lambda m: f"user-{_pseudonym(m.group(1))}@{m.group(2)}", value)
+        value = PHONE.sub(lambda m: re.sub(r"\d", "0", m.group(0)), value)
+        if self.name_pattern is not None:
+            value = self.name_pattern.sub(self.name_replacement, value)
+        return value
+
+    def __call__(self, value):
+        if isinstance(value, str):
+            return self.text(value)
+        if isinstance(value, dict):
+            return {k: self(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self(v) for v in value]
+        return value
+
+
+def sanitize_record(record: dict) -> dict:
+    extraction = record.get("extraction") or {}
+    sanitize = Sanitizer(extraction.get("customer_name") if isinstance(extraction, dict) else None)
+    return {key: sanitize(value) if key in ("payload", "classification", "extraction") else value
+            for key, value in record.items()}
+
+
+class WebhookRecorder:
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._file = None
+        self._written = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._queue is not None
+
+    async def start(self):
+        if not settings.webhook_record_dir:
+            return
+        os.makedirs(settings.webhook_record_dir, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Recording webhooks to {settings.webhook_record_dir}")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(self, payload: dict, result: dict, timings: dict[str, float] | None = None):
+        """Queue one webhook; ``result`` is the handler's response."""
+        if self._queue is None or random.random() >= settings.webhook_record_sample_rate:
+            return
+        record = {
+            "v": FORMAT_VERSION,
+            "ts": time.time(),
+            "payload": payload,
+            "action": result.get("action"),
+            "classification": result.get("classification"),
+            "extraction": result.get("extraction"),
+            "timings": {k: round(v, 4) for k, v in (timings or {}).items()},
+        }
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            RECORDS.inc(outcome="dropped")
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            records = [r for r in batch if r is not None]
+            if records:
+                try:
+                    await asyncio.to_thread(self._write, records)
+                    RECORDS.inc(len(records), outcome="recorded")
+                except Exception as e:
+                    RECORDS.inc(len(records), outcome="failed")
+                    logger.warning(f"Webhook recording failed: {e}")
+            if len(records) < len(batch):
+                return
+
+    def _write(self, records: list[dict]):
+        if self._file is None or self._written >= settings.webhook_record_max_mb * 1024 * 1024:
+            if self._file is not None:
+                self._file.close()
+            name = f"webhooks-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.ndjson.gz"
+            self._file = gzip.open(os.path.join(settings.webhook_record_dir, name), "ab")
+            self._written = 0
+        data = "".join(json.dumps(sanitize_record(r), default=str) + "\n" for r in records).encode()
+        self._file.write(data)
+        # Sync flush so a crashed worker leaves a readable file
+        self._file.flush()
+        self._written += len(data)
+
+
+recorder = WebhookRecorder()
+
+
+def read_recordings(paths: list[str]):
+    """Yield records from recorded files in the order they were written."""
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
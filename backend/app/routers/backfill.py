@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException
+from ..config import settings
+from ..mailbox import read_checkpoint, run_backfill
+from ..schemas import BackfillRequest
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/backfill", tags=["backfill"])
+
+# Runs started by this worker, by absolute source path
+running: dict[str, asyncio.Task] = {}
+
+
+def resolve_source(source: str) -> str:
+    """Absolute path of ``source`` inside BACKFILL_DIR, or an HTTP error."""
+    if not settings.backfill_dir:
+        raise HTTPException(status_code=404, detail="Backfill is not enabled (set BACKFILL_DIR)")
+    root = os.path.realpath(settings.backfill_dir)
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root:
+        raise HTTPException(status_code=400, detail="Source must be inside BACKFILL_DIR")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Source not found")
+    return path
+
+
+@router.post("", status_code=202)
+async def start_backfill(body: BackfillRequest):
+    """Start (or resume) a mailbox backfill in the background; poll GET for progress."""
+    path = resolve_source(body.source)
+    task = running.get(path)
+    if task and not task.done():
+        raise HTTPException(status_code=409, detail="Backfill already running for this source")
+
+    async def run():
+        try:
+            await run_backfill(
+                path, tuple(body.senders), body.concurrency, body.batch_size, restart=body.restart
+            )
+        except Exception as e:
+            logger.error(f"Backfill of {path} failed: {e}")
+        finally:
+            running.pop(path, None)
+
+    running[path] = asyncio.create_task(run())
+    return {"source": body.source, "status": "running", "checkpoint": read_checkpoint(path)}
+
+
+@router.get("")
+async def backfill_status(source: str):
+    """Progress from the checkpoint, so any worker can answer."""
+    path = resolve_source(source)
+    state = read_checkpoint(path)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No backfill for this source")
+    return state
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException
+from ..database import ReadSessionLocal
+from ..schemas import DashboardResponse
+from ..settings_store import settings_store
+from .orders import query_orders
+from .stats import compute_stats
+import asyncio
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+DASHBOARD_PARTS = ("orders", "stats", "settings")
+
+
+@router.get("", response_model=DashboardResponse, response_model_exclude_unset=True)
+async def get_dashboard(
+    include: str = ",".join(DASHBOARD_PARTS),
+    status: str = None,
+    vendor: str = None,
+    search: str = None,
+    limit: int = 100,
+    offset: int = 0,
+    fields: str = None,
+    include_items: str = "full",
+    include_archived: bool = False,
+):
+    """First orders page, stats and settings in one round trip.
+
+    Each part runs on its own pooled read session so the queries overlap.
+    ``include`` selects a subset, e.g. ``include=orders,stats``; ``fields``
+    and ``include_items`` apply to the orders page as in ``GET /api/orders``,
+    ``include_archived`` to both the orders page and the stats.
+    """
+    parts = [p.strip() for p in include.split(",") if p.strip()]
+    unknown = set(parts) - set(DASHBOARD_PARTS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dashboard parts: {', '.join(sorted(unknown))}")
+
+    async def load_orders():
+        async with ReadSessionLocal() as db:
+            return await query_orders(
+                db, status, vendor, search, limit, offset, fields, include_items, include_archived
+            )
+
+    async def load_stats():
+        async with ReadSessionLocal() as db:
+            return await compute_stats(db, include_archived)
+
+    async def load_settings():
+        if not settings_store.loaded:
+            async with ReadSessionLocal() as db:
+                await settings_store.ensure_loaded(db)
+        return settings_store.all()
+
+    loaders = {"orders": load_orders, "stats": load_stats, "settings": load_settings}
+    names = [p for p in DASHBOARD_PARTS if p in parts]
+    results = await asyncio.gather(*(loaders[name]() for name in names))
+    return dict(zip(names, results))
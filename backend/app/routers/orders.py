@@ -1,19 +1,130 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
-from datetime import datetime
-from ..database import get_db
-from ..models import Order, OrderItem, Setting
+from ..archive import is_archived, item_source, order_source
+from ..database import get_db, get_read_db
+from ..dates import local_today, parse_expected_date
+from ..events import broker, notify_order_change
+from ..models import Order, OrderItem, Setting, new_id, utcnow
+from ..order_writes import ORDER_WRITES_SKIPPED, item_rows
 from ..schemas import (
     OrderCreate, OrderUpdate, OrderResponse, OrderListResponse,
+    OrderPartialResponse, OrderPageResponse,
     SettingResponse, VendorsResponse, StatusesResponse
 )
+from datetime import timedelta
 import uuid
+import asyncio
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
 
+ORDER_FIELDS = (
+    "id", "order_number", "vendor", "customer_name", "status",
+    "location", "expected_date", "expected_on", "notes", "created_at", "updated_at",
+)
+ITEM_MODES = ("full", "count", "false")
+UPDATE_FIELDS = ("order_number", "vendor", "customer_name", "status", "location", "expected_date", "notes")
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    """Validate a ``fields=a,b`` parameter; ``id`` is always included."""
+    if not fields:
+        return list(ORDER_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(names) - set(ORDER_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return ["id"] + [f for f in ORDER_FIELDS if f in names and f != "id"]
+
+
+def parse_include_items(include_items: str) -> str:
+    if include_items not in ITEM_MODES:
+        raise HTTPException(status_code=400, detail=f"include_items must be one of: {', '.join(ITEM_MODES)}")
+    return include_items
+
+
+def select_orders(names: list[str], include_items: str, include_archived: bool = False):
+    """SELECT only the requested order columns, plus an item count if asked.
+
+    Reads ``orders`` alone unless ``include_archived`` adds the archive.
+    """
+    orders, items = order_source(include_archived), item_source(include_archived)
+    columns = [orders.c[name] for name in names]
+    if include_items == "count":
+        item_count = (
+            select(func.count(items.c.id))
+            .where(items.c.order_id == orders.c.id)
+            .correlate(orders)
+            .scalar_subquery()
+            .label("item_count")
+        )
+        columns.append(item_count)
+    return select(*columns), orders
+
+
+def item_to_response(item):
+    return {
+        "id": item.id,
+        "order_id": item.order_id,
+        "item_name": item.item_name,
+        "quantity": item.quantity,
+        "price": item.price,
+        "currency": item.currency
+    }
+
+
+def row_to_response(row, names: list[str]) -> dict:
+    data = {}
+    for name in names:
+        value = getattr(row, name)
+        if name in ("created_at", "updated_at"):
+            value = value.isoformat() if value else ""
+        elif name == "expected_on":
+            value = value.isoformat() if value else None
+        data[name] = value
+    if "item_count" in row._fields:
+        data["item_count"] = row.item_count
+    return data
+
+
+async def attach_items(db: AsyncSession, orders: list[dict], include_archived: bool = False):
+    """Load items for all ``orders`` with one IN query."""
+    if not orders:
+        return
+    by_id = {o["id"]: o for o in orders}
+    for o in orders:
+        o["items"] = []
+    items = item_source(include_archived)
+    result = await db.execute(select(items).where(items.c.order_id.in_(by_id)))
+    for item in result.all():
+        by_id[item.order_id]["items"].append(item_to_response(item))
+
+
+async def fetch_order(
+    db: AsyncSession,
+    column: str,
+    value: str,
+    fields: str = None,
+    include_items: str = "full",
+    include_archived: bool = False,
+) -> dict:
+    """The one order whose ``column`` equals ``value``, or 404."""
+    names = parse_fields(fields)
+    include_items = parse_include_items(include_items)
+    query, orders = select_orders(names, include_items, include_archived)
+    result = await db.execute(query.where(orders.c[column] == value))
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Order not found")
+    order = row_to_response(row, names)
+    if include_items == "full":
+        await attach_items(db, [order], include_archived)
+    return order
+
+
 def order_to_response(order):
     return {
         "id": order.id,
@@ -23,87 +134,201 @@ def order_to_response(order):
         "status": order.status,
         "location": order.location,
         "expected_date": order.expected_date,
+        "expected_on": order.expected_on.isoformat() if order.expected_on else None,
         "notes": order.notes,
         "created_at": order.created_at.isoformat() if order.created_at else "",
         "updated_at": order.updated_at.isoformat() if order.updated_at else "",
-        "items": [
-            {
-                "id": item.id,
-                "order_id": item.order_id,
-                "item_name": item.item_name,
-                "quantity": item.quantity,
-                "price": item.price,
-                "currency": item.currency
-            }
-            for item in order.items
-        ]
+        "items": [item_to_response(item) for item in order.items]
     }
 
 
-@router.get("", response_model=OrderListResponse)
-async def list_orders(
+def valid_order_id(order_id: str) -> str:
+    """``order_id`` unchanged, or 404 for a malformed id (uuid columns reject it)."""
+    try:
+        uuid.UUID(order_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order_id
+
+
+def order_id_condition(order_id: str):
+    return Order.id == valid_order_id(order_id)
+
+
+def search_condition(search: str, orders=Order.__table__):
+    """Case-insensitive substring match; ILIKE on PostgreSQL, lower() LIKE elsewhere."""
+    return (
+        orders.c.order_number.icontains(search, autoescape=True)
+        | orders.c.customer_name.icontains(search, autoescape=True)
+    )
+
+
+async def query_orders(
+    db: AsyncSession,
     status: str = None,
     vendor: str = None,
     search: str = None,
     limit: int = 50,
     offset: int = 0,
-    db: AsyncSession = Depends(get_db)
-):
-    query = select(Order)
-    count_query = select(func.count(Order.id))
+    fields: str = None,
+    include_items: str = "full",
+    include_archived: bool = False,
+) -> dict:
+    """One page of orders plus the total matching count.
+
+    ``fields`` limits the selected columns and ``include_items`` chooses
+    between a second items query (``full``), a correlated count subquery
+    (``count``) or no items at all (``false``). Archived orders are left
+    out unless ``include_archived`` is set.
+    """
+    names = parse_fields(fields)
+    include_items = parse_include_items(include_items)
+    query, source = select_orders(names, include_items, include_archived)
+    count_query = select(func.count(source.c.id))
     
     if status:
-        query = query.where(Order.status == status)
-        count_query = count_query.where(Order.status == status)
+        query = query.where(source.c.status == status)
+        count_query = count_query.where(source.c.status == status)
     if vendor:
-        query = query.where(Order.vendor == vendor)
-        count_query = count_query.where(Order.vendor == vendor)
+        query = query.where(source.c.vendor == vendor)
+        count_query = count_query.where(source.c.vendor == vendor)
     if search:
-        query = query.where(
-            (Order.order_number.ilike(f"%{search}%")) | 
-            (Order.customer_name.ilike(f"%{search}%"))
-        )
-        count_query = count_query.where(
-            (Order.order_number.ilike(f"%{search}%")) | 
-            (Order.customer_name.ilike(f"%{search}%"))
-        )
+        query = query.where(search_condition(search, source))
+        count_query = count_query.where(search_condition(search, source))
     
-    query = query.options(selectinload(Order.items)).order_by(Order.created_at.desc()).limit(limit).offset(offset)
+    query = query.order_by(source.c.created_at.desc()).limit(limit).offset(offset)
     
     result = await db.execute(query)
-    orders = result.scalars().all()
+    orders = [row_to_response(row, names) for row in result.all()]
+    if include_items == "full":
+        await attach_items(db, orders, include_archived)
     
     total_result = await db.execute(count_query)
     total = total_result.scalar() or 0
     
-    return {"orders": [order_to_response(o) for o in orders], "total": total}
+    return {"orders": orders, "total": total}
 
 
-@router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Order).options(selectinload(Order.items)).where(Order.id == order_id)
+@router.get("", response_model=OrderPageResponse, response_model_exclude_unset=True)
+async def list_orders(
+    status: str = None,
+    vendor: str = None,
+    search: str = None,
+    limit: int = 50,
+    offset: int = 0,
+    fields: str = None,
+    include_items: str = "full",
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    return await query_orders(db, status, vendor, search, limit, offset, fields, include_items, include_archived)
+
+
+DUE_WINDOWS = ("today", "overdue", "upcoming")
+
+
+def due_condition(when: str, days: int):
+    """``expected_on`` range for undelivered orders, matching the partial index."""
+    if when not in DUE_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"when must be one of: {', '.join(DUE_WINDOWS)}")
+    if days < 0:
+        raise HTTPException(status_code=400, detail="days must not be negative")
+    today = local_today()
+    if when == "today":
+        window = Order.expected_on == today
+    elif when == "overdue":
+        window = Order.expected_on < today
+    else:
+        window = Order.expected_on.between(today, today + timedelta(days=days))
+    return (Order.status != "Delivered") & window
+
+
+@router.get("/due", response_model=OrderPageResponse, response_model_exclude_unset=True)
+async def list_due_orders(
+    when: str = "today",
+    days: int = 3,
+    limit: int = 50,
+    offset: int = 0,
+    fields: str = None,
+    include_items: str = "full",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Undelivered orders expected today, already overdue, or within ``days`` days."""
+    condition = due_condition(when, days)
+    names = parse_fields(fields)
+    include_items = parse_include_items(include_items)
+    query, _ = select_orders(names, include_items)
+    query = (
+        query
+        .where(condition)
+        .order_by(Order.expected_on, Order.id)
+        .limit(limit)
+        .offset(offset)
     )
-    order = result.scalar_one_or_none()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    return order_to_response(order)
+    result = await db.execute(query)
+    orders = [row_to_response(row, names) for row in result.all()]
+    if include_items == "full":
+        await attach_items(db, orders)
+
+    total = (await db.execute(select(func.count(Order.id)).where(condition))).scalar() or 0
+    return {"orders": orders, "total": total}
+
+
+# Comment line sent when idle so proxies keep the connection open
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+@router.get("/stream")
+async def stream_orders(request: Request):
+    """Server-Sent Events feed of created/updated/deleted order deltas."""
+    queue = broker.subscribe()
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: order\ndata: {payload}\n\n"
+        finally:
+            broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{order_id}", response_model=OrderPartialResponse, response_model_exclude_unset=True)
+async def get_order(
+    order_id: str,
+    fields: str = None,
+    include_items: str = "full",
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    return await fetch_order(db, "id", valid_order_id(order_id), fields, include_items, include_archived)
 
 
 @router.post("", response_model=OrderResponse, status_code=201)
 async def create_order(body: OrderCreate, db: AsyncSession = Depends(get_db)):
     existing = await db.execute(select(Order).where(Order.order_number == body.order_number))
-    if existing.scalar_one_or_none():
+    if existing.scalar_one_or_none() or await is_archived(db, body.order_number):
         raise HTTPException(status_code=400, detail="Order number already exists")
     
     order = Order(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         order_number=body.order_number,
         vendor=body.vendor,
         customer_name=body.customer_name,
         status=body.status,
         location=body.location,
         expected_date=body.expected_date,
+        expected_on=parse_expected_date(body.expected_date),
         notes=body.notes
     )
     db.add(order)
@@ -111,7 +336,7 @@ async def create_order(body: OrderCreate, db: AsyncSession = Depends(get_db)):
     if body.items:
         for item in body.items:
             order_item = OrderItem(
-                id=str(uuid.uuid4()),
+                id=new_id(),
                 order_id=order.id,
                 item_name=item.item_name,
                 quantity=item.quantity,
@@ -120,6 +345,7 @@ async def create_order(body: OrderCreate, db: AsyncSession = Depends(get_db)):
             )
             db.add(order_item)
     
+    await notify_order_change(db, "created", order)
     await db.commit()
     await db.refresh(order)
     
@@ -132,43 +358,47 @@ async def create_order(body: OrderCreate, db: AsyncSession = Depends(get_db)):
 
 @router.put("/{order_id}", response_model=OrderResponse)
 async def update_order(order_id: str, body: OrderUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).where(Order.id == order_id))
+    result = await db.execute(select(Order).where(order_id_condition(order_id)))
     order = result.scalar_one_or_none()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    if body.order_number is not None:
-        order.order_number = body.order_number
-    if body.vendor is not None:
-        order.vendor = body.vendor
-    if body.customer_name is not None:
-        order.customer_name = body.customer_name
-    if body.status is not None:
-        order.status = body.status
-    if body.location is not None:
-        order.location = body.location
-    if body.expected_date is not None:
-        order.expected_date = body.expected_date
-    if body.notes is not None:
-        order.notes = body.notes
-    
-    order.updated_at = datetime.utcnow()
-    
+    changes = {}
+    for field in UPDATE_FIELDS:
+        value = getattr(body, field)
+        if value is not None and value != getattr(order, field):
+            changes[field] = value
+    if "expected_date" in changes:
+        changes["expected_on"] = parse_expected_date(body.expected_date)
+    items_changed = False
     if body.items is not None:
-        await db.execute(OrderItem.__table__.delete().where(OrderItem.order_id == order_id))
-        for item in body.items:
-            order_item = OrderItem(
-                id=str(uuid.uuid4()),
-                order_id=order.id,
-                item_name=item.item_name,
-                quantity=item.quantity,
-                price=item.price,
-                currency=item.currency
-            )
-            db.add(order_item)
+        stored = await db.execute(select(OrderItem).where(OrderItem.order_id == order.id))
+        items_changed = item_rows(body.items) != item_rows(stored.scalars())
     
-    await db.commit()
-    await db.refresh(order)
+    if changes or items_changed:
+        for field, value in changes.items():
+            setattr(order, field, value)
+        order.updated_at = utcnow()
+        
+        if items_changed:
+            await db.execute(OrderItem.__table__.delete().where(OrderItem.order_id == order.id))
+            for item in body.items:
+                order_item = OrderItem(
+                    id=new_id(),
+                    order_id=order.id,
+                    item_name=item.item_name,
+                    quantity=item.quantity,
+                    price=item.price,
+                    currency=item.currency
+                )
+                db.add(order_item)
+        
+        await notify_order_change(db, "updated", order)
+        await db.commit()
+        await db.refresh(order)
+    else:
+        # Nothing differs: no UPDATE, no updated_at bump and no event
+        ORDER_WRITES_SKIPPED.inc(source="api")
     
     result = await db.execute(
         select(Order).options(selectinload(Order.items)).where(Order.id == order.id)
@@ -179,22 +409,23 @@ async def update_order(order_id: str, body: OrderUpdate, db: AsyncSession = Depe
 
 @router.delete("/{order_id}")
 async def delete_order(order_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).where(Order.id == order_id))
+    result = await db.execute(select(Order).where(order_id_condition(order_id)))
     order = result.scalar_one_or_none()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    await notify_order_change(db, "deleted", order)
     await db.delete(order)
     await db.commit()
     return {"message": "Order deleted successfully"}
 
 
-@router.get("/search/{order_number}", response_model=OrderResponse)
-async def search_order(order_number: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Order).options(selectinload(Order.items)).where(Order.order_number == order_number)
-    )
-    order = result.scalar_one_or_none()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    return order_to_response(order)
+@router.get("/search/{order_number}", response_model=OrderPartialResponse, response_model_exclude_unset=True)
+async def search_order(
+    order_number: str,
+    fields: str = None,
+    include_items: str = "full",
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    return await fetch_order(db, "order_number", order_number, fields, include_items, include_archived)
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from datetime import datetime
-from ..database import get_db
-from ..models import Order
+from ..archive import order_source
+from ..database import get_read_db
+from ..models import Order, utcnow
 from ..schemas import StatsResponse
 
 router = APIRouter(prefix="/api/stats", tags=["stats"])
@@ -18,6 +18,7 @@ def order_to_response(order):
         "status": order.status,
         "location": order.location,
         "expected_date": order.expected_date,
+        "expected_on": order.expected_on.isoformat() if order.expected_on else None,
         "notes": order.notes,
         "created_at": order.created_at.isoformat() if order.created_at else "",
         "updated_at": order.updated_at.isoformat() if order.updated_at else "",
@@ -26,34 +27,49 @@ def order_to_response(order):
 
 
 @router.get("", response_model=StatsResponse)
-async def get_stats(db: AsyncSession = Depends(get_db)):
-    total_result = await db.execute(select(func.count(Order.id)))
+async def get_stats(include_archived: bool = False, db: AsyncSession = Depends(get_read_db)):
+    return await compute_stats(db, include_archived)
+
+
+async def compute_stats(db: AsyncSession, include_archived: bool = False) -> dict:
+    """Dashboard summary counts and the five most recent orders.
+
+    Counts cover live orders only unless ``include_archived`` is set.
+    """
+    orders = order_source(include_archived)
+    total_result = await db.execute(select(func.count(orders.c.id)))
     total_orders = total_result.scalar() or 0
     
     status_result = await db.execute(
-        select(Order.status, func.count(Order.id)).group_by(Order.status)
+        select(orders.c.status, func.count(orders.c.id)).group_by(orders.c.status)
     )
     orders_by_status = [{"status": r[0], "count": r[1]} for r in status_result.all()]
     
     vendor_result = await db.execute(
-        select(Order.vendor, func.count(Order.id)).group_by(Order.vendor).order_by(func.count(Order.id).desc())
+        select(orders.c.vendor, func.count(orders.c.id))
+        .group_by(orders.c.vendor)
+        .order_by(func.count(orders.c.id).desc())
     )
     orders_by_vendor = [{"vendor": r[0], "count": r[1]} for r in vendor_result.all()]
     
     recent_result = await db.execute(
-        select(Order).order_by(Order.created_at.desc()).limit(5)
+        select(orders).order_by(orders.c.created_at.desc()).limit(5)
     )
-    recent_orders = [order_to_response(o) for o in recent_result.scalars().all()]
+    recent_orders = [order_to_response(o) for o in recent_result.all()]
     
+    # Archived orders are all delivered, so this never needs the archive
     pending_result = await db.execute(
         select(func.count(Order.id)).where(Order.status != "Delivered")
     )
     pending_delivery = pending_result.scalar() or 0
     
+    # A range on created_at instead of formatting it works on every dialect
+    # and can use an index
+    month_start = utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     month_delivery_result = await db.execute(
-        select(func.count(Order.id)).where(
-            Order.status == "Delivered",
-            func.to_char(Order.created_at, "YYYY-MM") == func.to_char(func.current_date(), "YYYY-MM")
+        select(func.count(orders.c.id)).where(
+            orders.c.status == "Delivered",
+            orders.c.created_at >= month_start
         )
     )
     delivered_this_month = month_delivery_result.scalar() or 0
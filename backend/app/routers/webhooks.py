@@ -1,19 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from datetime import datetime
+from sqlalchemy import select, func, update
+from datetime import date, datetime
 from ..database import get_db
-from ..models import Order, OrderItem
+from ..models import Order, OrderItem, new_id, utcnow
 from ..schemas import WebhookRequest, WebhookResponse
-from ..ai import classify_email, extract_order_data
-import uuid
+from ..ai import classify_email, extract_order_data, extraction_version
+from ..normalization import get_normalizer
+from ..archive import restore_order
+from ..dates import as_utc, parse_email_timestamp, parse_expected_date, to_local_date
+from ..events import notify_order_change
+from ..order_writes import ORDER_WRITES_SKIPPED, STATUS_REGRESSIONS, add_items, is_missing, item_rows
+from ..raw_emails import should_store, store_raw_email
+from ..instrumentation import current_stats, stage
+from ..recorder import recorder
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
 
-
 def order_to_response(order):
     return {
         "id": order.id,
@@ -23,6 +29,7 @@ def order_to_response(order):
         "status": order.status,
         "location": order.location,
         "expected_date": order.expected_date,
+        "expected_on": order.expected_on.isoformat() if order.expected_on else None,
         "notes": order.notes,
         "created_at": order.created_at.isoformat() if order.created_at else "",
         "updated_at": order.updated_at.isoformat() if order.updated_at else "",
@@ -60,19 +67,179 @@ def extract_email_data(body: dict):
     return "", "", ""
 
 
-@router.post("/order", response_model=WebhookResponse)
-async def handle_webhook(request: Request, db: AsyncSession = Depends(get_db)):
-    try:
-        body = await request.json()
-    except:
-        body = {}
+def extract_email_timestamp(body: dict) -> datetime | None:
+    """When the email was received, from the Gmail/n8n date fields."""
+    payload = body.get("payload") if isinstance(body.get("payload"), dict) else {}
+    for source in (body, payload):
+        for key in ("internalDate", "date", "Date", "received_at"):
+            received = parse_email_timestamp(source.get(key))
+            if received is not None:
+                return received
+    return None
+
+
+async def upsert_order(
+    db: AsyncSession,
+    extraction: dict,
+    from_email: str = None,
+    received_on: date | None = None,
+    received_at: datetime | None = None,
+    commit: bool = True,
+    stale: bool = False,
+) -> tuple[str, Order]:
+    """Create or update the order described by ``extraction`` and commit.
+
+    ``received_on`` anchors relative expected dates ("Thursday", "Jan 23").
+    ``received_at`` is the email's own timestamp when replaying old mail
+    (``app.mailbox``): it dates the order instead of the clock, and an
+    email older than the order's last update only fills in missing fields.
+    ``stale=True`` treats an email of unknown age the same way, so replayed
+    mail without a date cannot override (or re-date) dated mail.
+    With ``commit=False`` the changes are flushed and the caller commits.
+
+    A newer email that matches the stored order is not written at all, and
+    a status earlier in the configured order than the stored one (a late
+    "Shipped" after "Delivered") is ignored.
+
+    Returns ``("created" | "updated" | "unchanged" | "stale", order)``.
+    """
+    order_number = extraction.get("order_number")
+    normalizer = get_normalizer()
+    vendor = normalizer.vendor(extraction.get("vendor"), from_email)
+    customer_name = extraction.get("customer_name")
+    # None when the email gave no status: new orders start as "Ordered",
+    # existing ones keep theirs
+    order_status = normalizer.status(extraction.get("order_status"))
+    delivery_info = extraction.get("delivery_info") or {}
+    items = extraction.get("items") or []
+    if received_at is not None and received_on is None:
+        received_on = to_local_date(received_at)
+    expected_date = delivery_info.get("expected_date")
+    expected_on = parse_expected_date(expected_date, received_on)
     
-    logger.info(f"Webhook received: {body}")
+    result = await db.execute(select(Order).where(Order.order_number == order_number))
+    existing_order = result.scalar_one_or_none()
+    if existing_order is None and await restore_order(db, order_number):
+        # A new email for an archived order (a return, say) brings it back
+        result = await db.execute(select(Order).where(Order.order_number == order_number))
+        existing_order = result.scalar_one_or_none()
     
-    # Extract email data from various formats
-    subject, snippet, from_email = extract_email_data(body)
+    if existing_order and (stale or received_at is not None and existing_order.updated_at
+                           and received_at < as_utc(existing_order.updated_at)):
+        fills = {}
+        if is_missing(existing_order.vendor) and vendor:
+            fills["vendor"] = vendor
+        if is_missing(existing_order.customer_name) and customer_name:
+            fills["customer_name"] = customer_name
+        if is_missing(existing_order.location) and delivery_info.get("location"):
+            fills["location"] = delivery_info["location"]
+        if expected_date and is_missing(existing_order.expected_date):
+            fills["expected_date"] = expected_date
+            fills["expected_on"] = expected_on
+        if received_at is not None and existing_order.created_at and received_at < as_utc(existing_order.created_at):
+            fills["created_at"] = received_at
+        if fills:
+            # A Core UPDATE that sets updated_at to itself, so the onupdate
+            # default does not move it to now
+            await db.execute(
+                update(Order).where(Order.id == existing_order.id)
+                .values(**fills, updated_at=Order.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            await db.refresh(existing_order)
+        changed = bool(fills)
+        if items:
+            item_count = await db.execute(
+                select(func.count(OrderItem.id)).where(OrderItem.order_id == existing_order.id)
+            )
+            if not item_count.scalar():
+                add_items(db, existing_order.id, items)
+                changed = True
+        action = "stale"
+    elif existing_order:
+        changes = {}
+        if vendor and vendor != existing_order.vendor:
+            changes["vendor"] = vendor
+        if customer_name and customer_name != existing_order.customer_name:
+            changes["customer_name"] = customer_name
+        if order_status and order_status != existing_order.status:
+            if normalizer.advances(existing_order.status, order_status):
+                changes["status"] = order_status
+            else:
+                STATUS_REGRESSIONS.inc()
+        if delivery_info.get("location") and delivery_info["location"] != existing_order.location:
+            changes["location"] = delivery_info["location"]
+        if expected_date and (expected_date, expected_on) != (existing_order.expected_date, existing_order.expected_on):
+            changes["expected_date"] = expected_date
+            changes["expected_on"] = expected_on
+        if items:
+            stored = await db.execute(select(OrderItem).where(OrderItem.order_id == existing_order.id))
+            if item_rows(items) != item_rows(stored.scalars()):
+                await db.execute(OrderItem.__table__.delete().where(OrderItem.order_id == existing_order.id))
+                add_items(db, existing_order.id, items)
+                changes["items"] = items
+        
+        changed = bool(changes)
+        if changed:
+            for field, value in changes.items():
+                if field != "items":
+                    setattr(existing_order, field, value)
+            existing_order.updated_at = received_at or utcnow()
+        action = "updated" if changed else "unchanged"
     
-    logger.info(f"Extracted - Subject: {subject}, Snippet: {snippet[:100] if snippet else 'None'}, From: {from_email}")
+    if existing_order:
+        if not changed:
+            # No UPDATE, no updated_at bump and no event for clients to refetch on
+            ORDER_WRITES_SKIPPED.inc(source="email" if action == "unchanged" else "stale_email")
+            if commit:
+                await db.commit()
+            return action, existing_order
+        await notify_order_change(db, "updated", existing_order)
+        if commit:
+            await db.commit()
+            await db.refresh(existing_order)
+        else:
+            await db.flush()
+        return action, existing_order
+    
+    new_order = Order(
+        id=new_id(),
+        order_number=order_number,
+        vendor=vendor or "Unknown",
+        customer_name=customer_name or "Unknown",
+        status=order_status or "Ordered",
+        location=delivery_info.get("location", ""),
+        expected_date=delivery_info.get("expected_date", ""),
+        expected_on=expected_on
+    )
+    if received_at is not None:
+        new_order.created_at = new_order.updated_at = received_at
+    db.add(new_order)
+    add_items(db, new_order.id, items)
+    
+    await notify_order_change(db, "created", new_order)
+    if commit:
+        await db.commit()
+        await db.refresh(new_order)
+    else:
+        await db.flush()
+    return "created", new_order
+
+
+async def process_email(
+    db: AsyncSession,
+    subject: str,
+    snippet: str,
+    from_email: str,
+    received_on: date | None = None,
+    received_at: datetime | None = None,
+) -> dict:
+    """Classify and extract one email and upsert its order; returns the webhook response.
+
+    The email itself goes to ``raw_emails`` per ``raw_email_store``;
+    ``received_at`` is only recorded there.
+    """
+    logger.info("Processing email %r from %s (%d chars)", subject, from_email, len(snippet or ""))
     
     if not subject and not snippet:
         return {
@@ -82,18 +249,23 @@ async def handle_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     
     email_content = snippet or subject
     
-    classification = await classify_email(subject, email_content)
-    logger.info(f"Classification: {classification}")
+    with stage("classify"):
+        classification = await classify_email(subject, email_content)
+    logger.info("Classification: %s", classification)
     
     if not classification.get("isOrderEmail", False):
+        if should_store(False) and not classification.get("error"):
+            await store_raw_email(db, subject, snippet, from_email, received_at)
+            await db.commit()
         return {
             "message": "Email is not order-related",
             "action": "skipped",
             "classification": classification
         }
     
-    extraction = await extract_order_data(subject, email_content)
-    logger.info(f"Extraction: {extraction}")
+    with stage("extract"):
+        extraction = await extract_order_data(subject, email_content)
+    logger.info("Extraction: %s", extraction)
     
     if not extraction.get("extraction_success", False):
         return {
@@ -112,91 +284,42 @@ async def handle_webhook(request: Request, db: AsyncSession = Depends(get_db)):
             "extraction": extraction
         }
     
-    vendor = extraction.get("vendor")
-    customer_name = extraction.get("customer_name")
-    order_status = extraction.get("order_status", "Ordered")
-    delivery_info = extraction.get("delivery_info", {})
-    items = extraction.get("items", [])
-    
-    result = await db.execute(select(Order).where(Order.order_number == order_number))
-    existing_order = result.scalar_one_or_none()
-    
-    if existing_order:
-        existing_order.vendor = vendor or existing_order.vendor
-        existing_order.customer_name = customer_name or existing_order.customer_name
-        existing_order.status = order_status or existing_order.status
-        existing_order.location = delivery_info.get("location") or existing_order.location
-        existing_order.expected_date = delivery_info.get("expected_date") or existing_order.expected_date
-        existing_order.updated_at = datetime.utcnow()
-        
-        if items:
-            await db.execute(OrderItem.__table__.delete().where(OrderItem.order_id == existing_order.id))
-            for item in items:
-                price = item.get("price")
-                if isinstance(price, str):
-                    try:
-                        price = float(price.replace("AED", "").replace("$", "").strip())
-                    except:
-                        price = None
-                
-                order_item = OrderItem(
-                    id=str(uuid.uuid4()),
-                    order_id=existing_order.id,
-                    item_name=item.get("item_name"),
-                    quantity=item.get("quantity", 1),
-                    price=price,
-                    currency=item.get("currency", "AED")
-                )
-                db.add(order_item)
-        
+    with stage("upsert"):
+        action, order = await upsert_order(db, extraction, from_email, received_on, commit=False)
+        if should_store(True):
+            await store_raw_email(db, subject, snippet, from_email, received_at, order.id, extraction_version())
         await db.commit()
-        await db.refresh(existing_order)
-        
-        return {
-            "message": "Order updated successfully",
-            "action": "updated",
-            "order": order_to_response(existing_order),
-            "classification": classification,
-            "extraction": extraction
-        }
-    else:
-        new_order = Order(
-            id=str(uuid.uuid4()),
-            order_number=order_number,
-            vendor=vendor or "Unknown",
-            customer_name=customer_name or "Unknown",
-            status=order_status or "Ordered",
-            location=delivery_info.get("location", ""),
-            expected_date=delivery_info.get("expected_date", "")
-        )
-        db.add(new_order)
-        
-        if items:
-            for item in items:
-                price = item.get("price")
-                if isinstance(price, str):
-                    try:
-                        price = float(price.replace("AED", "").replace("$", "").strip())
-                    except:
-                        price = None
-                
-                order_item = OrderItem(
-                    id=str(uuid.uuid4()),
-                    order_id=new_order.id,
-                    item_name=item.get("item_name"),
-                    quantity=item.get("quantity", 1),
-                    price=price,
-                    currency=item.get("currency", "AED")
-                )
-                db.add(order_item)
+        await db.refresh(order)
+    
+    return {
+        "message": "Order unchanged" if action == "unchanged" else f"Order {action} successfully",
+        "action": action,
+        "order": order_to_response(order),
+        "classification": classification,
+        "extraction": extraction
+    }
+
+
+@router.post("/order", response_model=WebhookResponse)
+async def handle_webhook(request: Request, db: AsyncSession = Depends(get_db)):
+    with stage("parse"):
+        try:
+            body = await request.json()
+        except:
+            body = {}
         
-        await db.commit()
-        await db.refresh(new_order)
+        # Body fields are redacted by app.logs
+        logger.debug("Webhook received: %s", body)
         
-        return {
-            "message": "Order created successfully",
-            "action": "created",
-            "order": order_to_response(new_order),
-            "classification": classification,
-            "extraction": extraction
-        }
+        # Extract email data from various formats
+        subject, snippet, from_email = extract_email_data(body)
+        received_at = extract_email_timestamp(body)
+        received_on = to_local_date(received_at) if received_at else None
+    
+    result = await process_email(db, subject, snippet, from_email, received_on, received_at)
+    
+    if recorder.enabled:
+        stats = current_stats()
+        recorder.record(body, result, stats.timings if stats else None)
+    
+    return result
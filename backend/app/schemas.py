@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Optional
 
 
 class OrderItemBase(BaseModel):
@@ -48,6 +48,7 @@ class OrderUpdate(BaseModel):
 
 class OrderResponse(OrderBase):
     id: str
+    expected_on: Optional[str] = None
     created_at: str
     updated_at: str
     items: list[OrderItemResponse] = []
@@ -61,9 +62,31 @@ class OrderListResponse(BaseModel):
     total: int
 
 
+class OrderPartialResponse(BaseModel):
+    """Order restricted to the requested ``fields``; unset ones are omitted."""
+    id: Optional[str] = None
+    order_number: Optional[str] = None
+    vendor: Optional[str] = None
+    customer_name: Optional[str] = None
+    status: Optional[str] = None
+    location: Optional[str] = None
+    expected_date: Optional[str] = None
+    expected_on: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    items: Optional[list[OrderItemResponse]] = None
+    item_count: Optional[int] = None
+
+
+class OrderPageResponse(BaseModel):
+    orders: list[OrderPartialResponse]
+    total: int
+
+
 class SettingResponse(BaseModel):
     key: str
-    value: Optional[str] = None
+    value: Optional[Any] = None
 
 
 class VendorsResponse(BaseModel):
@@ -96,3 +119,18 @@ class StatsResponse(BaseModel):
     recent_orders: list[OrderResponse]
     pending_delivery: int
     delivered_this_month: int
+
+
+class DashboardResponse(BaseModel):
+    orders: Optional[OrderPageResponse] = None
+    stats: Optional[StatsResponse] = None
+    settings: Optional[dict] = None
+
+
+class BackfillRequest(BaseModel):
+    # mbox file or .eml directory, relative to BACKFILL_DIR
+    source: str
+    senders: list[str] = []
+    concurrency: Optional[int] = None
+    batch_size: Optional[int] = None
+    restart: bool = False
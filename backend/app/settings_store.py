@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .models import Setting
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VENDORS = ["Amazon", "Noon", "Namshi", "Sharaf DG", "Carrefour", "Other"]
+DEFAULT_STATUSES = ["Ordered", "Shipped", "Out for Delivery", "Delivered"]
+
+# Reserved row bumped on every write so other workers know to reload.
+VERSION_KEY = "__version__"
+# Reserved row held by a running backfill/re-extraction job (app.ai.job_budget)
+AI_JOB_LEASE_KEY = "__ai_job_lease__"
+RESERVED_KEYS = (VERSION_KEY, AI_JOB_LEASE_KEY)
+
+DEFAULTS = {
+    "vendors": DEFAULT_VENDORS,
+    "statuses": DEFAULT_STATUSES,
+}
+
+
+class SettingsStore:
+    """Versioned in-process cache of the ``order_settings`` table.
+
+    Reads are served from memory. Writes go through :meth:`set`, which bumps
+    the version row so that other workers pick the change up on their next
+    :meth:`refresh_if_changed` poll.
+    """
+
+    def __init__(self):
+        self._values: dict[str, Any] = {}
+        self._version: str | None = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._listeners: list[Callable[["SettingsStore"], None]] = []
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def version(self) -> str | None:
+        return self._version
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._values:
+            return self._values[key]
+        if key in DEFAULTS:
+            return DEFAULTS[key]
+        return default
+
+    def all(self) -> dict[str, Any]:
+        values = dict(DEFAULTS)
+        values.update((key, value) for key, value in self._values.items() if key not in RESERVED_KEYS)
+        return values
+
+    def has(self, key: str) -> bool:
+        return key in self._values
+
+    @property
+    def vendors(self) -> list[str]:
+        return self.get("vendors")
+
+    @property
+    def statuses(self) -> list[str]:
+        return self.get("statuses")
+
+    def subscribe(self, callback: Callable[["SettingsStore"], None]):
+        """Call ``callback(store)`` after every (re)load."""
+        self._listeners.append(callback)
+        if self._loaded:
+            callback(self)
+
+    async def load(self, db: AsyncSession):
+        """Load every setting from the database, replacing the cache."""
+        result = await db.execute(select(Setting))
+        values = {}
+        version = None
+        for s in result.scalars().all():
+            if s.key == VERSION_KEY:
+                version = s.value
+            else:
+                values[s.key] = s.value
+        self._apply(values, version)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self.load(db)
+
+    async def refresh_if_changed(self, db: AsyncSession) -> bool:
+        """Reload if another worker has written since our last load."""
+        result = await db.execute(select(Setting.value).where(Setting.key == VERSION_KEY))
+        version = result.scalar_one_or_none()
+        if self._loaded and version == self._version:
+            return False
+        async with self._lock:
+            await self.load(db)
+        return True
+
+    async def set(self, db: AsyncSession, key: str, value: Any) -> Any:
+        """Persist ``key`` and bump the version, then update the cache."""
+        await self._upsert(db, key, value)
+        version = uuid.uuid4().hex
+        await self._upsert(db, VERSION_KEY, version)
+        await db.commit()
+
+        values = dict(self._values)
+        values[key] = value
+        self._apply(values, version)
+        return value
+
+    async def _upsert(self, db: AsyncSession, key: str, value: Any):
+        result = await db.execute(select(Setting).where(Setting.key == key))
+        setting = result.scalar_one_or_none()
+        if setting:
+            setting.value = value
+        else:
+            db.add(Setting(key=key, value=value))
+
+    def _apply(self, values: dict[str, Any], version: str | None):
+        self._values = values
+        self._version = version
+        self._loaded = True
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Settings listener failed: {e}")
+
+    async def poll(self, session_factory, interval: float | None = None):
+        """Background task: check the version row every ``interval`` seconds."""
+        interval = interval or settings.app_settings_refresh_interval
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as db:
+                    if await self.refresh_if_changed(db):
+                        logger.info(f"Settings reloaded (version {self._version})")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Settings refresh failed: {e}")
+
+
+settings_store = SettingsStore()
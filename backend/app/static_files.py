@@ -0,0 +1,181 @@
+"""In-memory index of the built frontend, with precompressed variants.
+
+The index is built once per worker. Requests are answered from it without
+touching the filesystem except to stream the chosen file.
+
+Run ``python -m app.static_files <dir>`` after ``vite build`` to write
+``.gz`` (and ``.br`` when brotli is installed) next to each text asset.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+from dataclasses import dataclass, field
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from .compression import parse_accept_encoding
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+# Encodings in order of preference, with the suffix of the precompressed file
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+COMPRESSIBLE_SUFFIXES = {".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".map", ".xml", ".ico"}
+MIN_COMPRESS_SIZE = 512
+
+# Vite writes content-hashed file names under assets/, so they never change
+IMMUTABLE_PREFIX = "assets/"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+DEFAULT_CACHE = "public, max-age=3600"
+INDEX_CACHE = "no-cache"
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    media_type: str
+    etag: str
+    stat: os.stat_result
+    cache_control: str
+    # encoding -> (path, stat) of the precompressed file
+    variants: dict[str, tuple[str, os.stat_result]] = field(default_factory=dict)
+
+
+@dataclass
+class InMemoryAsset:
+    media_type: str
+    etag: str
+    cache_control: str
+    # encoding ("identity", "gzip", "br") -> body
+    bodies: dict[str, bytes]
+
+
+def accepted_encodings(request: Request) -> set[str]:
+    return parse_accept_encoding(request.headers.get("accept-encoding", ""))
+
+
+def _etag(stat: os.stat_result) -> str:
+    return '"' + hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}".encode()).hexdigest() + '"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return etag in (tag.strip() for tag in header.split(",")) or header.strip() == "*"
+
+
+class StaticIndex:
+    """Maps URL paths to files under ``root``, built once at startup."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.assets: dict[str, StaticAsset] = {}
+        self.index: InMemoryAsset | None = None
+        if os.path.isdir(root):
+            self._scan()
+
+    def _scan(self):
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(suffixes):
+                    continue
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                stat = os.stat(path)
+                asset = StaticAsset(
+                    path=path,
+                    media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+                    etag=_etag(stat),
+                    stat=stat,
+                    cache_control=IMMUTABLE_CACHE if rel.startswith(IMMUTABLE_PREFIX) else DEFAULT_CACHE,
+                )
+                for encoding, suffix in ENCODINGS:
+                    if os.path.isfile(path + suffix):
+                        asset.variants[encoding] = (path + suffix, os.stat(path + suffix))
+                self.assets[rel] = asset
+
+        index = self.assets.pop("index.html", None)
+        if index:
+            with open(index.path, "rb") as f:
+                body = f.read()
+            bodies = {"identity": body, "gzip": gzip.compress(body, 9)}
+            if brotli is not None:
+                bodies["br"] = brotli.compress(body)
+            self.index = InMemoryAsset(
+                media_type="text/html; charset=utf-8",
+                etag='"' + hashlib.md5(body).hexdigest() + '"',
+                cache_control=INDEX_CACHE,
+                bodies=bodies,
+            )
+
+    def lookup(self, path: str) -> StaticAsset | None:
+        return self.assets.get(path.lstrip("/"))
+
+    def file_response(self, request: Request, asset: StaticAsset) -> Response:
+        headers = {"Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+        accepted = accepted_encodings(request)
+        for encoding, _ in ENCODINGS:
+            if encoding in asset.variants and encoding in accepted:
+                path, stat = asset.variants[encoding]
+                etag = asset.etag[:-1] + f'-{encoding}"'
+                if _not_modified(request, etag):
+                    return Response(status_code=304, headers={**headers, "ETag": etag})
+                headers.update({"Content-Encoding": encoding, "ETag": etag})
+                return FileResponse(path, media_type=asset.media_type, headers=headers, stat_result=stat)
+        if _not_modified(request, asset.etag):
+            return Response(status_code=304, headers={**headers, "ETag": asset.etag})
+        headers["ETag"] = asset.etag
+        return FileResponse(asset.path, media_type=asset.media_type, headers=headers, stat_result=asset.stat)
+
+    def index_response(self, request: Request) -> Response | None:
+        index = self.index
+        if index is None:
+            return None
+        encoding = "identity"
+        accepted = accepted_encodings(request)
+        for candidate, _ in ENCODINGS:
+            if candidate in index.bodies and candidate in accepted:
+                encoding = candidate
+                break
+        etag = index.etag if encoding == "identity" else index.etag[:-1] + f'-{encoding}"'
+        headers = {"Cache-Control": index.cache_control, "Vary": "Accept-Encoding", "ETag": etag}
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(index.bodies[encoding], media_type=index.media_type, headers=headers)
+
+
+def compress_directory(root: str) -> int:
+    """Write ``.gz``/``.br`` siblings for compressible files; returns the count."""
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_SUFFIXES:
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            variants = {".gz": gzip.compress(data, 9)}
+            if brotli is not None:
+                variants[".br"] = brotli.compress(data, quality=11)
+            for suffix, compressed in variants.items():
+                # Not worth a separate file if it barely shrinks
+                if len(compressed) < len(data) * 0.9:
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else "static"
+    print(f"Wrote {compress_directory(directory)} precompressed files in {directory}")
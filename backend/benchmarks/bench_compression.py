@@ -0,0 +1,77 @@
+"""Payload size and CPU cost of response compression on an order listing.
+
+Builds a ``GET /api/orders?limit=100``-shaped JSON body with items and times
+each encoding/level that ``app.compression`` can use.
+
+Usage: python -m benchmarks.bench_compression [--orders 100] [--repeat 50] [--output result.json]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+from app import compression
+from .data import make_order, order_response
+
+
+def order_listing(count: int, seed: int = 1) -> bytes:
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1)
+    orders = [order_response(*make_order(rng, i, now)) for i in range(count)]
+    return json.dumps({"orders": orders, "total": count}).encode()
+
+
+def run(orders: int, repeat: int) -> dict:
+    payload = order_listing(orders)
+    levels = {"gzip": [1, 6, 9]}
+    if compression.brotli is not None:
+        levels["br"] = [1, 4, 11]
+    if compression.zstandard is not None:
+        levels["zstd"] = [1, 3, 10]
+
+    results = []
+    for encoding, encoding_levels in levels.items():
+        for level in encoding_levels:
+            setting = {"gzip": "compression_gzip_level", "br": "compression_brotli_quality",
+                       "zstd": "compression_zstd_level"}[encoding]
+            original = getattr(compression.settings, setting)
+            setattr(compression.settings, setting, level)
+            try:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    body = compression.compress(payload, encoding)
+                    timings.append(time.perf_counter() - start)
+            finally:
+                setattr(compression.settings, setting, original)
+            median = statistics.median(timings)
+            results.append({
+                "encoding": encoding,
+                "level": level,
+                "bytes": len(body),
+                "ratio": round(len(payload) / len(body), 2),
+                "median_ms": round(median * 1000, 3),
+                "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1] * 1000, 3),
+                "mb_per_s": round(len(payload) / median / 1e6, 1),
+            })
+    return {"benchmark": "compression", "orders": orders, "identity_bytes": len(payload), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    result = run(args.orders, args.repeat)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Index sizes and join timings for the orders/order_items keys.
+
+Run against a seeded database before and after ``alembic upgrade head`` to
+see what the uuid key and ``order_items.order_id`` index migration changed:
+
+    python -m benchmarks.bench_keys --label before --output results/keys-before.json
+    alembic upgrade head
+    python -m benchmarks.bench_keys --label after --compare results/keys-before.json
+
+Uses ``DATABASE_URL`` like the app. Sizes come from ``pg_relation_size`` on
+PostgreSQL and the ``dbstat`` table on SQLite.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import text
+from app.database import engine
+from .run import git_revision
+
+TABLES = ("orders", "order_items")
+
+POSTGRES_SIZES = text("""
+    SELECT c.relname, pg_relation_size(c.oid)
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'i') AND (
+        c.relname IN ('orders', 'order_items')
+        OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid IN ('orders'::regclass, 'order_items'::regclass))
+    )
+""")
+SQLITE_SIZES = text("""
+    SELECT name, SUM(pgsize) FROM dbstat
+    WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name IN ('orders', 'order_items'))
+       OR name LIKE 'sqlite_autoindex_order%'
+    GROUP BY name
+""")
+
+# Name -> (statement, name of the sampled order_number parameter or None)
+QUERIES = {
+    "order_with_items": (
+        "SELECT o.id, o.order_number, i.item_name, i.price FROM orders o "
+        "JOIN order_items i ON i.order_id = o.id WHERE o.order_number = :number",
+        "number",
+    ),
+    "items_for_page": (
+        "SELECT order_id, item_name, quantity, price FROM order_items WHERE order_id IN "
+        "(SELECT id FROM orders ORDER BY created_at DESC LIMIT 100)",
+        None,
+    ),
+    "item_counts_join": (
+        "SELECT o.vendor, COUNT(i.id) FROM orders o JOIN order_items i ON i.order_id = o.id GROUP BY o.vendor",
+        None,
+    ),
+}
+
+
+async def relation_sizes(conn) -> dict[str, int]:
+    statement = POSTGRES_SIZES if conn.dialect.name == "postgresql" else SQLITE_SIZES
+    try:
+        rows = (await conn.execute(statement)).all()
+    except Exception as e:
+        print(f"Relation sizes unavailable: {e}")
+        return {}
+    return {name: int(size) for name, size in rows}
+
+
+async def time_queries(conn, numbers: list[str], repeat: int) -> dict[str, dict]:
+    results = {}
+    for name, (sql, param) in QUERIES.items():
+        statement = text(sql)
+        timings = []
+        for i in range(repeat):
+            params = {"number": numbers[i % len(numbers)]} if param else {}
+            start = time.perf_counter()
+            (await conn.execute(statement, params)).all()
+            timings.append(time.perf_counter() - start)
+        results[name] = {
+            "median_ms": round(statistics.median(timings) * 1000, 3),
+            "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1] * 1000, 3),
+        }
+    return results
+
+
+async def time_inserts(conn, count: int) -> dict[str, float]:
+    """Insert ``count`` orders with random and time-ordered keys, rolled back."""
+    from app.models import new_id
+
+    key_type_is_uuid = conn.dialect.name == "postgresql" and await conn.scalar(text(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = 'orders' AND column_name = 'id'"
+    )) == "uuid"
+    # Before the migration SQLite stores dashed text, after it 32-char hex
+    sample = await conn.scalar(text("SELECT id FROM orders LIMIT 1"))
+    hex_keys = isinstance(sample, str) and len(sample) == 32
+    results = {}
+    for kind, make_key in (("uuid4", lambda: str(uuid.uuid4())), ("uuid7", new_id)):
+        rows = []
+        for i in range(count):
+            key = make_key()
+            rows.append({"id": key.replace("-", "") if hex_keys else key,
+                         "number": f"BENCH-{kind}-{i}", "now": datetime.now(timezone.utc)})
+        id_expr = "CAST(:id AS uuid)" if key_type_is_uuid else ":id"
+        statement = text(
+            f"INSERT INTO orders (id, order_number, status, created_at, updated_at) "
+            f"VALUES ({id_expr}, :number, 'Ordered', :now, :now)"
+        )
+        transaction = await conn.begin_nested()
+        start = time.perf_counter()
+        for offset in range(0, count, 500):
+            await conn.execute(statement, rows[offset:offset + 500])
+        results[kind] = round(time.perf_counter() - start, 3)
+        await transaction.rollback()
+    return results
+
+
+async def run(args) -> dict:
+    async with engine.connect() as conn:
+        await conn.begin()
+        counts = {t: await conn.scalar(text(f"SELECT COUNT(*) FROM {t}")) for t in TABLES}
+        numbers = list((await conn.execute(
+            text("SELECT order_number FROM orders ORDER BY order_number LIMIT 1000")
+        )).scalars())
+        random.Random(args.seed).shuffle(numbers)
+        sizes = await relation_sizes(conn)
+        timings = await time_queries(conn, numbers or [""], args.repeat) if args.repeat else {}
+        inserts = await time_inserts(conn, args.inserts) if args.inserts else {}
+        await conn.rollback()
+    await engine.dispose()
+
+    return {
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "dialect": engine.dialect.name,
+        "rows": counts,
+        "sizes_bytes": sizes,
+        "queries": timings,
+        "insert_seconds": inserts,
+    }
+
+
+def compare(baseline_path: str, current: dict):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'relation':36} {baseline['label'] or 'before':>12} {current['label'] or 'after':>12}")
+    for name in sorted(set(baseline["sizes_bytes"]) | set(current["sizes_bytes"])):
+        before = baseline["sizes_bytes"].get(name)
+        after = current["sizes_bytes"].get(name)
+        print(f"{name:36} {before or '-':>12} {after or '-':>12}")
+    print(f"\n{'query (median ms)':36}")
+    for name, result in current["queries"].items():
+        before = baseline["queries"].get(name, {}).get("median_ms")
+        print(f"{name:36} {before if before is not None else '-':>12} {result['median_ms']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--label", default="")
+    parser.add_argument("--repeat", type=int, default=200, help="executions per query")
+    parser.add_argument("--inserts", type=int, default=5000, help="rows per key kind in the insert test, 0 to skip")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps({k: result[k] for k in ("rows", "queries", "insert_seconds")}, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        compare(args.compare, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Event loop cost of webhook logging: synchronous text vs ``app.logs``.
+
+Runs webhook-shaped tasks on one event loop and emits the log records a
+webhook produces. ``sync`` is the previous setup: ``logging.basicConfig``
+writing to the stream from the loop, with the request body and model
+answers formatted into INFO messages up front. ``direct`` is the current
+log calls (bodies at DEBUG, %-style arguments) through
+``app.logs.setup_logging`` with ``LOG_QUEUE_SIZE=0``, still writing from
+the loop, and ``queue`` the same calls with the default queue. The stream
+can be made slow (``--sink-delay-ms`` per write) to stand in for a stdout
+pipe that the log collector is not draining fast enough.
+
+Reports webhooks per second and event loop lag for each mode, and the
+speedup from the new log calls (``direct`` over ``sync``) and from the
+queue (``queue`` over ``direct``) separately. For the whole app, run
+``benchmarks.run --scenarios webhook`` against instances started with
+``LOG_QUEUE_SIZE=0`` and with the default.
+
+Usage: python -m benchmarks.bench_logging [--requests 5000] [--concurrency 32] [--sink-delay-ms 0.05] [--output result.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from app import logs
+from app.config import settings
+from .data import email_payload, order_number
+
+logger = logging.getLogger("app.routers.webhooks")
+ai_logger = logging.getLogger("app.ai")
+
+CLASSIFICATION = {"isOrderEmail": True, "confidence": "High", "reason": "Order status update from vendor"}
+MODEL = "openai/gpt-4.1-mini"
+
+
+class SlowStream:
+    """File stream whose writes block for ``delay`` seconds, like a full pipe."""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text: str):
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def extraction_for(body: dict, number: str) -> dict:
+    return {
+        "extraction_success": True, "order_number": number, "vendor": "Amazon", "customer_name": "Aisha",
+        "order_status": "Shipped", "delivery_info": {"location": "Dubai", "expected_date": "Thursday"},
+        "items": [{"item_name": "USB-C Charging Cable 2m", "quantity": 1, "price": "AED 35.00"}],
+        "confidence": "High",
+    }
+
+
+def log_sync(body: dict, subject: str, snippet: str, from_email: str, extraction: dict):
+    """The log calls as they were, formatted eagerly."""
+    logger.info(f"Webhook received: {body}")
+    logger.info(f"Extracted - Subject: {subject}, Snippet: {snippet[:100] if snippet else 'None'}, From: {from_email}")
+    for result in (CLASSIFICATION, extraction):
+        content = json.dumps(result)
+        ai_logger.info(f"Calling AI API with model: {MODEL} (live)")
+        ai_logger.info(f"AI response type: {type(content)}, content: {str(content)[:200]}...")
+    ai_logger.info(f"Classification result: {CLASSIFICATION}")
+    logger.info(f"Classification: {CLASSIFICATION}")
+    ai_logger.info(f"Extraction result: {extraction}")
+    logger.info(f"Extraction: {extraction}")
+
+
+def log_queue(body: dict, subject: str, snippet: str, from_email: str, extraction: dict):
+    """The current log calls in app.routers.webhooks and app.ai."""
+    logger.debug("Webhook received: %s", body)
+    logger.info("Processing email %r from %s (%d chars)", subject, from_email, len(snippet or ""))
+    for result in (CLASSIFICATION, extraction):
+        content = json.dumps(result)
+        ai_logger.info("Calling AI API with model %s (%s)", MODEL, "live")
+        ai_logger.debug("AI response: %s", content)
+    ai_logger.debug("Classification result: %s", CLASSIFICATION)
+    logger.info("Classification: %s", CLASSIFICATION)
+    ai_logger.debug("Extraction result: %s", extraction)
+    logger.info("Extraction: %s", extraction)
+
+
+def configure(mode: str, stream):
+    root = logging.getLogger()
+    logs.stop_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    if mode == "sync":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    elif mode == "direct":
+        queue_size = settings.log_queue_size
+        settings.log_queue_size = 0
+        try:
+            logs.setup_logging(stream)
+        finally:
+            settings.log_queue_size = queue_size
+    else:
+        logs.setup_logging(stream)
+
+
+async def run_mode(mode: str, payloads: list[tuple], concurrency: int, stream: SlowStream) -> dict:
+    emit = log_sync if mode == "sync" else log_queue
+    configure(mode, stream)
+    writes_before = stream.writes
+    dropped_before = logs.LOG_DROPPED.value(reason="queue_full")
+    lags = []
+    running = True
+
+    async def monitor():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def worker(share: list[tuple]):
+        for args in share:
+            emit(*args)
+            # The model calls and the upsert are awaits in the real handler
+            for _ in range(3):
+                await asyncio.sleep(0)
+
+    watcher = asyncio.create_task(monitor())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(payloads[i::concurrency]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    running = False
+    await watcher
+    logs.stop_logging()
+
+    lags.sort()
+    return {
+        "mode": mode,
+        "webhooks_per_s": round(len(payloads) / elapsed, 1),
+        "loop_lag_p50_ms": round(statistics.median(lags) * 1000, 3) if lags else None,
+        "loop_lag_p99_ms": round(lags[int(len(lags) * 0.99) - 1] * 1000, 3) if lags else None,
+        "lines_written": stream.writes - writes_before,
+        # Records the queue had no room for while the sink lagged
+        "lines_dropped": int(logs.LOG_DROPPED.value(reason="queue_full") - dropped_before),
+    }
+
+
+def run(requests: int, concurrency: int, sink_delay_ms: float, log_file: str) -> dict:
+    rng = random.Random(1)
+    payloads = []
+    for i in range(requests):
+        number = order_number(rng, i)
+        body = email_payload(rng, number)
+        subject = body.get("Subject") or body.get("subject") or body["payload"]["Subject"]
+        snippet = body.get("snippet") or body.get("body", "")
+        from_email = body.get("From") or body.get("from") or body["payload"]["From"]
+        payloads.append((body, subject, snippet, from_email, extraction_for(body, number)))
+
+    results = []
+    with open(log_file, "w") as f:
+        stream = SlowStream(f, sink_delay_ms / 1000)
+        for mode in ("sync", "direct", "queue"):
+            results.append(asyncio.run(run_mode(mode, payloads, concurrency, stream)))
+    sync, direct, queued = results
+    return {
+        "benchmark": "logging",
+        "requests": requests,
+        "concurrency": concurrency,
+        "sink_delay_ms": sink_delay_ms,
+        "log_format": settings.log_format,
+        "results": results,
+        "speedup": round(queued["webhooks_per_s"] / sync["webhooks_per_s"], 2),
+        # The DEBUG demotion and lazy formatting, then the queue on top of them
+        "speedup_log_calls": round(direct["webhooks_per_s"] / sync["webhooks_per_s"], 2),
+        "speedup_queue": round(queued["webhooks_per_s"] / direct["webhooks_per_s"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sink-delay-ms", type=float, default=0.05,
+                        help="blocking time per written line (0 for a fast file)")
+    parser.add_argument("--log-file", default=os.devnull, help="where the log lines go")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    result = run(args.requests, args.concurrency, args.sink_delay_ms, args.log_file)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
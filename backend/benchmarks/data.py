@@ -0,0 +1,100 @@
+"""Synthetic orders and n8n-shaped email payloads shared by the benchmarks."""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+VENDORS = ["Amazon", "Noon", "Namshi", "Sharaf DG", "Carrefour"]
+VENDOR_DOMAINS = {
+    "Amazon": "amazon.ae",
+    "Noon": "noon.com",
+    "Namshi": "namshi.com",
+    "Sharaf DG": "sharafdg.com",
+    "Carrefour": "carrefouruae.com",
+}
+STATUSES = ["Ordered", "Shipped", "Out for Delivery", "Delivered"]
+# Share of each status in a mature database: most orders end up delivered
+STATUS_WEIGHTS = [0.1, 0.1, 0.05, 0.75]
+CITIES = ["Dubai", "Abu Dhabi", "Sharjah", "Al Ain", "Ajman"]
+CUSTOMERS = ["Unknown", "John", "Aisha", "Ravi", "Maria", "Omar"]
+PRODUCTS = ["Popsicle Molds, 40Pcs", "USB-C Charging Cable 2m", "Stainless Steel Water Bottle",
+            "Wireless Mouse", "Kids Water Colours Set", "Phone Case", "LED Desk Lamp", "Coffee Beans 1kg"]
+SUBJECTS = {
+    "Ordered": "Your {vendor} order #{number} has been placed",
+    "Shipped": "Shipped: your {vendor} order #{number} is on the way",
+    "Out for Delivery": "Out for delivery: {vendor} order #{number}",
+    "Delivered": "Delivered: your {vendor} order #{number}",
+}
+NON_ORDER_SUBJECTS = ["Weekly newsletter", "Your account security settings", "Meeting notes",
+                      "50% off this weekend only", "Invitation: team lunch"]
+
+
+def order_number(rng: random.Random, i: int) -> str:
+    return f"{400 + i % 600:03d}-{i:07d}-{rng.randint(1000000, 9999999)}"
+
+
+def make_order(rng: random.Random, i: int, now: datetime | None = None) -> tuple[dict, list[dict]]:
+    """One order row and its item rows, as plain dicts ready for insert."""
+    now = now or datetime.now(timezone.utc)
+    order_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+    order = {
+        "id": order_id,
+        "order_number": order_number(rng, i),
+        "vendor": rng.choice(VENDORS),
+        "customer_name": rng.choice(CUSTOMERS),
+        "status": rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+        "location": rng.choice(CITIES),
+        "expected_date": (created + timedelta(days=rng.randint(1, 7))).strftime("%Y-%m-%d"),
+        "notes": None,
+        "created_at": created,
+        "updated_at": created,
+    }
+    items = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "order_id": order_id,
+            "item_name": rng.choice(PRODUCTS),
+            "quantity": rng.randint(1, 3),
+            "price": round(rng.uniform(5, 500), 2),
+            "currency": "AED",
+        }
+        for _ in range(rng.randint(1, 4))
+    ]
+    return order, items
+
+
+def order_response(order: dict, items: list[dict]) -> dict:
+    """``order`` shaped like the API's order JSON."""
+    return {
+        **order,
+        "created_at": order["created_at"].isoformat(),
+        "updated_at": order["updated_at"].isoformat(),
+        "items": items,
+    }
+
+
+def email_payload(rng: random.Random, number: str, non_order: bool = False) -> dict:
+    """Webhook body in one of the formats n8n sends."""
+    vendor = rng.choice(VENDORS)
+    domain = VENDOR_DOMAINS[vendor]
+    if non_order:
+        subject = rng.choice(NON_ORDER_SUBJECTS)
+        body = "Hello, " + " ".join(rng.choice(["please", "see", "the", "update", "below"]) for _ in range(60))
+        sender = f"news@{rng.choice(['example.com', 'mail.example.org'])}"
+    else:
+        status = rng.choice(STATUSES)
+        subject = SUBJECTS[status].format(vendor=vendor, number=number)
+        item = rng.choice(PRODUCTS)
+        body = (
+            f"Order number {number}\nHello {rng.choice(CUSTOMERS)}, your order status: {status}.\n"
+            f"Item: {item} - AED {rng.uniform(5, 500):.2f}\nDelivering to {rng.choice(CITIES)}\n"
+            + "Thanks for shopping with us. " * rng.randint(5, 40)
+        )
+        sender = f"{vendor} <auto-confirm@{domain}>"
+
+    shape = rng.random()
+    if shape < 0.6:
+        return {"Subject": subject, "snippet": body, "From": sender}
+    if shape < 0.9:
+        return {"subject": subject, "body": body, "from": sender}
+    return {"payload": {"Subject": subject, "From": sender}, "snippet": body}
@@ -0,0 +1,135 @@
+"""Local stand-in for the GitHub Models chat completions endpoint.
+
+Answers ``POST /chat/completions`` in the same JSON shape as the real API,
+after a configurable delay. Classification and extraction answers are derived
+from the email text so the webhook exercises both its create and update paths.
+
+Usage: python -m benchmarks.fake_model [--port 9100] [--latency-ms 800] [--jitter-ms 200]
+Then start the app with GITHUB_ENDPOINT=http://127.0.0.1:9100 GITHUB_TOKEN=fake
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# "Order number 408-3351522-8481145", "order #NOON-123456": the code must contain a digit
+ORDER_NUMBER = re.compile(r"order\s*(?:number|no\.?|id)?\s*:?\s*#?\s*([A-Z]*-?\d[A-Z0-9-]{4,})", re.IGNORECASE)
+LOCATION = re.compile(r"Delivering to ([A-Za-z ]+)")
+ITEM = re.compile(r"Item: (.+?) - AED ([0-9.]+)")
+STATUS_KEYWORDS = [
+    ("out for delivery", "Out for Delivery"),
+    ("delivered", "Delivered"),
+    ("shipped", "Shipped"),
+    ("on the way", "Shipped"),
+]
+VENDOR_KEYWORDS = ["Amazon", "Noon", "Namshi", "Sharaf DG", "Carrefour"]
+
+
+class FakeModel:
+    def __init__(self, latency_ms: float = 800, jitter_ms: float = 200, error_rate: float = 0.0, seed: int = 1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    def classify(self, content: str) -> dict:
+        is_order = ORDER_NUMBER.search(content) is not None
+        return {
+            "isOrderEmail": is_order,
+            "confidence": "High",
+            "indicators": ["order number"] if is_order else [],
+            "reason": "Contains order number" if is_order else "Not an order email",
+        }
+
+    def extract(self, content: str) -> dict:
+        match = ORDER_NUMBER.search(content)
+        if not match:
+            return {"extraction_success": False, "error": "No order number found", "confidence": "Low"}
+        lowered = content.lower()
+        status = next((s for keyword, s in STATUS_KEYWORDS if keyword in lowered), "Ordered")
+        vendor = next((v for v in VENDOR_KEYWORDS if v.lower() in lowered), "Unknown")
+        location = LOCATION.search(content)
+        items = [
+            {"item_name": name, "quantity": 1, "price": price, "currency": "AED"}
+            for name, price in ITEM.findall(content)
+        ]
+        return {
+            "extraction_success": True,
+            "vendor": vendor,
+            "customer_name": None,
+            "order_number": match.group(1),
+            "order_status": status,
+            "delivery_info": {"location": location.group(1).strip() if location else None, "expected_date": None},
+            "items": items,
+            "order_total": {"amount": items[0]["price"], "currency": "AED"} if items else None,
+            "confidence": "High",
+        }
+
+    def respond(self, system: str, user: str) -> dict:
+        if "Classification Agent" in system:
+            return self.classify(user)
+        return self.extract(user)
+
+    def delay(self, system: str, user: str) -> float:
+        """Seconds to wait before answering."""
+        return max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    async def handle(self, request: Request):
+        self.requests += 1
+        body = await request.json()
+        messages = {m["role"]: m["content"] for m in body.get("messages", [])}
+        await asyncio.sleep(self.delay(messages.get("system", ""), messages.get("user", "")))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return JSONResponse(
+                {"error": {"code": "RateLimitReached", "message": "Rate limit exceeded"}},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        answer = self.respond(messages.get("system", ""), messages.get("user", ""))
+        content = json.dumps(answer)
+        return JSONResponse({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": sum(len(m) for m in messages.values()) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (sum(len(m) for m in messages.values()) + len(content)) // 4,
+            },
+        })
+
+
+def create_app(model: FakeModel) -> Starlette:
+    return Starlette(routes=[
+        Route("/chat/completions", model.handle, methods=["POST"]),
+        Route("/models/chat/completions", model.handle, methods=["POST"]),
+    ])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    args = parser.parse_args()
+
+    model = FakeModel(args.latency_ms, args.jitter_ms, args.error_rate)
+    uvicorn.run(create_app(model), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
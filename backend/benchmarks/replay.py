@@ -0,0 +1,182 @@
+"""Replay recorded webhook traffic against a local instance.
+
+Recordings come from running the app with ``WEBHOOK_RECORD_DIR`` set. The
+model answers are served from the recording by a built-in fake endpoint, so
+the app must be started with ``GITHUB_ENDPOINT=http://127.0.0.1:9100
+GITHUB_TOKEN=fake``. Then:
+
+    python -m benchmarks.replay recordings/*.ndjson.gz --speed 10 --output results/replay.json
+
+``--speed 1`` keeps the recorded arrival times, ``--speed 10`` compresses
+them tenfold and ``--speed 0`` sends as fast as ``--concurrency`` allows.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import httpx
+from app.ai import classification_input, extraction_input
+from app.recorder import read_recordings
+from app.routers.webhooks import extract_email_data
+from .fake_model import FakeModel, create_app
+from .run import compare, git_revision, summarize
+
+
+def _key(kind: str, user: str) -> tuple[str, str]:
+    return kind, hashlib.sha1(user.encode()).hexdigest()
+
+
+def _kind(system: str) -> str:
+    return "classify" if "Classification Agent" in system else "extract"
+
+
+class ReplayModel(FakeModel):
+    """Answers with the recorded model output for the same email.
+
+    Emails missing from the recording fall back to the synthetic answers of
+    :class:`FakeModel`. Latency is the recorded stage time times
+    ``latency_scale``.
+    """
+
+    def __init__(self, records: list[dict], latency_scale: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_scale = latency_scale
+        self.answers: dict[tuple[str, str], tuple[dict, float | None]] = {}
+        self.misses = 0
+        for record in records:
+            subject, snippet, _ = extract_email_data(record.get("payload") or {})
+            content = snippet or subject
+            timings = record.get("timings") or {}
+            if record.get("classification") is not None:
+                self.answers[_key("classify", classification_input(subject, content))] = (
+                    record["classification"], timings.get("classify"))
+            if record.get("extraction") is not None:
+                self.answers[_key("extract", extraction_input(subject, content))] = (
+                    record["extraction"], timings.get("extract"))
+
+    def delay(self, system: str, user: str) -> float:
+        answer = self.answers.get(_key(_kind(system), user))
+        if answer is None or answer[1] is None:
+            return super().delay(system, user)
+        return answer[1] * self.latency_scale
+
+    def respond(self, system: str, user: str) -> dict:
+        answer = self.answers.get(_key(_kind(system), user))
+        if answer is None:
+            self.misses += 1
+            return super().respond(system, user)
+        return answer[0]
+
+
+async def replay(records: list[dict], client: httpx.AsyncClient, speed: float, concurrency: int) -> dict:
+    latencies: list[float] = []
+    lag: list[float] = []
+    errors = 0
+    actions = Counter()
+    recorded_actions = Counter(r.get("action") or "none" for r in records)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(record: dict):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/webhooks/order", json=record.get("payload") or {})
+                if response.status_code >= 400:
+                    errors += 1
+                    actions["error"] += 1
+                else:
+                    actions[response.json().get("action") or "none"] += 1
+            except (httpx.HTTPError, ValueError):
+                errors += 1
+                actions["error"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    first_ts = records[0]["ts"] if records else 0.0
+    started = time.perf_counter()
+    tasks = []
+    for record in records:
+        if speed > 0:
+            due = started + (record["ts"] - first_ts) / speed
+            wait = due - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            lag.append(max(0.0, time.perf_counter() - due))
+        tasks.append(asyncio.create_task(send(record)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    result = summarize("webhook_replay", latencies, errors, elapsed, concurrency)
+    result["speed"] = speed
+    result["max_schedule_lag_ms"] = round(max(lag, default=0.0) * 1000, 2)
+    result["actions"] = dict(actions)
+    result["recorded_actions"] = dict(recorded_actions)
+    return result
+
+
+async def main_async(args) -> dict:
+    import uvicorn
+
+    records = sorted(read_recordings(args.recordings), key=lambda r: r.get("ts", 0.0))
+    if args.limit:
+        records = records[:args.limit]
+    print(f"Replaying {len(records)} webhooks at {'max' if args.speed <= 0 else f'{args.speed:g}x'} speed")
+
+    model = ReplayModel(records, latency_scale=args.model_latency_scale)
+    server = uvicorn.Server(uvicorn.Config(create_app(model), host="127.0.0.1", port=args.model_port,
+                                           log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            result = await replay(records, client, args.speed, args.concurrency)
+    finally:
+        server.should_exit = True
+        await server_task
+
+    result["model_cache_misses"] = model.misses
+    print(f"{result['rps']:.1f} req/s  p50 {result['p50_ms']:.1f} ms  p95 {result['p95_ms']:.1f} ms  "
+          f"p99 {result['p99_ms']:.1f} ms  errors {result['errors']}  lag {result['max_schedule_lag_ms']:.0f} ms")
+    print(f"actions {result['actions']} (recorded {result['recorded_actions']}), "
+          f"{model.misses} model calls not in the recording")
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "base_url": args.base_url,
+        "recordings": args.recordings,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "recordings")},
+        "results": [result],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recordings", nargs="+", help="recorded .ndjson.gz files")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor, 0 for max speed")
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--limit", type=int, help="replay only the first N records")
+    parser.add_argument("--model-port", type=int, default=9100)
+    parser.add_argument("--model-latency-scale", type=float, default=1.0,
+                        help="multiplier on recorded model latency (0 for instant answers)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        compare(args.compare, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Latency/throughput benchmark against a running instance.
+
+Start the fake model (``python -m benchmarks.fake_model``), seed the database
+(``python -m benchmarks.seed``) and start the app pointed at the fake model,
+then run e.g.:
+
+    python -m benchmarks.run --base-url http://127.0.0.1:8000 --concurrency 16 \\
+        --requests 500 --output results/postgres.json
+
+Each scenario reports p50/p95/p99 latency, requests per second and errors.
+Results are written as JSON so runs can be compared with ``--compare``.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+import httpx
+from .data import CITIES, STATUSES, VENDORS, email_payload, order_number
+
+SCENARIOS = [
+    "webhook",
+    "orders_list",
+    "orders_filtered",
+    "orders_search",
+    "orders_deep_page",
+    "order_lookup",
+    "stats",
+    "settings",
+    "dashboard",
+]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Workload:
+    """Builds the next request for each scenario."""
+
+    def __init__(self, total_orders: int, non_order_rate: float, new_order_rate: float, seed: int = 1):
+        self.rng = random.Random(seed)
+        self.total_orders = total_orders
+        self.non_order_rate = non_order_rate
+        self.new_order_rate = new_order_rate
+        self.next_new = total_orders + 1_000_000
+
+    def known_number(self) -> str:
+        # The middle part of a seeded order number is its unique sequence
+        i = self.rng.randrange(max(1, self.total_orders))
+        return f"{i:07d}"
+
+    def request(self, scenario: str) -> tuple[str, str, dict | None]:
+        rng = self.rng
+        if scenario == "webhook":
+            if rng.random() < self.non_order_rate:
+                return "POST", "/api/webhooks/order", email_payload(rng, "", non_order=True)
+            if rng.random() < self.new_order_rate or not self.total_orders:
+                self.next_new += 1
+                number = order_number(rng, self.next_new)
+            else:
+                number = order_number(rng, rng.randrange(self.total_orders))
+            return "POST", "/api/webhooks/order", email_payload(rng, number)
+        if scenario == "orders_list":
+            return "GET", "/api/orders?limit=100", None
+        if scenario == "orders_filtered":
+            return "GET", f"/api/orders?limit=50&status={rng.choice(STATUSES)}&vendor={rng.choice(VENDORS)}", None
+        if scenario == "orders_search":
+            return "GET", f"/api/orders?limit=50&search={rng.choice(CITIES)}", None
+        if scenario == "orders_deep_page":
+            offset = max(0, int(self.total_orders * rng.uniform(0.5, 0.95)))
+            return "GET", f"/api/orders?limit=50&offset={offset}", None
+        if scenario == "order_lookup":
+            return "GET", f"/api/orders?limit=1&search={self.known_number()}", None
+        if scenario == "stats":
+            return "GET", "/api/stats", None
+        if scenario == "settings":
+            return "GET", rng.choice(["/api/settings", "/api/settings/vendors", "/api/settings/statuses"]), None
+        if scenario == "dashboard":
+            return "GET", "/api/dashboard?limit=100", None
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def run_scenario(client: httpx.AsyncClient, workload: Workload, scenario: str,
+                       requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, body = workload.request(scenario)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return summarize(scenario, latencies, errors, elapsed, concurrency)
+
+
+def summarize(scenario: str, latencies: list[float], errors: int, elapsed: float, concurrency: int) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "scenario": scenario,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    scenarios = args.scenarios.split(",") if args.scenarios else SCENARIOS
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        total = (await client.get("/api/orders?limit=1&include_items=false&fields=id")).json()["total"]
+        workload = Workload(total, args.non_order_rate, args.new_order_rate, args.seed)
+        # Warm caches and connection pools before measuring
+        for scenario in scenarios:
+            for _ in range(args.warmup):
+                method, url, body = workload.request(scenario)
+                try:
+                    await client.request(method, url, json=body)
+                except httpx.HTTPError:
+                    pass
+        results = []
+        for scenario in scenarios:
+            requests = args.webhook_requests if scenario == "webhook" else args.requests
+            result = await run_scenario(client, workload, scenario, requests, args.concurrency)
+            print(f"{scenario:18} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+                  f"p95 {result['p95_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  errors {result['errors']}")
+            results.append(result)
+
+        try:
+            pools = (await client.get("/api/health/db")).json().get("pools")
+        except (httpx.HTTPError, ValueError):
+            pools = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "base_url": args.base_url,
+        "orders_in_db": total,
+        "pools": pools,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results,
+    }
+
+
+def compare(baseline_path: str, current: dict):
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    print(f"\n{'scenario':18} {'rps':>16} {'p95 ms':>18}")
+    for result in current["results"]:
+        before = baseline.get(result["scenario"])
+        if not before:
+            continue
+        rps_change = (result["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0
+        p95_change = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0
+        print(f"{result['scenario']:18} {result['rps']:>8.1f} ({rps_change:+5.1f}%) "
+              f"{result['p95_ms']:>9.1f} ({p95_change:+5.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", help=f"comma-separated subset of: {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=500, help="requests per read scenario")
+    parser.add_argument("--webhook-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--non-order-rate", type=float, default=0.3)
+    parser.add_argument("--new-order-rate", type=float, default=0.4)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        compare(args.compare, result)
+
+
+if __name__ == "__main__":
+    main()
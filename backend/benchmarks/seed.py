@@ -0,0 +1,61 @@
+"""Seed the configured database with synthetic orders and items.
+
+Usage: python -m benchmarks.seed --orders 100000 [--batch-size 2000] [--truncate]
+Uses DATABASE_URL like the app; run ``alembic upgrade head`` first.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from sqlalchemy import delete, func, insert, select
+from app.database import engine
+from app.models import Order, OrderItem
+from .data import make_order
+
+
+async def seed(orders: int, batch_size: int = 2000, truncate: bool = False, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    start = time.perf_counter()
+
+    async with engine.begin() as conn:
+        if truncate:
+            await conn.execute(delete(OrderItem))
+            await conn.execute(delete(Order))
+        # Continue numbering after existing rows so order numbers stay unique
+        offset = (await conn.execute(select(func.count(Order.id)))).scalar() or 0
+
+    inserted_items = 0
+    for batch_start in range(0, orders, batch_size):
+        order_rows, item_rows = [], []
+        for i in range(batch_start, min(batch_start + batch_size, orders)):
+            order, items = make_order(rng, offset + i, now)
+            order_rows.append(order)
+            item_rows.extend(items)
+        async with engine.begin() as conn:
+            await conn.execute(insert(Order), order_rows)
+            await conn.execute(insert(OrderItem), item_rows)
+        inserted_items += len(item_rows)
+        print(f"  {batch_start + len(order_rows)}/{orders} orders", end="\r", flush=True)
+
+    await engine.dispose()
+    return {
+        "orders": orders,
+        "items": inserted_items,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--truncate", action="store_true", help="delete existing orders first")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(asyncio.run(seed(args.orders, args.batch_size, args.truncate, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
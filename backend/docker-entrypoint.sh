@@ -0,0 +1,17 @@
+#!/bin/sh
+# Apply migrations once, then start the worker processes.
+# ALEMBIC_TARGET stops at an earlier revision. It is for one-off containers,
+# e.g. 0003 to run the online order key backfill while the previous release
+# keeps serving (see RUN_LOCAL.md); the app itself needs the head schema.
+set -e
+
+if [ "$1" = "gunicorn" ] && [ "${ALEMBIC_TARGET:-head}" != "head" ]; then
+    echo "ALEMBIC_TARGET=$ALEMBIC_TARGET: the app needs the head schema; use it for one-off commands only" >&2
+    exit 1
+fi
+
+if [ "${RUN_MIGRATIONS:-1}" = "1" ]; then
+    alembic upgrade "${ALEMBIC_TARGET:-head}"
+fi
+
+exec "$@"
@@ -0,0 +1,24 @@
+# Gunicorn settings for the production multi-worker mode.
+# Every value can be overridden through the environment.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Workers split the model API budgets (app.ai.budget_share) by this count
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Recycle workers after a number of requests (with jitter so they don't all
+# restart together) to cap memory growth; in-flight requests are drained first.
+max_requests = int(os.getenv("MAX_REQUESTS", 5000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 500))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+# Webhook requests wait on the model, so allow for slow upstream calls
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))
+keepalive = int(os.getenv("KEEPALIVE", 5))
+
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "*")
@@ -0,0 +1,66 @@
+"""initial schema
+
+Baseline matching the tables the app used to create with
+``Base.metadata.create_all``. Tables that already exist are left alone, so
+databases created before migrations were introduced upgrade cleanly.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "orders" not in existing:
+        op.create_table(
+            "orders",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("order_number", sa.String(255), nullable=False),
+            sa.Column("vendor", sa.String(100), nullable=True),
+            sa.Column("customer_name", sa.String(255), nullable=True),
+            sa.Column("status", sa.String(50), nullable=True),
+            sa.Column("location", sa.String(255), nullable=True),
+            sa.Column("expected_date", sa.String(100), nullable=True),
+            sa.Column("notes", sa.Text, nullable=True),
+            sa.Column("created_at", sa.DateTime, nullable=True),
+            sa.Column("updated_at", sa.DateTime, nullable=True),
+        )
+        op.create_index("ix_orders_order_number", "orders", ["order_number"], unique=True)
+
+    if "order_items" not in existing:
+        op.create_table(
+            "order_items",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("order_id", sa.String(36), sa.ForeignKey("orders.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("item_name", sa.Text, nullable=True),
+            sa.Column("quantity", sa.Integer, nullable=False),
+            sa.Column("price", sa.Float, nullable=True),
+            sa.Column("currency", sa.String(3), nullable=False),
+        )
+
+    if "order_settings" not in existing:
+        op.create_table(
+            "order_settings",
+            sa.Column("key", sa.String(100), primary_key=True),
+            sa.Column("value", sa.Text, nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("order_settings")
+    op.drop_table("order_items")
+    op.drop_table("orders")
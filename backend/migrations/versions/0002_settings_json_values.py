@@ -0,0 +1,80 @@
+"""store settings values as JSON
+
+Rewrites legacy ``str(list)`` values as JSON text, then changes the column
+type to JSONB on PostgreSQL (plain JSON elsewhere).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+import ast
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+settings_table = sa.table(
+    "order_settings",
+    sa.column("key", sa.String),
+    sa.column("value", sa.Text),
+)
+
+
+def _decode_legacy(raw):
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        pass
+    if raw.startswith("["):
+        try:
+            return ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            pass
+    return raw
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for key, raw in bind.execute(sa.select(settings_table.c.key, settings_table.c.value)).all():
+        value = _decode_legacy(raw)
+        bind.execute(
+            settings_table.update()
+            .where(settings_table.c.key == key)
+            .values(value=None if value is None else json.dumps(value))
+        )
+
+    if bind.dialect.name == "postgresql":
+        op.alter_column(
+            "order_settings",
+            "value",
+            type_=postgresql.JSONB(),
+            postgresql_using="value::jsonb",
+        )
+    else:
+        with op.batch_alter_table("order_settings") as batch:
+            batch.alter_column("value", type_=sa.JSON())
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column(
+            "order_settings",
+            "value",
+            type_=sa.Text(),
+            postgresql_using="value::text",
+        )
+    else:
+        with op.batch_alter_table("order_settings") as batch:
+            batch.alter_column("value", type_=sa.Text())
@@ -0,0 +1,96 @@
+"""native uuid keys and timestamptz, expand step
+
+PostgreSQL: adds ``uuid`` shadow columns for the text keys of ``orders`` and
+``order_items``, kept in sync by triggers for rows written while the old
+columns are still in use, and builds their indexes concurrently. Existing
+rows are filled in batches by ``python -m app.jobs.backfill_order_keys``
+before 0004 swaps the columns over. ``created_at``/``updated_at`` become
+``timestamptz``; with the session time zone at UTC this needs no rewrite.
+
+Online path: ``alembic upgrade 0003`` and the backfill job while the
+previous release keeps serving (the current models need the head schema),
+then ``alembic upgrade head`` as the new release rolls out. Upgrading
+straight to head also works; 0004 fills any rows the job has not reached.
+
+SQLite has no concurrent DDL to gain from, so it is converted in 0004.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.add_column("orders", sa.Column("id_uuid", postgresql.UUID(), nullable=True))
+    op.add_column("order_items", sa.Column("id_uuid", postgresql.UUID(), nullable=True))
+    op.add_column("order_items", sa.Column("order_id_uuid", postgresql.UUID(), nullable=True))
+
+    op.execute("""
+        CREATE FUNCTION orders_sync_id_uuid() RETURNS trigger AS $$
+        BEGIN
+            NEW.id_uuid := NEW.id::uuid;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION order_items_sync_id_uuid() RETURNS trigger AS $$
+        BEGIN
+            NEW.id_uuid := NEW.id::uuid;
+            NEW.order_id_uuid := NEW.order_id::uuid;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER orders_sync_id_uuid BEFORE INSERT OR UPDATE ON orders
+        FOR EACH ROW EXECUTE FUNCTION orders_sync_id_uuid()
+    """)
+    op.execute("""
+        CREATE TRIGGER order_items_sync_id_uuid BEFORE INSERT OR UPDATE ON order_items
+        FOR EACH ROW EXECUTE FUNCTION order_items_sync_id_uuid()
+    """)
+
+    # Stored values are UTC (datetime.utcnow); timestamp -> timestamptz is
+    # binary compatible when the session time zone is UTC
+    op.execute("SET LOCAL TimeZone = 'UTC'")
+    for column in ("created_at", "updated_at"):
+        op.alter_column("orders", column, type_=sa.DateTime(timezone=True))
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_id_uuid ON orders (id_uuid)")
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_order_items_id_uuid ON order_items (id_uuid)")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_items_order_id_uuid ON order_items (order_id_uuid)"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS order_items_sync_id_uuid ON order_items")
+    op.execute("DROP TRIGGER IF EXISTS orders_sync_id_uuid ON orders")
+    op.execute("DROP FUNCTION IF EXISTS order_items_sync_id_uuid()")
+    op.execute("DROP FUNCTION IF EXISTS orders_sync_id_uuid()")
+    op.drop_column("order_items", "order_id_uuid")
+    op.drop_column("order_items", "id_uuid")
+    op.drop_column("orders", "id_uuid")
+
+    op.execute("SET LOCAL TimeZone = 'UTC'")
+    for column in ("created_at", "updated_at"):
+        op.alter_column("orders", column, type_=sa.DateTime(timezone=False))
@@ -0,0 +1,126 @@
+"""native uuid keys, contract step
+
+PostgreSQL: fills any shadow keys the backfill job has not reached, then
+swaps the ``uuid`` columns in for the text keys. The primary keys reuse the
+unique indexes built concurrently in 0003, so no index is built while the
+tables are locked; the NOT NULL and foreign key checks still scan them.
+``order_items.order_id`` ends up indexed.
+
+SQLite: rewrites the keys as the 32-character hex that SQLAlchemy's ``Uuid``
+type stores there, rebuilds both tables with the new column types and adds
+the ``order_items.order_id`` index.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite: 32-char hex back to the canonical 8-4-4-4-12 form
+_DASHED = (
+    "substr({c}, 1, 8) || '-' || substr({c}, 9, 4) || '-' || substr({c}, 13, 4)"
+    " || '-' || substr({c}, 17, 4) || '-' || substr({c}, 21, 12)"
+)
+
+
+def _constraint_names(table: str) -> tuple[str, list[str]]:
+    inspector = sa.inspect(op.get_bind())
+    pk = inspector.get_pk_constraint(table)["name"]
+    fks = [fk["name"] for fk in inspector.get_foreign_keys(table) if fk["referred_table"] == "orders"]
+    return pk, fks
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        _upgrade_postgresql()
+    else:
+        _upgrade_sqlite()
+
+
+def _upgrade_postgresql() -> None:
+    op.execute("UPDATE orders SET id_uuid = id::uuid WHERE id_uuid IS NULL")
+    op.execute(
+        "UPDATE order_items SET id_uuid = id::uuid, order_id_uuid = order_id::uuid "
+        "WHERE id_uuid IS NULL OR order_id_uuid IS NULL"
+    )
+
+    op.execute("DROP TRIGGER order_items_sync_id_uuid ON order_items")
+    op.execute("DROP TRIGGER orders_sync_id_uuid ON orders")
+    op.execute("DROP FUNCTION order_items_sync_id_uuid()")
+    op.execute("DROP FUNCTION orders_sync_id_uuid()")
+
+    items_pk, items_fks = _constraint_names("order_items")
+    orders_pk, _ = _constraint_names("orders")
+    for fk in items_fks:
+        op.drop_constraint(fk, "order_items", type_="foreignkey")
+    op.drop_constraint(items_pk, "order_items", type_="primary")
+    op.drop_constraint(orders_pk, "orders", type_="primary")
+
+    op.drop_column("order_items", "order_id")
+    op.drop_column("order_items", "id")
+    op.drop_column("orders", "id")
+    op.alter_column("orders", "id_uuid", new_column_name="id", nullable=False)
+    op.alter_column("order_items", "id_uuid", new_column_name="id", nullable=False)
+    op.alter_column("order_items", "order_id_uuid", new_column_name="order_id", nullable=False)
+
+    op.execute("ALTER TABLE orders ADD CONSTRAINT orders_pkey PRIMARY KEY USING INDEX ix_orders_id_uuid")
+    op.execute("ALTER TABLE order_items ADD CONSTRAINT order_items_pkey PRIMARY KEY USING INDEX ix_order_items_id_uuid")
+    op.execute("ALTER INDEX ix_order_items_order_id_uuid RENAME TO ix_order_items_order_id")
+    op.create_foreign_key(
+        "order_items_order_id_fkey", "order_items", "orders", ["order_id"], ["id"], ondelete="CASCADE"
+    )
+
+
+def _upgrade_sqlite() -> None:
+    op.execute("UPDATE orders SET id = lower(replace(id, '-', ''))")
+    op.execute("UPDATE order_items SET id = lower(replace(id, '-', '')), order_id = lower(replace(order_id, '-', ''))")
+
+    with op.batch_alter_table("orders", recreate="always") as batch:
+        batch.alter_column("id", type_=sa.Uuid(as_uuid=False), existing_nullable=False)
+        batch.alter_column("created_at", type_=sa.DateTime(timezone=True))
+        batch.alter_column("updated_at", type_=sa.DateTime(timezone=True))
+    with op.batch_alter_table("order_items", recreate="always") as batch:
+        batch.alter_column("id", type_=sa.Uuid(as_uuid=False), existing_nullable=False)
+        batch.alter_column("order_id", type_=sa.Uuid(as_uuid=False), existing_nullable=False)
+        batch.create_index("ix_order_items_order_id", ["order_id"])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_order_items_order_id", table_name="order_items")
+        op.drop_constraint("order_items_order_id_fkey", "order_items", type_="foreignkey")
+        op.alter_column("order_items", "order_id", type_=sa.String(36), postgresql_using="order_id::text")
+        op.alter_column("order_items", "id", type_=sa.String(36), postgresql_using="id::text")
+        op.alter_column("orders", "id", type_=sa.String(36), postgresql_using="id::text")
+        op.create_foreign_key(
+            "order_items_order_id_fkey", "order_items", "orders", ["order_id"], ["id"], ondelete="CASCADE"
+        )
+        # 0003's downgrade drops these shadow columns again
+        op.add_column("orders", sa.Column("id_uuid", sa.Uuid(), nullable=True))
+        op.add_column("order_items", sa.Column("id_uuid", sa.Uuid(), nullable=True))
+        op.add_column("order_items", sa.Column("order_id_uuid", sa.Uuid(), nullable=True))
+        return
+
+    with op.batch_alter_table("order_items", recreate="always") as batch:
+        batch.drop_index("ix_order_items_order_id")
+        batch.alter_column("id", type_=sa.String(36), existing_nullable=False)
+        batch.alter_column("order_id", type_=sa.String(36), existing_nullable=False)
+    with op.batch_alter_table("orders", recreate="always") as batch:
+        batch.alter_column("id", type_=sa.String(36), existing_nullable=False)
+        batch.alter_column("created_at", type_=sa.DateTime())
+        batch.alter_column("updated_at", type_=sa.DateTime())
+    op.execute(f"UPDATE orders SET id = {_DASHED.format(c='id')}")
+    op.execute(
+        f"UPDATE order_items SET id = {_DASHED.format(c='id')}, order_id = {_DASHED.format(c='order_id')}"
+    )
@@ -0,0 +1,49 @@
+"""parsed expected delivery date
+
+Adds ``orders.expected_on`` next to the free-form ``expected_date`` and a
+partial index over undelivered orders for the due/overdue queries. The
+index is built concurrently on PostgreSQL. Existing rows are filled by
+``python -m app.jobs.backfill_expected_on``.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPEN_ORDERS = "status <> 'Delivered'"
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("expected_on", sa.Date(), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_expected_on_open "
+                f"ON orders (expected_on) WHERE {OPEN_ORDERS}"
+            )
+    else:
+        op.create_index(
+            "ix_orders_expected_on_open", "orders", ["expected_on"], sqlite_where=sa.text(OPEN_ORDERS)
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_expected_on_open", table_name="orders")
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_column("orders", "expected_on")
+    else:
+        with op.batch_alter_table("orders") as batch:
+            batch.drop_column("expected_on")
@@ -0,0 +1,60 @@
+"""archive tables for delivered orders
+
+``archived_orders``/``archived_order_items`` mirror the live tables; rows
+are moved there by ``python -m app.jobs.archive_orders`` (or the in-app
+loop) and back when a webhook touches an archived order.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "archived_orders",
+        sa.Column("id", sa.Uuid(as_uuid=False), primary_key=True),
+        sa.Column("order_number", sa.String(255), nullable=False),
+        sa.Column("vendor", sa.String(100), nullable=True),
+        sa.Column("customer_name", sa.String(255), nullable=True),
+        sa.Column("status", sa.String(50), nullable=True),
+        sa.Column("location", sa.String(255), nullable=True),
+        sa.Column("expected_date", sa.String(100), nullable=True),
+        sa.Column("expected_on", sa.Date(), nullable=True),
+        sa.Column("notes", sa.Text, nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_archived_orders_order_number", "archived_orders", ["order_number"], unique=True)
+
+    op.create_table(
+        "archived_order_items",
+        sa.Column("id", sa.Uuid(as_uuid=False), primary_key=True),
+        sa.Column(
+            "order_id", sa.Uuid(as_uuid=False),
+            sa.ForeignKey("archived_orders.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column("item_name", sa.Text, nullable=True),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("price", sa.Float, nullable=True),
+        sa.Column("currency", sa.String(3), nullable=False),
+    )
+    op.create_index("ix_archived_order_items_order_id", "archived_order_items", ["order_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("archived_order_items")
+    op.drop_table("archived_orders")
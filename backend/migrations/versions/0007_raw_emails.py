@@ -0,0 +1,43 @@
+"""raw email archive
+
+``raw_emails`` keeps the compressed subject, body and sender of each
+distinct email, linked to the order it produced, for
+``python -m app.jobs.reextract_orders``.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "raw_emails",
+        sa.Column("id", sa.Uuid(as_uuid=False), primary_key=True),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("codec", sa.String(10), nullable=False),
+        sa.Column("content", sa.LargeBinary, nullable=False),
+        sa.Column("size", sa.Integer, nullable=False),
+        sa.Column("order_id", sa.Uuid(as_uuid=False), nullable=True),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("extraction_version", sa.String(16), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_raw_emails_content_hash", "raw_emails", ["content_hash"], unique=True)
+    op.create_index("ix_raw_emails_order_id", "raw_emails", ["order_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("raw_emails")
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import ai
+from app.ai import ModelScheduler, budget_share, call_ai_api, job_budget, lend_job_reserve
+from app.instrumentation import AI_CALL
+from app.settings_store import AI_JOB_LEASE_KEY, SettingsStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    """Two web workers, a quarter reserved for jobs, 60 requests and 8 calls at once."""
+    for name, value in (("ai_workers", 2), ("ai_job_budget_share", 0.25), ("ai_requests_per_minute", 60),
+                        ("ai_tokens_per_minute", 0), ("ai_max_concurrency", 8)):
+        monkeypatch.setattr(ai.settings, name, value)
+    scheduler = ModelScheduler(budget_share())
+    monkeypatch.setattr(ai, "scheduler", scheduler)
+    return scheduler
+
+
+async def test_live_calls_go_first(budgets, monkeypatch):
+    monkeypatch.setattr(ai.settings, "ai_max_concurrency", 1)
+    scheduler = ModelScheduler()
+    await scheduler.acquire("live", 1)
+    granted = []
+
+    async def call(priority):
+        await scheduler.acquire(priority, 1)
+        granted.append(priority)
+        scheduler.release("ok")
+
+    tasks = [asyncio.create_task(call(priority)) for priority in ("reprocess", "backfill", "live")]
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth() == {"live": 1, "backfill": 1, "reprocess": 1}
+    scheduler.release("ok")
+    await asyncio.gather(*tasks)
+    assert granted == ["live", "backfill", "reprocess"]
+
+
+async def test_limit_halves_on_429_and_grows_back(budgets):
+    scheduler = ModelScheduler(0.5)
+    assert scheduler.limit == 4
+    scheduler.in_flight = 1
+    scheduler.release("rate_limited", retry_after=30)
+    assert scheduler.limit == 2
+    assert scheduler.paused_until > time.monotonic() + 29
+    for _ in range(20):
+        scheduler.in_flight = 1
+        scheduler.release("ok")
+    assert scheduler.limit == 4
+
+
+def test_budget_share(budgets):
+    assert budget_share(job=True) == 0.25
+    assert budget_share() == 0.375
+    # No job holds the reserve: the web workers split everything
+    assert budget_share(lent=True) == 0.5
+
+
+async def test_rescale_keeps_spent_budget_and_learned_limit(budgets):
+    scheduler = ModelScheduler(1.0)
+    scheduler.requests.take(50)
+    scheduler.limit = 4.0
+    scheduler.rescale(0.5)
+    assert scheduler.requests.capacity == 30
+    assert scheduler.requests.level < 11
+    assert (scheduler.max_concurrency, scheduler.limit) == (4, 2.0)
+
+
+async def test_web_workers_spend_the_reserve_without_a_job(budgets):
+    store = SettingsStore()
+    store.subscribe(lend_job_reserve)
+    store._apply({AI_JOB_LEASE_KEY: {"holder": "job", "expires": time.time() + 60}}, "1")
+    assert budgets.requests.capacity == 60 * 0.375
+    store._apply({AI_JOB_LEASE_KEY: None}, "2")
+    assert budgets.requests.capacity == 60 * 0.5
+
+    # A lease nobody renews runs out on its own
+    store._apply({AI_JOB_LEASE_KEY: {"holder": "job", "expires": time.time() + 0.05}}, "3")
+    assert budgets.requests.capacity == 60 * 0.375
+    await asyncio.sleep(0.1)
+    assert budgets.requests.capacity == 60 * 0.5
+
+
+async def test_job_holds_the_lease_while_it_runs(budgets, monkeypatch, session_factory):
+    store = SettingsStore()
+    monkeypatch.setattr(ai, "settings_store", store)
+    web = SettingsStore()
+
+    async with job_budget(session_factory):
+        assert budgets.requests.capacity == 60 * 0.25
+        async with session_factory() as db:
+            await web.load(db)
+        assert web.get(AI_JOB_LEASE_KEY)["expires"] > time.time()
+    async with session_factory() as db:
+        assert await web.refresh_if_changed(db)
+    assert web.get(AI_JOB_LEASE_KEY) is None
+    assert AI_JOB_LEASE_KEY not in web.all()
+
+
+async def test_unparseable_answer_is_an_error(budgets, monkeypatch):
+    class Client:
+        async def complete(self, **kwargs):
+            message = SimpleNamespace(content="Sorry, no JSON today")
+            return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setenv("GITHUB_TOKEN", "token")
+    monkeypatch.setattr(ai, "get_client", lambda endpoint, token: Client())
+    budgets.limit = 2.0
+    ok, errors = AI_CALL.count(model="test", outcome="ok"), AI_CALL.count(model="test", outcome="error")
+
+    result = await call_ai_api("prompt", "email", model="test")
+    assert "error" in result
+    assert AI_CALL.count(model="test", outcome="ok") == ok
+    assert AI_CALL.count(model="test", outcome="error") == errors + 1
+    # Not a success for the adaptive limit either
+    assert budgets.limit == 2.0
+
+
+@pytest.mark.parametrize("task, result, expected", [
+    ("extraction", {"order_number": "A-1", "confidence": "High"}, None),
+    ("extraction", {"order_number": "A-1", "confidence": "Low"}, "low_confidence"),
+    ("extraction", {"order_number": None, "confidence": "High"}, "missing_order_number"),
+    ("classification", {"isOrderEmail": True, "confidence": "Medium"}, None),
+    ("classification", {"confidence": "High"}, "malformed"),
+    # A bigger model does not fix an API error
+    ("extraction", {"error": "429"}, None),
+])
+def test_escalation_reason(task, result, expected):
+    assert ai.escalation_reason(task, result) == expected
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    """Answers by model, recording the models called."""
+    monkeypatch.setattr(ai.settings, "ai_extraction_model", "small")
+    monkeypatch.setattr(ai.settings, "ai_escalation_model", "large")
+    calls = []
+    answers = {}
+
+    async def call_ai_api(prompt, user_content, model=None):
+        calls.append(model)
+        return answers[model]
+
+    monkeypatch.setattr(ai, "call_ai_api", call_ai_api)
+    return answers, calls
+
+
+async def test_weak_answer_escalates_once(tiers):
+    answers, calls = tiers
+    answers.update(small={"order_number": None}, large={"order_number": "A-1"})
+    escalations = ai.AI_ESCALATIONS.value(task="extraction", reason="missing_order_number")
+    assert await ai.call_tiered("extraction", "prompt", "email") == {"order_number": "A-1"}
+    assert calls == ["small", "large"]
+    assert ai.AI_ESCALATIONS.value(task="extraction", reason="missing_order_number") == escalations + 1
+
+    # The escalation model's answer is kept even when it is weak too
+    calls.clear()
+    answers["large"] = {"order_number": "A-1", "confidence": "Low"}
+    assert (await ai.call_tiered("extraction", "prompt", "email"))["confidence"] == "Low"
+    assert calls == ["small", "large"]
+
+
+async def test_good_answer_or_error_stays_on_the_base_tier(tiers):
+    answers, calls = tiers
+    answers.update(small={"order_number": "A-1"})
+    assert await ai.call_tiered("extraction", "prompt", "email") == {"order_number": "A-1"}
+    answers.update(small={"error": "timeout"})
+    assert await ai.call_tiered("extraction", "prompt", "email") == {"error": "timeout"}
+    assert calls == ["small", "small"]
+
+
+def test_one_tier_when_the_escalation_model_is_the_same(monkeypatch):
+    monkeypatch.setattr(ai.settings, "ai_extraction_model", "")
+    monkeypatch.setattr(ai.settings, "ai_escalation_model", "")
+    monkeypatch.setenv("GITHUB_MODEL", "openai/gpt-4o")
+    assert ai.task_models("extraction") == ["openai/gpt-4o"]
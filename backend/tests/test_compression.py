@@ -0,0 +1,107 @@
+import gzip
+import zlib
+
+import pytest
+
+from app import compression
+from app.compression import CompressionMiddleware, compress, parse_accept_encoding
+
+pytestmark = pytest.mark.anyio
+
+BODY = b'{"orders": [' + b'{"order_number": "405-1", "status": "Shipped"},' * 100 + b"]}"
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        return compression.brotli.decompress(data)
+    return compression.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def app(chunks: list[bytes], content_type: str = "application/json", **headers):
+    """ASGI app sending ``chunks`` as one (or a streamed) body."""
+    async def asgi(scope, receive, send):
+        raw = [(b"content-type", content_type.encode())]
+        raw += [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+        await send({"type": "http.response.start", "status": 200, "headers": raw})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return asgi
+
+
+async def call(asgi, accept_encoding: str) -> tuple[dict, list[dict]]:
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await CompressionMiddleware(asgi)(scope, None, send)
+    start, *bodies = messages
+    return {name.decode(): value.decode() for name, value in start["headers"]}, bodies
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", {"gzip", "deflate", "br", "zstd"}),
+    ("gzip;q=1.0, br;q=0, zstd; q=0.5", {"gzip", "zstd"}),
+    ("GZIP;q=bad, identity", {"identity"}),
+    ("", set()),
+])
+def test_parse_accept_encoding(header, expected):
+    assert parse_accept_encoding(header) == expected
+
+
+def needs(encoding: str):
+    library = {"br": compression.brotli, "zstd": compression.zstandard}.get(encoding, zlib)
+    if library is None:
+        pytest.skip(f"{encoding} library not installed")
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, br, zstd", "zstd"),
+    ("gzip, br", "br"),
+    ("gzip, zstd;q=0", "gzip"),
+])
+async def test_preferred_encoding_wins(accept, expected):
+    needs(expected)
+    headers, bodies = await call(app([BODY]), accept)
+    assert headers["content-encoding"] == expected
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(bodies[0]["body"]) < len(BODY)
+    assert decompress(bodies[0]["body"], expected) == BODY
+
+
+@pytest.mark.parametrize("body, headers, accept", [
+    # No encoding in common
+    (BODY, {}, "deflate"),
+    # Below compression_min_size
+    (b'{"ok": true}', {}, "gzip"),
+    (BODY, {"content_type": "image/png"}, "gzip"),
+    # A precompressed static file
+    (BODY, {"content_encoding": "br"}, "gzip, br"),
+])
+async def test_passes_through(body, headers, accept):
+    sent, bodies = await call(app([body], **headers), accept)
+    assert sent.get("content-encoding") == headers.get("content_encoding")
+    assert [message["body"] for message in bodies] == [body]
+
+
+async def test_streamed_body_is_flushed_per_chunk():
+    chunks = [b"data: " + BODY[:500] + b"\n\n", b"data: " + BODY[500:1000] + b"\n\n", b""]
+    headers, bodies = await call(app(chunks, "text/event-stream", content_length="9999"), "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    # Every chunk can be decoded as soon as it arrives
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(bodies[0]["body"]) == chunks[0]
+    assert decoder.decompress(bodies[1]["body"]) == chunks[1]
+    assert bodies[-1]["more_body"] is False
+    decoder.decompress(bodies[-1]["body"])
+    assert decoder.eof
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_compress_round_trip(encoding):
+    needs(encoding)
+    assert decompress(compress(BODY, encoding), encoding) == BODY
@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.models import Order
+
+pytestmark = pytest.mark.anyio
+
+
+async def count(db) -> int:
+    return await db.scalar(select(func.count(Order.id)))
+
+
+async def test_released_savepoint_rolls_back_with_the_transaction(db):
+    async with db.begin_nested():
+        db.add(Order(order_number="A-1"))
+    async with db.begin_nested():
+        db.add(Order(order_number="A-2"))
+    await db.rollback()
+    assert await count(db) == 0
+
+
+async def test_savepoint_rollback_keeps_the_rest(db):
+    db.add(Order(order_number="A-1"))
+    await db.flush()
+    with pytest.raises(ValueError):
+        async with db.begin_nested():
+            db.add(Order(order_number="A-2"))
+            await db.flush()
+            raise ValueError
+    await db.commit()
+    assert await db.scalar(select(Order.order_number)) == "A-1"
@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+
+from app.dates import parse_expected_date
+
+# A Thursday
+RECEIVED = date(2026, 1, 15)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-01-25", date(2026, 1, 25)),
+    ("Jan 23", date(2026, 1, 23)),
+    ("Thursday, Jan 23", date(2026, 1, 23)),
+    ("23 January", date(2026, 1, 23)),
+    ("23rd of Jan, 2026", date(2026, 1, 23)),
+    ("23/01", date(2026, 1, 23)),
+    ("23-01-26", date(2026, 1, 23)),
+    ("tomorrow", date(2026, 1, 16)),
+    ("Today by 10pm", date(2026, 1, 15)),
+    ("Monday", date(2026, 1, 19)),
+    ("Thursday", date(2026, 1, 15)),
+    # Ranges resolve to their last day
+    ("Jan 23 - Jan 25", date(2026, 1, 25)),
+    ("Sat, 17 Jan - Mon, 19 Jan", date(2026, 1, 19)),
+    # A day shortly before the email stays in its year ("was due Jan 2")
+    ("Jan 2", date(2026, 1, 2)),
+    ("Dec 2", date(2026, 12, 2)),
+])
+def test_parse_expected_date(value, expected):
+    assert parse_expected_date(value, RECEIVED) == expected
+
+
+def test_year_rollover():
+    assert parse_expected_date("Jan 3", date(2025, 12, 29)) == date(2026, 1, 3)
+    assert parse_expected_date("Dec 30", date(2026, 1, 2)) == date(2025, 12, 30)
+
+
+def test_month_first():
+    assert parse_expected_date("01/23", RECEIVED) == date(2026, 1, 23)
+    assert parse_expected_date("02/03", RECEIVED, day_first=False) == date(2026, 2, 3)
+    assert parse_expected_date("02/03", RECEIVED, day_first=True) == date(2026, 3, 2)
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "3-5 business days", "2030-01-01", "32/13"])
+def test_unrecognised(value):
+    assert parse_expected_date(value, RECEIVED) is None
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.events import broker, notify_order_change
+from app.models import Order
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def events(engine):
+    """Events dispatched in-process; PostgreSQL sends them through NOTIFY instead."""
+    if engine.dialect.name == "postgresql":
+        pytest.skip("events go through pg_notify")
+    queue = broker.subscribe()
+
+    def received() -> list[str]:
+        numbers = []
+        while not queue.empty():
+            numbers.append(json.loads(queue.get_nowait())["order_number"])
+        return numbers
+
+    yield received
+    broker.unsubscribe(queue)
+
+
+async def created(db, order_number: str):
+    order = Order(order_number=order_number)
+    db.add(order)
+    await notify_order_change(db, "created", order)
+
+
+async def test_sent_on_commit(db, events):
+    await created(db, "A-1")
+    assert events() == []
+    await db.commit()
+    assert events() == ["A-1"]
+
+
+async def test_dropped_on_rollback(db, events):
+    await created(db, "A-1")
+    async with db.begin_nested():
+        await created(db, "A-2")
+    await db.rollback()
+    await db.execute(text("SELECT 1"))
+    await db.commit()
+    assert events() == []
+
+
+async def test_released_savepoint_waits_for_commit(db, events):
+    await created(db, "A-1")
+    async with db.begin_nested():
+        await created(db, "A-2")
+    assert events() == []
+    await db.commit()
+    assert events() == ["A-1", "A-2"]
+
+
+async def test_savepoint_rollback_drops_only_its_events(db, events):
+    await created(db, "A-1")
+    with pytest.raises(ValueError):
+        async with db.begin_nested():
+            await created(db, "A-2")
+            raise ValueError
+    # A failed flush rolls the savepoint back from inside the flush
+    with pytest.raises(IntegrityError):
+        async with db.begin_nested():
+            await created(db, "A-1")
+    async with db.begin_nested():
+        async with db.begin_nested():
+            await created(db, "A-3")
+    await db.commit()
+    assert events() == ["A-1", "A-3"]
@@ -0,0 +1,73 @@
+import re
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app import instrumentation
+from app.instrumentation import (
+    REPEATED_QUERIES, REQUEST_QUERIES, InstrumentationMiddleware, Registry, instrument_engine, stage,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    """An app whose route runs three identical statements and one timed stage."""
+    monkeypatch.setattr(instrumentation.settings, "server_timing", True)
+    instrument_engine(engine)
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware)
+
+    @app.get("/api/probe/{order_id}")
+    async def probe(order_id: str):
+        async with engine.connect() as connection:
+            for _ in range(3):
+                await connection.execute(text("SELECT 1"))
+        with stage("classify"):
+            pass
+        return {"order_id": order_id}
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_server_timing_and_route_metrics(client):
+    queries = REQUEST_QUERIES.count(route="/api/probe/{order_id}")
+    async with client:
+        response = await client.get("/api/probe/A-1")
+    timing = response.headers["server-timing"]
+    # SQLite adds the BEGIN
+    assert re.search(r'db;dur=[0-9.]+;desc="[34] queries"', timing)
+    assert "total;dur=" in timing and "db-slowest;dur=" in timing and "classify;dur=" in timing
+    # Labelled by route template, not by the order in the URL
+    assert REQUEST_QUERIES.count(route="/api/probe/{order_id}") == queries + 1
+
+
+async def test_repeated_statement_is_counted(client, monkeypatch):
+    repeated = REPEATED_QUERIES.value(route="/api/probe/{order_id}")
+    monkeypatch.setattr(instrumentation.settings, "n_plus_one_threshold", 3)
+    async with client:
+        await client.get("/api/probe/A-1")
+        monkeypatch.setattr(instrumentation.settings, "n_plus_one_threshold", 4)
+        await client.get("/api/probe/A-1")
+    assert REPEATED_QUERIES.value(route="/api/probe/{order_id}") == repeated + 1
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls", ("outcome",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    calls.inc(outcome='say "hi"')
+    latency.observe(0.05)
+    latency.observe(5)
+    registry.add_collector(lambda: calls.inc(outcome="collected"))
+
+    lines = registry.render().splitlines()
+    assert "# TYPE calls_total counter" in lines
+    assert 'calls_total{outcome="say \\"hi\\""} 1' in lines
+    assert 'calls_total{outcome="collected"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert "latency_seconds_count 2" in lines
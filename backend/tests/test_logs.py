@@ -0,0 +1,90 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from app import logs
+from app.logs import LOG_DROPPED, JsonFormatter, NonBlockingQueueHandler, RedactFilter, SampleFilter
+
+
+def record(msg: str, *args, level: int = logging.INFO, **extra) -> logging.LogRecord:
+    made = logging.LogRecord("app.test", level, __file__, 1, msg, args or None, None)
+    made.__dict__.update(extra)
+    return made
+
+
+def test_redact_body_fields_and_cut_long_strings():
+    redact = RedactFilter(10, {"body", "snippet"})
+    made = record("Webhook %s %s", {"Subject": "x" * 30, "body": "secret text"}, ["short", "y" * 20],
+                  snippet="hello there")
+    assert redact.filter(made)
+    assert made.args[0] == {"Subject": "xxxxxxxxxx... [30 chars]", "body": "[redacted 11 chars]"}
+    assert made.args[1] == ["short", "yyyyyyyyyy... [20 chars]"]
+    assert made.snippet == "[redacted 11 chars]"
+
+
+def test_queued_record_keeps_the_arguments_as_logged():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    handler.addFilter(RedactFilter(200, set()))
+    payload = {"status": "Ordered", "items": [{"name": "Cable"}]}
+    logger = logging.getLogger("app.test.queue")
+    logger.addHandler(handler)
+    try:
+        logger.warning("Order %s", payload, extra={"order": payload})
+    finally:
+        logger.removeHandler(handler)
+    # The caller goes on changing its objects while the record waits
+    payload["status"] = "Shipped"
+    payload["items"].append({"name": "Case"})
+
+    line = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert line["message"] == "Order {'status': 'Ordered', 'items': [{'name': 'Cable'}]}"
+    assert line["order"] == {"status": "Ordered", "items": [{"name": "Cable"}]}
+
+
+def test_sampling_keeps_the_burst_then_a_share(monkeypatch):
+    monkeypatch.setattr(logs.time, "monotonic", lambda: 100.0)
+    sample = SampleFilter(0.25, 2)
+    sampled = LOG_DROPPED.value(reason="sampled")
+    kept = [sample.filter(record("Processing %s", i)) for i in range(10)]
+    assert kept == [True, True, False, False, False, True, False, False, False, True]
+    assert LOG_DROPPED.value(reason="sampled") == sampled + 6
+    # Warnings and other messages are counted apart
+    assert sample.filter(record("Processing %s", 0, level=logging.WARNING))
+    assert sample.filter(record("Other %s", 0))
+
+
+def test_full_queue_drops_and_counts():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    dropped = LOG_DROPPED.value(reason="queue_full")
+    handler.handle(record("first"))
+    handler.handle(record("second"))
+    assert handler.queue.qsize() == 1
+    assert LOG_DROPPED.value(reason="queue_full") == dropped + 1
+
+
+@pytest.fixture
+def root_handlers():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    logs.stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_setup_logging_writes_redacted_json(monkeypatch, root_handlers):
+    monkeypatch.setattr(logs.settings, "log_format", "json")
+    monkeypatch.setattr(logs.settings, "log_redact_fields", "body")
+    stream = io.StringIO()
+    logs.setup_logging(stream)
+    payload = {"body": "Dear customer"}
+    logging.getLogger("app.test").warning("Webhook %s", payload, extra={"email": payload})
+    payload["body"] = "changed"
+    logs.stop_logging()
+
+    line = json.loads(stream.getvalue())
+    assert line["message"] == "Webhook {'body': '[redacted 13 chars]'}"
+    assert line["email"] == {"body": "[redacted 13 chars]"}
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app import mailbox
+from app.dates import as_utc
+from app.events import broker
+from app.models import Order, RawEmail
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def db(db, monkeypatch, session_factory):
+    """The test session, with ``apply_chunk`` writing through the same engine."""
+    monkeypatch.setattr(mailbox, "AsyncSessionLocal", session_factory)
+    return db
+
+
+def email(received_at: str | None, subject: str) -> dict:
+    return {"subject": subject, "snippet": subject, "from_email": "orders@amazon.ae", "received_at": received_at}
+
+
+def order(order_number: str | None, status: str | None, **values) -> dict:
+    return {"outcome": "order", "extraction": {
+        "order_number": order_number, "vendor": "Amazon", "order_status": status, **values,
+    }}
+
+
+async def stored(db, order_number: str) -> Order:
+    return (await db.execute(select(Order).where(Order.order_number == order_number))).scalar_one()
+
+
+async def test_chunk_applies_oldest_email_first(db):
+    counts = await mailbox.apply_chunk(
+        [
+            email("2026-01-03T09:00:00+00:00", "Delivered"),
+            email("2026-01-01T09:00:00+00:00", "Ordered"),
+            email("2026-01-02T09:00:00+00:00", "Shipped"),
+            email("2026-01-02T10:00:00+00:00", "Other order"),
+        ],
+        [order("A-1", "Delivered"), order("A-1", "Ordered"), order("A-1", "Shipped"), order("B-2", "Ordered")],
+    )
+    assert counts == {"created": 2, "updated": 2}
+    first = await stored(db, "A-1")
+    assert first.status == "Delivered"
+    assert as_utc(first.created_at) == datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+    assert as_utc(first.updated_at) == datetime(2026, 1, 3, 9, tzinfo=timezone.utc)
+    assert await db.scalar(select(func.count(RawEmail.id))) == 4
+
+
+async def test_older_email_in_later_chunk_is_stale(db):
+    await mailbox.apply_chunk([email("2026-01-03T09:00:00+00:00", "Delivered")], [order("A-1", "Delivered")])
+    counts = await mailbox.apply_chunk(
+        [email("2026-01-01T09:00:00+00:00", "Ordered")], [order("A-1", "Ordered", customer_name="Aisha")]
+    )
+    assert counts == {"stale": 1}
+    first = await stored(db, "A-1")
+    assert (first.status, first.customer_name) == ("Delivered", "Aisha")
+    assert as_utc(first.created_at) == datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+
+
+async def test_undated_email_goes_last_and_only_fills_gaps(db):
+    counts = await mailbox.apply_chunk(
+        [
+            email(None, "Undated"),
+            email("2026-01-02T09:00:00+00:00", "Shipped"),
+            email("2026-01-01T09:00:00+00:00", "Ordered"),
+        ],
+        [
+            order("A-1", "Delivered", delivery_info={"location": "Dubai"}),
+            order("A-1", "Shipped"),
+            order("A-1", "Ordered"),
+        ],
+    )
+    assert counts == {"created": 1, "updated": 1, "stale": 1}
+    first = await stored(db, "A-1")
+    assert (first.status, first.location) == ("Shipped", "Dubai")
+    assert as_utc(first.updated_at) == datetime(2026, 1, 2, 9, tzinfo=timezone.utc)
+
+
+async def test_failed_upsert_keeps_the_rest_of_the_chunk(db, engine):
+    queue = broker.subscribe()
+    try:
+        counts = await mailbox.apply_chunk(
+            [email("2026-01-01T09:00:00+00:00", "Good"), email("2026-01-01T10:00:00+00:00", "Bad")],
+            # No order number: the insert fails inside its savepoint
+            [order("A-1", "Ordered"), order(None, "Ordered")],
+        )
+        assert counts == {"created": 1, "error": 1}
+        assert (await stored(db, "A-1")).status == "Ordered"
+        if engine.dialect.name != "postgresql":
+            # Delivered in-process on commit; PostgreSQL sends them through NOTIFY
+            events = [json.loads(queue.get_nowait()) for _ in range(queue.qsize())]
+            assert [(event["action"], event["order_number"]) for event in events] == [("created", "A-1")]
+    finally:
+        broker.unsubscribe(queue)
+
+
+def test_parse_message_dates_in_utc():
+    raw = (
+        b"From: Amazon.ae <auto-confirm@amazon.ae>\r\n"
+        b"Subject: Your order 405-1 has shipped\r\n"
+        b"Date: Fri, 02 Jan 2026 13:00:00 +0400\r\n"
+        b"Content-Type: text/plain\r\n\r\n"
+        b"Order 405-1 is on the way.\r\n"
+    )
+    parsed = mailbox.parse_message(raw)
+    assert parsed["received_at"] == "2026-01-02T09:00:00+00:00"
+    assert mailbox.parse_message(raw, ("noon.com",)) == {"skip": "sender"}
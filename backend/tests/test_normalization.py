@@ -0,0 +1,72 @@
+import pytest
+
+from app.normalization import Normalizer
+from app.settings_store import DEFAULT_STATUSES, DEFAULT_VENDORS
+
+
+@pytest.fixture
+def normalizer():
+    return Normalizer(
+        DEFAULT_VENDORS,
+        DEFAULT_STATUSES,
+        vendor_aliases={"AMZ": "Amazon"},
+        status_aliases={"with courier": "Out for Delivery"},
+        sender_domains={"mail.example-shop.com": "Other"},
+    )
+
+
+@pytest.mark.parametrize("value, from_email, expected", [
+    ("Amazon", None, "Amazon"),
+    ("amazon.ae", None, "Amazon"),
+    ("AMAZON UAE", None, "Amazon"),
+    (" Sharaf-DG ", None, "Sharaf DG"),
+    ("noon minutes", None, "Noon"),
+    ("amz", None, "Amazon"),
+    # Unknown names are kept, trimmed
+    (" Local Shop ", None, "Local Shop"),
+    # The sender domain (or a parent of it) fills in a missing name
+    (None, "Amazon.ae <auto-confirm@amazon.ae>", "Amazon"),
+    ("", "orders@email.noon.com", "Noon"),
+    (None, "shop@mail.example-shop.com", "Other"),
+    (None, "someone@unknown.org", None),
+])
+def test_vendor(normalizer, value, from_email, expected):
+    assert normalizer.vendor(value, from_email) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Shipped", "Shipped"),
+    ("in transit", "Shipped"),
+    ("Order Confirmed", "Ordered"),
+    ("OUT-FOR-DELIVERY", "Out for Delivery"),
+    ("With Courier", "Out for Delivery"),
+    ("package delivered", "Delivered"),
+    (" Returned ", "Returned"),
+    (None, None),
+    ("", None),
+])
+def test_status(normalizer, value, expected):
+    assert normalizer.status(value) == expected
+
+
+@pytest.mark.parametrize("current, new, expected", [
+    ("Ordered", "Shipped", True),
+    ("Shipped", "Delivered", True),
+    ("in transit", "arrived", True),
+    ("Delivered", "Shipped", False),
+    ("Out for Delivery", "Ordered", False),
+    ("Shipped", "Shipped", False),
+    ("Shipped", "dispatched", False),
+    # Statuses outside the configured order always count as a move
+    ("Delivered", "Returned", True),
+    ("Returned", "Ordered", True),
+    ("Returned", "Returned", False),
+])
+def test_advances(normalizer, current, new, expected):
+    assert normalizer.advances(current, new) is expected
+
+
+def test_advances_follows_configured_order():
+    normalizer = Normalizer(DEFAULT_VENDORS, ["Ordered", "Delivered", "Shipped"])
+    assert normalizer.advances("Delivered", "Shipped")
+    assert not normalizer.advances("Shipped", "Delivered")
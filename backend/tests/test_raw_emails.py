@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app import raw_emails
+from app.dates import as_utc
+from app.models import RawEmail
+from app.raw_emails import compress, decompress, should_store, store_raw_email, unpack
+
+pytestmark = pytest.mark.anyio
+
+
+def test_compress_round_trip(monkeypatch):
+    data = b'{"subject": "Your order", "body": "' + b"x" * 1000 + b'"}'
+    codec, content = compress(data)
+    assert codec == "zstd" and len(content) < len(data)
+    assert decompress(codec, content) == data
+
+    monkeypatch.setattr(raw_emails, "zstandard", None)
+    codec, content = compress(data)
+    assert codec == "zlib"
+    assert decompress(codec, content) == data
+
+
+@pytest.mark.parametrize("mode, expected", [("orders", (True, False)), ("all", (True, True)), ("off", (False, False))])
+def test_should_store(monkeypatch, mode, expected):
+    monkeypatch.setattr(raw_emails.settings, "raw_email_store", mode)
+    assert (should_store(True), should_store(False)) == expected
+
+
+async def test_store_round_trip_and_dedupe(db, make_order):
+    order = await make_order("A-1")
+    received_at = datetime(2026, 1, 2, 13, tzinfo=timezone(timedelta(hours=4)))
+    raw = await store_raw_email(db, "Shipped", "Order A-1 shipped", "orders@amazon.ae", received_at)
+    await db.commit()
+    assert unpack(raw) == {"subject": "Shipped", "body": "Order A-1 shipped", "from": "orders@amazon.ae"}
+    assert raw.order_id is None
+
+    # The same email again only links it
+    again = await store_raw_email(db, "Shipped", "Order A-1 shipped", "orders@amazon.ae", None, order.id, "v1")
+    await db.commit()
+    assert again.id == raw.id
+    stored = (await db.execute(select(RawEmail))).scalar_one()
+    assert (stored.order_id, stored.extraction_version) == (order.id, "v1")
+    assert as_utc(stored.received_at) == datetime(2026, 1, 2, 9, tzinfo=timezone.utc)
+
+    await store_raw_email(db, "Delivered", "Order A-1 delivered", "orders@amazon.ae", None, order.id)
+    await db.commit()
+    assert await db.scalar(select(func.count(RawEmail.id))) == 2
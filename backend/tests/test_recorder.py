@@ -0,0 +1,53 @@
+import pytest
+
+from app import recorder as recorder_module
+from app.recorder import Sanitizer, WebhookRecorder, read_recordings, sanitize_record
+
+pytestmark = pytest.mark.anyio
+
+
+def test_sanitizer_pseudonymises_contacts():
+    sanitize = Sanitizer()
+    text = sanitize("Reply to aisha.k@gmail.com or call +971 50 123 4567 / 050-1234567 about 405-1234567-1234567")
+    assert "aisha.k" not in text and "@gmail.com" in text
+    assert "+000 00 000 0000" in text and "000-0000000" in text
+    # Order numbers are kept so replays take the same paths
+    assert "405-1234567-1234567" in text
+    # The same address always gets the same pseudonym
+    assert sanitize("AISHA.K@gmail.com") == sanitize("aisha.k@gmail.com")
+
+
+def test_customer_name_is_replaced_everywhere():
+    record = sanitize_record({
+        "payload": {"body": "Hi Aisha Khan, your order shipped", "To": "aisha@example.com"},
+        "extraction": {"customer_name": "Aisha Khan", "items": [{"item_name": "Gift for AISHA KHAN"}]},
+        "classification": {"isOrderEmail": True},
+        "timings": {"total": 1.5},
+    })
+    assert "aisha khan" not in str(record).lower()
+    name = record["extraction"]["customer_name"]
+    assert name.startswith("Customer ") and name in record["payload"]["body"]
+    assert record["timings"] == {"total": 1.5}
+
+
+@pytest.mark.parametrize("name", [None, "", "Al", "Unknown"])
+def test_short_or_unknown_names_are_left(name):
+    assert Sanitizer(name)("Hi Al, unknown sender") == "Hi Al, unknown sender"
+
+
+async def test_recordings_round_trip_sanitized(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder_module.settings, "webhook_record_dir", str(tmp_path))
+    monkeypatch.setattr(recorder_module.settings, "webhook_record_sample_rate", 1.0)
+    recorder = WebhookRecorder()
+    await recorder.start()
+    payload = {"from": "orders@amazon.ae", "body": "Ship to Aisha Khan, aisha@example.com"}
+    recorder.record(payload, {"action": "created", "extraction": {"customer_name": "Aisha Khan"}}, {"classify": 0.12345})
+    await recorder.stop()
+
+    [record] = list(read_recordings([str(path) for path in tmp_path.iterdir()]))
+    assert record["action"] == "created" and record["timings"] == {"classify": 0.1235}
+    # Sender domains are kept for vendor detection
+    assert record["payload"]["from"].startswith("user-") and record["payload"]["from"].endswith("@amazon.ae")
+    assert "Aisha" not in record["payload"]["body"] and "aisha@" not in record["payload"]["body"]
+    # The handler's own objects are not changed
+    assert payload["body"] == "Ship to Aisha Khan, aisha@example.com"
@@ -0,0 +1,168 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.ai import extraction_version
+from app.dates import as_utc
+from app.jobs import reextract_orders as job
+from app.models import Order, OrderItem, RawEmail
+from app.raw_emails import store_raw_email
+
+pytestmark = pytest.mark.anyio
+
+JAN_1 = datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+JAN_2 = datetime(2026, 1, 2, 9, tzinfo=timezone.utc)
+
+# What the "current" models read from each stored email body
+EXTRACTIONS = {
+    "A-1 placed": {"order_number": "A-1", "vendor": "Amazon", "customer_name": "Aisha", "order_status": "Ordered",
+                   "delivery_info": {"location": "Dubai"},
+                   "items": [{"item_name": "Cable", "quantity": 1, "price": "35"}]},
+    "A-1 shipped": {"order_number": "A-1", "order_status": "Shipped", "delivery_info": {"expected_date": "Jan 5"}},
+    "B-2 placed": {"order_number": "B-2", "vendor": "Noon", "order_status": "Ordered"},
+    "C-3 placed": {"order_number": "X-9", "order_status": "Ordered"},
+}
+
+
+@pytest.fixture
+def model(monkeypatch, session_factory):
+    """Stand-in extraction model; ``model.during`` runs inside each call."""
+    monkeypatch.setattr(job, "AsyncSessionLocal", session_factory)
+
+    class Model:
+        during = None
+        calls = 0
+
+    async def extract_order_data(subject, body):
+        Model.calls += 1
+        if Model.during is not None:
+            await Model.during()
+        if body not in EXTRACTIONS:
+            return {"extraction_success": False, "error": "unreadable"}
+        return {"extraction_success": True, **EXTRACTIONS[body]}
+
+    monkeypatch.setattr(job, "extract_order_data", extract_order_data)
+    return Model
+
+
+@pytest.fixture
+async def orders(db, make_order):
+    """Orders as an older prompt left them: wrong location, no items."""
+    first = await make_order("A-1", vendor="Amazon", customer_name="Aisha", status="Shipped", location="Dubia",
+                             created_at=JAN_1, updated_at=JAN_2)
+    second = await make_order("B-2", vendor="Noon", status="Ordered", created_at=JAN_1, updated_at=JAN_1)
+    for body, order, received_at in (
+        ("A-1 placed", first, JAN_1), ("A-1 shipped", first, JAN_2), ("B-2 placed", second, JAN_1),
+    ):
+        await store_raw_email(db, body, body, "orders@amazon.ae", received_at, order.id, "old")
+    await db.commit()
+    return first, second
+
+
+async def reload(db, order_number: str) -> Order:
+    db.expire_all()
+    order = (await db.execute(select(Order).where(Order.order_number == order_number))).scalar_one()
+    # End the read so the job can have SQLite's single writer connection
+    await db.commit()
+    return order
+
+
+async def test_replay_keeps_later_values_and_forward_status():
+    def raw(received_at):
+        return RawEmail(received_at=received_at, created_at=received_at)
+
+    values = job.replay([
+        (raw(JAN_2), {}, {"order_status": "Ordered", "delivery_info": {}}),
+        (raw(JAN_1), {}, {"order_status": "Shipped", "delivery_info": {"location": "Dubai"}}),
+    ])
+    assert values == {"status": "Shipped", "location": "Dubai"}
+
+
+async def test_reextract_writes_only_changes(db, model, orders):
+    result = await job.reextract_orders()
+    assert (result["orders"], result["emails"], result["changed"]) == (2, 3, 1)
+    assert result["fields"]["location"] == 1 and result["fields"]["items"] == 1
+    assert result["fields"]["status"] == 0
+
+    first = await reload(db, "A-1")
+    assert (first.location, first.status, first.expected_date) == ("Dubai", "Shipped", "Jan 5")
+    # Nothing new happened to the order
+    assert as_utc(first.updated_at) == JAN_2
+    items = (await db.execute(select(OrderItem).where(OrderItem.order_id == first.id))).scalars().all()
+    assert [(item.item_name, item.price) for item in items] == [("Cable", 35.0)]
+    versions = set((await db.execute(select(RawEmail.extraction_version))).scalars())
+    assert versions == {extraction_version()}
+    await db.commit()
+
+    # Everything is stamped with the current version now
+    model.calls = 0
+    assert (await job.reextract_orders())["orders"] == 0
+    assert model.calls == 0
+
+
+async def test_dry_run_writes_nothing(db, model, orders):
+    result = await job.reextract_orders(dry_run=True)
+    assert result["changed"] == 1
+    assert (await reload(db, "A-1")).location == "Dubia"
+    assert set((await db.execute(select(RawEmail.extraction_version))).scalars()) == {"old"}
+
+
+async def test_failed_or_mismatched_email_leaves_the_order(db, model, make_order, orders):
+    first_id, third_id = orders[0].id, (await make_order("C-3", status="Ordered")).id
+    await store_raw_email(db, "C-3 placed", "C-3 placed", "orders@amazon.ae", JAN_1, third_id, "old")
+    await store_raw_email(db, "A-1 ?", "A-1 garbled", "orders@amazon.ae", JAN_2, first_id, "old")
+    await db.commit()
+
+    result = await job.reextract_orders()
+    assert (result["failed"], result["mismatched"], result["skipped"]) == (1, 1, 2)
+    assert (await reload(db, "A-1")).location == "Dubia"
+    unstamped = set((await db.execute(
+        select(RawEmail.order_id).where(RawEmail.extraction_version == "old")
+    )).scalars())
+    assert unstamped == {first_id, third_id}
+
+
+async def test_webhook_during_extraction_is_kept(db, model, orders, session_factory):
+    order_id = orders[0].id
+
+    async def delivered():
+        # A webhook moves the order on while the models are running
+        async with session_factory() as other:
+            await other.execute(update(Order).where(Order.id == order_id).values(
+                status="Delivered", updated_at=datetime(2026, 1, 3, tzinfo=timezone.utc)))
+            await other.commit()
+        model.during = None
+
+    model.during = delivered
+    result = await job.reextract_orders()
+    assert result["changed"] == 1
+    first = await reload(db, "A-1")
+    # The replay ends at Shipped; the order is diffed as it is after the calls
+    assert (first.status, first.location) == ("Delivered", "Dubai")
+    assert as_utc(first.updated_at) == datetime(2026, 1, 3, tzinfo=timezone.utc)
+
+
+async def test_order_updated_before_the_write_is_retried(db, model, orders, monkeypatch):
+    order_id = orders[0].id
+    diff = job.diff
+
+    def read_before_update(order, items, values, fields):
+        # As if a webhook committed between reading the order and writing it
+        set_committed_value(order, "updated_at", JAN_1)
+        return diff(order, items, values, fields)
+
+    monkeypatch.setattr(job, "diff", read_before_update)
+    result = await job.reextract_orders()
+    assert (result["conflicts"], result["changed"]) == (1, 0)
+    assert (await reload(db, "A-1")).location == "Dubia"
+    unstamped = set((await db.execute(
+        select(RawEmail.order_id).where(RawEmail.extraction_version == "old")
+    )).scalars())
+    await db.commit()
+    assert unstamped == {order_id}
+
+    monkeypatch.setattr(job, "diff", diff)
+    assert (await job.reextract_orders())["changed"] == 1
+    assert (await reload(db, "A-1")).location == "Dubai"
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.settings_store import DEFAULT_VENDORS, VERSION_KEY, SettingsStore
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_defaults_until_set(db):
+    store = SettingsStore()
+    await store.ensure_loaded(db)
+    assert store.loaded and store.version is None
+    assert store.vendors == DEFAULT_VENDORS
+    assert not store.has("vendors")
+
+    await store.set(db, "vendors", ["Amazon"])
+    assert store.vendors == ["Amazon"]
+    assert store.all()["vendors"] == ["Amazon"]
+    assert VERSION_KEY not in store.all()
+
+
+async def test_other_worker_reloads_on_version_change(db):
+    writer, reader = SettingsStore(), SettingsStore()
+    await reader.load(db)
+    seen = []
+    reader.subscribe(lambda store: seen.append(store.version))
+    assert seen == [None]
+
+    assert not await reader.refresh_if_changed(db)
+    await writer.set(db, "statuses", ["Ordered", "Delivered"])
+    assert await reader.refresh_if_changed(db)
+    assert reader.statuses == ["Ordered", "Delivered"]
+    assert seen == [None, writer.version]
+    assert not await reader.refresh_if_changed(db)
+
+
+async def test_listener_errors_do_not_stop_the_reload(db):
+    store = SettingsStore()
+
+    def broken(store):
+        raise RuntimeError("boom")
+
+    store.subscribe(broken)
+    await store.set(db, "vendors", ["Noon"])
+    assert store.vendors == ["Noon"]
+
+
+async def test_poll_picks_up_writes(db, session_factory):
+    writer, reader = SettingsStore(), SettingsStore()
+    await reader.load(db)
+    await db.commit()
+    task = asyncio.create_task(reader.poll(session_factory, interval=0.01))
+    try:
+        async with session_factory() as other:
+            await writer.set(other, "vendors", ["Carrefour"])
+        for _ in range(100):
+            if reader.version == writer.version:
+                break
+            await asyncio.sleep(0.01)
+        assert reader.vendors == ["Carrefour"]
+    finally:
+        task.cancel()
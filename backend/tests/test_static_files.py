@@ -0,0 +1,73 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from app import static_files
+from app.static_files import DEFAULT_CACHE, IMMUTABLE_CACHE, INDEX_CACHE, StaticIndex, compress_directory
+
+SCRIPT = b"console.log('orders');\n" * 100
+
+
+def request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.fixture
+def static(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "app.1a2b.js").write_bytes(SCRIPT)
+    (tmp_path / "favicon.ico").write_bytes(b"\0" * 100)
+    (tmp_path / "index.html").write_bytes(b"<html><script src='/assets/app.1a2b.js'></script></html>" * 20)
+    # The script and index.html; the icon is too small
+    assert compress_directory(str(tmp_path)) == (4 if static_files.brotli else 2)
+    return StaticIndex(str(tmp_path))
+
+
+def test_precompressed_siblings_are_not_assets(static):
+    assert set(static.assets) == {"assets/app.1a2b.js", "favicon.ico"}
+    assert static.lookup("/index.html") is None
+    assert gzip.decompress(open(static.lookup("assets/app.1a2b.js").variants["gzip"][0], "rb").read()) == SCRIPT
+
+
+def test_hashed_assets_are_immutable(static):
+    assert static.lookup("/assets/app.1a2b.js").cache_control == IMMUTABLE_CACHE
+    assert static.lookup("/favicon.ico").cache_control == DEFAULT_CACHE
+
+
+def test_asset_variant_follows_accept_encoding(static):
+    asset = static.lookup("assets/app.1a2b.js")
+    response = static.file_response(request(accept_encoding="gzip;q=1, br;q=0"), asset)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.path.endswith(".gz")
+    assert response.headers["etag"] == asset.etag[:-1] + '-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    plain = static.file_response(request(), asset)
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == asset.etag
+
+
+def test_matching_etag_is_not_modified(static):
+    asset = static.lookup("assets/app.1a2b.js")
+    etag = static.file_response(request(accept_encoding="gzip"), asset).headers["etag"]
+    assert static.file_response(request(accept_encoding="gzip", if_none_match=etag), asset).status_code == 304
+    # The gzip tag does not match the identity body
+    assert static.file_response(request(if_none_match=etag), asset).status_code == 200
+
+
+def test_index_is_served_from_memory_and_revalidated(static):
+    response = static.index_response(request(accept_encoding="gzip"))
+    assert response.headers["cache-control"] == INDEX_CACHE
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body).startswith(b"<html>")
+
+    etag = response.headers["etag"]
+    assert static.index_response(request(accept_encoding="gzip", if_none_match=etag)).status_code == 304
+
+
+def test_missing_build_directory(tmp_path):
+    static = StaticIndex(str(tmp_path / "missing"))
+    assert static.index_response(request()) is None
+    assert static.lookup("favicon.ico") is None
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import pytest
+
+from app.models import ArchivedOrder, utcnow
+from app.routers.orders import query_orders
+from app.routers.stats import compute_stats
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def orders(db, make_order):
+    now = utcnow()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    await make_order("AE-100", vendor="Amazon", customer_name="Aisha Khan", status="Ordered", created_at=now,
+                     items=[{"item_name": "Cable", "quantity": 2, "price": 35.0}])
+    await make_order("AE-101", vendor="Amazon", customer_name="Omar", status="Delivered", created_at=now)
+    await make_order("NO-200", vendor="Noon", customer_name="aisha k", status="Delivered",
+                     created_at=month_start - timedelta(days=3))
+    await make_order("NO-201", vendor="Noon", customer_name="100% Cotton Co", status="Shipped", created_at=now)
+    db.add(ArchivedOrder(
+        id="0190a1b2-0000-7000-8000-000000000001", order_number="AE-050", vendor="Amazon",
+        customer_name="Aisha Old", status="Delivered", created_at=now - timedelta(days=200),
+        updated_at=now - timedelta(days=150),
+    ))
+    await db.commit()
+
+
+async def test_stats_counts(db, orders):
+    stats = await compute_stats(db)
+    assert stats["total_orders"] == 4
+    assert {row["status"]: row["count"] for row in stats["orders_by_status"]} == {
+        "Ordered": 1, "Delivered": 2, "Shipped": 1}
+    assert {row["vendor"]: row["count"] for row in stats["orders_by_vendor"]} == {"Amazon": 2, "Noon": 2}
+    assert stats["pending_delivery"] == 2
+    assert stats["delivered_this_month"] == 1
+    assert len(stats["recent_orders"]) == 4
+    assert stats["recent_orders"][-1]["order_number"] == "NO-200"
+
+
+async def test_stats_include_archived(db, orders):
+    stats = await compute_stats(db, include_archived=True)
+    assert stats["total_orders"] == 5
+    assert stats["orders_by_vendor"][0] == {"vendor": "Amazon", "count": 3}
+    # Archived orders are delivered, so they never count as pending
+    assert stats["pending_delivery"] == 2
+
+
+@pytest.mark.parametrize("search, expected", [
+    ("aisha", {"AE-100", "NO-200"}),
+    ("AISHA", {"AE-100", "NO-200"}),
+    ("ae-10", {"AE-100", "AE-101"}),
+    # LIKE wildcards in the search are matched literally
+    ("100%", {"NO-201"}),
+    ("_", set()),
+])
+async def test_search_is_case_insensitive_substring(db, orders, search, expected):
+    page = await query_orders(db, search=search)
+    assert {order["order_number"] for order in page["orders"]} == expected
+    assert page["total"] == len(expected)
+
+
+async def test_search_include_archived(db, orders):
+    page = await query_orders(db, search="aisha", include_archived=True)
+    assert {order["order_number"] for order in page["orders"]} == {"AE-100", "NO-200", "AE-050"}
+
+
+async def test_query_orders_filters_and_items(db, orders):
+    page = await query_orders(db, vendor="Amazon", status="Ordered")
+    assert page["total"] == 1
+    [order] = page["orders"]
+    assert order["order_number"] == "AE-100"
+    assert [(item["item_name"], item["quantity"]) for item in order["items"]] == [("Cable", 2)]
+
+    page = await query_orders(db, include_items="count", fields="order_number")
+    assert {order["order_number"]: order["item_count"] for order in page["orders"]}["AE-100"] == 1
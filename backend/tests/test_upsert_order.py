@@ -0,0 +1,109 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.dates import as_utc
+from app.models import OrderItem
+from app.order_writes import ORDER_WRITES_SKIPPED, STATUS_REGRESSIONS
+from app.routers.webhooks import upsert_order
+
+pytestmark = pytest.mark.anyio
+
+JAN_10 = datetime(2026, 1, 10, 8, 0, tzinfo=timezone.utc)
+JAN_12 = datetime(2026, 1, 12, 8, 0, tzinfo=timezone.utc)
+JAN_14 = datetime(2026, 1, 14, 8, 0, tzinfo=timezone.utc)
+
+
+def extraction(status: str | None = "Ordered", **values) -> dict:
+    return {
+        "order_number": "405-1234567-1234567",
+        "vendor": "amazon.ae",
+        "customer_name": "Aisha",
+        "order_status": status,
+        "delivery_info": {"location": "Dubai", "expected_date": "Jan 20"},
+        "items": [{"item_name": "Cable", "quantity": 1, "price": "AED 35.00"}],
+        **values,
+    }
+
+
+async def items_of(db, order) -> list[tuple]:
+    result = await db.execute(select(OrderItem).where(OrderItem.order_id == order.id))
+    return sorted((item.item_name, item.quantity, item.price) for item in result.scalars())
+
+
+async def test_created(db):
+    action, order = await upsert_order(db, extraction(), received_at=JAN_10)
+    assert action == "created"
+    assert (order.vendor, order.status, order.location) == ("Amazon", "Ordered", "Dubai")
+    assert order.expected_on == date(2026, 1, 20)
+    assert as_utc(order.created_at) == as_utc(order.updated_at) == JAN_10
+    assert await items_of(db, order) == [("Cable", 1, 35.0)]
+
+
+async def test_created_without_status_starts_ordered(db):
+    action, order = await upsert_order(db, extraction(status=None))
+    assert (action, order.status) == ("created", "Ordered")
+
+
+async def test_updated(db):
+    await upsert_order(db, extraction(), received_at=JAN_10)
+    action, order = await upsert_order(db, extraction(
+        "Shipped", items=[{"item_name": "Cable", "quantity": 2, "price": "AED 70.00"}],
+    ), received_at=JAN_12)
+    assert action == "updated"
+    assert order.status == "Shipped"
+    assert as_utc(order.updated_at) == JAN_12
+    assert as_utc(order.created_at) == JAN_10
+    assert await items_of(db, order) == [("Cable", 2, 70.0)]
+
+
+async def test_unchanged_skips_the_write(db):
+    await upsert_order(db, extraction(), received_at=JAN_10)
+    skipped = ORDER_WRITES_SKIPPED.value(source="email")
+    action, order = await upsert_order(db, extraction(), received_at=JAN_12)
+    assert action == "unchanged"
+    assert as_utc(order.updated_at) == JAN_10
+    assert ORDER_WRITES_SKIPPED.value(source="email") == skipped + 1
+
+
+async def test_status_does_not_move_backwards(db):
+    await upsert_order(db, extraction("Delivered"), received_at=JAN_10)
+    regressions = STATUS_REGRESSIONS.value()
+    action, order = await upsert_order(db, extraction("Shipped"), received_at=JAN_12)
+    assert (action, order.status) == ("unchanged", "Delivered")
+    assert STATUS_REGRESSIONS.value() == regressions + 1
+
+    # An email that gives no status is not a regression
+    action, order = await upsert_order(db, extraction(None), received_at=JAN_14)
+    assert (action, order.status) == ("unchanged", "Delivered")
+    assert STATUS_REGRESSIONS.value() == regressions + 1
+
+
+async def test_stale_only_fills_missing_fields(db):
+    await upsert_order(db, extraction("Shipped", customer_name=None, delivery_info={}), received_at=JAN_12)
+    action, order = await upsert_order(db, extraction("Ordered", vendor="Noon"), received_at=JAN_10)
+    assert action == "stale"
+    # Kept from the newer email
+    assert (order.status, order.vendor) == ("Shipped", "Amazon")
+    # Filled in from the older one, which also dates the order
+    assert (order.customer_name, order.location, order.expected_date) == ("Aisha", "Dubai", "Jan 20")
+    assert as_utc(order.created_at) == JAN_10
+    assert as_utc(order.updated_at) == JAN_12
+
+
+async def test_stale_without_anything_to_fill(db):
+    await upsert_order(db, extraction("Ordered"), received_at=JAN_10)
+    await upsert_order(db, extraction("Shipped"), received_at=JAN_14)
+    skipped = ORDER_WRITES_SKIPPED.value(source="stale_email")
+    action, order = await upsert_order(db, extraction("Ordered"), received_at=JAN_12)
+    assert (action, order.status) == ("stale", "Shipped")
+    assert ORDER_WRITES_SKIPPED.value(source="stale_email") == skipped + 1
+
+
+async def test_stale_flag_for_undated_email(db):
+    await upsert_order(db, extraction("Shipped", delivery_info={}), received_at=JAN_12)
+    action, order = await upsert_order(db, extraction("Delivered"), stale=True)
+    assert action == "stale"
+    assert (order.status, order.location) == ("Shipped", "Dubai")
+    assert as_utc(order.updated_at) == JAN_12
@@ -1,6 +1,9 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Link } from 'react-router-dom'
-import { ordersApi, settingsApi, statsApi } from '../services/api'
+import { ordersApi, statsApi, dashboardApi } from '../services/api'
+
+// Columns shown in the orders table
+const TABLE_FIELDS = 'order_number,vendor,customer_name,status,location,expected_date,created_at'
 
 function Dashboard() {
   const [orders, setOrders] = useState([])
@@ -21,20 +24,59 @@ function Dashboard() {
     loadData()
   }, [filters])
 
+  const filtersRef = useRef(filters)
+  filtersRef.current = filters
+  const statsTimer = useRef(null)
+
+  // Apply pushed order changes instead of reloading everything
+  useEffect(() => {
+    const refreshStats = () => {
+      clearTimeout(statsTimer.current)
+      statsTimer.current = setTimeout(() => {
+        statsApi.get().then(setStats).catch(() => {})
+      }, 1000)
+    }
+
+    const unsubscribe = ordersApi.subscribe((event) => {
+      const { search, status, vendor } = filtersRef.current
+      if (event.action === 'resync' || event.partial || search || status || vendor) {
+        loadData()
+        return
+      }
+      if (event.action === 'deleted') {
+        setOrders(prev => prev.filter(o => o.id !== event.id))
+        setTotal(prev => Math.max(0, prev - 1))
+      } else if (event.action === 'created') {
+        setOrders(prev => prev.some(o => o.id === event.id)
+          ? prev
+          : [{ ...event.order, items: [] }, ...prev])
+        setTotal(prev => prev + 1)
+      } else if (event.action === 'updated') {
+        setOrders(prev => prev.map(o => o.id === event.id ? { ...o, ...event.order } : o))
+      }
+      refreshStats()
+    })
+
+    return () => {
+      clearTimeout(statsTimer.current)
+      unsubscribe()
+    }
+  }, [])
+
   const loadData = async () => {
     setLoading(true)
     try {
-      const [ordersData, statsData, vendorsData, statusesData] = await Promise.all([
-        ordersApi.getAll({ ...filters, limit: 100 }),
-        statsApi.get(),
-        settingsApi.getVendors(),
-        settingsApi.getStatuses()
-      ])
-      setOrders(ordersData.orders)
-      setTotal(ordersData.total)
-      setStats(statsData)
-      setVendors(vendorsData.vendors)
-      setStatuses(statusesData.statuses)
+      const data = await dashboardApi.get({
+        ...filtersRef.current,
+        limit: 100,
+        fields: TABLE_FIELDS,
+        include_items: 'false'
+      })
+      setOrders(data.orders.orders)
+      setTotal(data.orders.total)
+      setStats(data.stats)
+      setVendors(data.settings.vendors)
+      setStatuses(data.settings.statuses)
     } catch (error) {
       console.error('Failed to load data:', error)
     } finally {
@@ -59,9 +101,14 @@ function Dashboard() {
     setShowModal(true)
   }
 
-  const openEditModal = (order) => {
-    setEditingOrder(order)
-    setShowModal(true)
+  const openEditModal = async (order) => {
+    // The table only loads a few columns; fetch the full order for editing
+    try {
+      setEditingOrder(await ordersApi.getById(order.id))
+      setShowModal(true)
+    } catch (error) {
+      alert(error.message)
+    }
   }
 
   const handleDelete = async (id) => {
@@ -40,6 +40,13 @@ export const ordersApi = {
   }),
 
   search: (orderNumber) => fetchAPI(`/orders/search/${orderNumber}`),
+
+  // Server-Sent Events feed of order changes; returns an unsubscribe function
+  subscribe: (onEvent) => {
+    const source = new EventSource(`${API_BASE}/orders/stream`);
+    source.addEventListener('order', (e) => onEvent(JSON.parse(e.data)));
+    return () => source.close();
+  },
 };
 
 export const settingsApi = {
@@ -70,3 +77,11 @@ export const settingsApi = {
 export const statsApi = {
   get: () => fetchAPI('/stats'),
 };
+
+export const dashboardApi = {
+  // Orders page, stats and settings in one request; params are the order filters
+  get: (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return fetchAPI(`/dashboard${query ? `?${query}` : ''}`);
+  },
+};